@@ -0,0 +1,209 @@
+# agent/cli.py
+
+"""
+Punto de entrada sin interfaz gráfica: ejecuta la visión y el control de
+entrada del agente sin cargar Tk (útil en sesiones largas o por SSH).
+
+Cada orden importa solo lo que necesita: `analyze` no carga los backends de
+entrada y `macro` no carga la visión.
+
+Uso (desde la raíz del proyecto):
+    python -m agent.cli analyze [--image captura.png]
+    python -m agent.cli watch [--timeout 30]
+    python -m agent.cli press CONFIRM MOVE_DOWN [--scheme gamepad]
+    python -m agent.cli macro "MOVE_DOWN*4, CONFIRM, wait 500, CONFIRM"
+    python -m agent.cli record partida.efpr
+    python -m agent.cli replay partida.efpr [--speed 1.5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import controls  # noqa: E402
+from utils.logger import log  # noqa: E402
+
+
+def _scheme(name: str) -> dict:
+    return controls.GAMEPAD_MAPPING if name == "gamepad" else controls.KEYBOARD_MAPPING
+
+
+def _countdown(seconds: float):
+    """Da tiempo a cambiar a la ventana del juego antes de pulsar nada."""
+    if seconds > 0:
+        from core.input_scheduler import sleep_until
+        print(f"Empezando en {seconds:.0f} s... cambia a la ventana del juego.")
+        sleep_until(time.perf_counter() + seconds)
+
+
+def _print_analysis(analysis, elapsed: float):
+    data = analysis.to_dict() if analysis is not None else None
+    print(json.dumps({"analysis": data, "elapsed_ms": round(elapsed * 1000, 1)}, ensure_ascii=False), flush=True)
+
+
+def cmd_analyze(args) -> int:
+    from PIL import Image
+    from core.screen_capture import capture_window
+    from vision.gemini_analyzer import create_default_analyzer
+
+    image = Image.open(args.image) if args.image else capture_window()
+    if image is None:
+        return 1
+    analyzer = create_default_analyzer()
+    started = time.perf_counter()
+    analysis = analyzer.analyze_screen(image)
+    _print_analysis(analysis, time.perf_counter() - started)
+    return 0 if analysis is not None else 1
+
+
+def cmd_watch(args) -> int:
+    """Analiza cada pantalla nueva del juego en cuanto se estabiliza, hasta pulsar Ctrl+C."""
+    from core.screen_capture import capture_window, wait_for_screen_change
+    from vision.gemini_analyzer import create_default_analyzer
+
+    image = capture_window()
+    if image is None:
+        return 1
+    analyzer = create_default_analyzer()
+    code = 0
+    try:
+        while True:
+            if image is not None:
+                started = time.perf_counter()
+                _print_analysis(analyzer.analyze_screen(image), time.perf_counter() - started)
+            waited = time.perf_counter()
+            image = wait_for_screen_change(require_change=True, timeout=args.timeout)
+            if image is None:
+                if time.perf_counter() - waited < args.timeout:
+                    code = 1  # No ha agotado el plazo: la ventana del juego ya no está
+                    break
+                if args.exit_on_timeout:
+                    break
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps({"stats": analyzer.tier_stats()}, ensure_ascii=False))
+    return code
+
+
+def cmd_press(args) -> int:
+    from core.input_controller import execute_actions, format_timing_report, timing_report
+
+    _countdown(args.countdown)
+    results = execute_actions(args.actions, _scheme(args.scheme), args.duration / 1000, gap=args.gap / 1000)
+    print(format_timing_report(timing_report(results, args.duration / 1000)))
+    return 0 if all(results) else 1
+
+
+def cmd_macro(args) -> int:
+    from core.input_controller import run_macro
+    from core.macros import MacroSyntaxError, format_jitter_report
+
+    try:
+        _countdown(args.countdown)
+        run = run_macro(args.spec, _scheme(args.scheme))
+    except MacroSyntaxError as e:
+        print(f"Error: {e}")
+        return 2
+    except ImportError as e:
+        print(f"Error: No se pudo inicializar el backend de entrada: {e}")
+        return 1
+    print(format_jitter_report(run.jitter_report()))
+    return 0
+
+
+def cmd_record(args) -> int:
+    """Graba las acciones del jugador (ver core/play_recording.py) hasta pulsar Ctrl+C."""
+    from core.play_recording import PlayRecorder
+    from vision.action_monitor import ActionMonitor
+
+    monitor = ActionMonitor(controls.KEYBOARD_MAPPING, controls.GAMEPAD_MAPPING)
+    try:
+        recorder = PlayRecorder(args.path, monitor, name=args.name)
+    except OSError as e:
+        print(f"Error: {e}")
+        return 2
+    except ImportError as e:
+        print(f"Error: No se pudieron abrir los hooks de entrada: {e}")
+        return 1
+    print("Grabando... pulsa Ctrl+C para terminar.")
+    try:
+        while True:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recording = recorder.stop()
+        monitor.stop()  # Suelta la referencia al bus que tomó PlayRecorder con monitor.start()
+    print(f"Grabación guardada en '{args.path}': {recording} | {recorder.stats()}")
+    return 0
+
+
+def cmd_replay(args) -> int:
+    from core.input_controller import replay_recording
+
+    _countdown(args.countdown)
+    try:
+        run = replay_recording(args.path, _scheme(args.scheme), speed=args.speed)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 2
+    except ImportError as e:
+        print(f"Error: No se pudo inicializar el backend de entrada: {e}")
+        return 1
+    print(run.report())
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m agent.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="Analiza la pantalla actual (o una imagen) e imprime el resultado en JSON.")
+    analyze.add_argument("--image", help="Imagen a analizar en lugar de capturar la ventana del juego.")
+    analyze.set_defaults(handler=cmd_analyze)
+
+    watch = commands.add_parser("watch", help="Analiza cada pantalla nueva del juego (una línea JSON por pantalla).")
+    watch.add_argument("--timeout", type=float, default=30.0, help="Segundos de espera por cada cambio de pantalla.")
+    watch.add_argument("--exit-on-timeout", action="store_true", help="Termina si la pantalla deja de cambiar.")
+    watch.set_defaults(handler=cmd_watch)
+
+    record = commands.add_parser("record", help="Graba las acciones del jugador hasta pulsar Ctrl+C (para `replay`).")
+    record.add_argument("path", help="Fichero de salida (.efpr, se sobrescribe).")
+    record.add_argument("--name", help="Nombre descriptivo que se guarda en la grabación.")
+    record.set_defaults(handler=cmd_record)
+
+    for name, handler, help_text in (
+        ("press", cmd_press, "Pulsa una o varias acciones e imprime el informe de tiempos."),
+        ("macro", cmd_macro, "Reproduce una macro (ver core/macros.py) e imprime su jitter."),
+        ("replay", cmd_replay, "Reproduce una partida grabada con PlayRecorder."),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        if name == "press":
+            command.add_argument("actions", nargs="+", help="Acciones de config/controls.py (ej. CONFIRM).")
+            command.add_argument("--duration", type=float, default=100.0, help="Duración de cada pulsación (ms).")
+            command.add_argument("--gap", type=float, default=50.0, help="Pausa entre pulsaciones (ms).")
+        elif name == "macro":
+            command.add_argument("spec", help='Macro, ej. "MOVE_DOWN*4, CONFIRM, wait 500, CONFIRM".')
+        else:
+            command.add_argument("path")
+            command.add_argument("--speed", type=float, default=1.0, help="Factor de velocidad (por defecto 1.0).")
+        command.add_argument("--scheme", choices=("keyboard", "gamepad"), default="keyboard")
+        command.add_argument("--countdown", type=float, default=3.0, help="Segundos para cambiar a la ventana del juego.")
+        command.set_defaults(handler=handler)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Ejecuta una orden sin interfaz gráfica. Devuelve el código de salida."""
+    args = build_parser().parse_args(argv)
+    log.info(f"Modo sin interfaz: '{args.command}'.")
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# benchmarks/bench_analog.py
+
+"""
+Mide el ritmo real de informes y el jitter del emisor analógico
+(`core/analog.py`) con el backend de entrada falso, sin gamepad virtual.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_analog [--rate 125] [--seconds 2]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import ANALOG_REPORT_RATE  # noqa: E402
+from core import analog  # noqa: E402
+from core.input_backends import RecordingInputBackend  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=ANALOG_REPORT_RATE, help="Informes por segundo.")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duración de la trayectoria.")
+    args = parser.parse_args()
+
+    backend = RecordingInputBackend()
+    streamer = analog.AnalogStreamer(backend, rate=args.rate)
+    # Un círculo completo con el stick izquierdo mientras el gatillo derecho sube y baja
+    stick = analog.arc(1.0, 0, 360, args.seconds, rate=args.rate, easing="ease_in_out")
+    trigger = analog.concat(analog.ramp(0, 1, args.seconds / 2, rate=args.rate),
+                            analog.ramp(1, 0, args.seconds / 2, rate=args.rate))
+    streamer.play("right_trigger", trigger)
+    streamer.play("left_stick", stick).result()
+    streamer.stop()
+
+    stats = streamer.stats()
+    print(f"Informes: {stats['reports']} (muestras saltadas: {stats['ticks_skipped']})")
+    print(f"Ritmo: {stats['rate']:.1f} / {stats['target_rate']:.0f} informes/s")
+    print(f"Jitter: media {stats['jitter_mean_ms']:.3f} ms | p95 {stats['jitter_p95_ms']:.3f} ms | "
+          f"máx {stats['jitter_max_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# benchmarks/bench_capture.py
+
+"""
+Compara la latencia por captura de los backends de `core/capture_session.py`.
+
+Los backends que no se pueden crear en esta máquina (ej. `mss` sin instalar o
+ImageGrab sin pantalla) se omiten.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_capture [--grabs N] [--backends imagegrab,mss,synthetic]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import GAME_WINDOW_TITLE  # noqa: E402
+from core.capture_session import CAPTURE_BACKENDS, CaptureSession, SyntheticBackend  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grabs", type=int, default=50, help="Capturas por backend.")
+    parser.add_argument("--backends", default=",".join(CAPTURE_BACKENDS), help="Backends a comparar.")
+    args = parser.parse_args()
+
+    print(f"{'backend':<12}{'capturas':>10}{'media ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'máx ms':>9}")
+    for name in args.backends.split(","):
+        try:
+            backend = CAPTURE_BACKENDS[name]()
+            window_title = None if name == SyntheticBackend.name else GAME_WINDOW_TITLE
+            session = CaptureSession(backend, window_title)
+            session.grab()  # Calentamiento: localiza la ventana
+            for _ in range(args.grabs):
+                session.grab()
+        except Exception as e:
+            print(f"{name:<12}  no disponible: {e}")
+            continue
+
+        stats = session.latency_stats()
+        print(f"{name:<12}{stats['count']:>10}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>9.2f}"
+              f"{stats['p95_ms']:>9.2f}{stats['max_ms']:>9.2f}")
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
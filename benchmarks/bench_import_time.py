@@ -0,0 +1,118 @@
+# benchmarks/bench_import_time.py
+
+"""
+Mide el tiempo de arranque en frío: importa cada punto de entrada en un
+intérprete nuevo (`python -X importtime`) y muestra cuánto tarda, qué módulos
+pesados arrastra y cuáles son sus importaciones más lentas.
+
+Sirve para vigilar que las dependencias pesadas (Tk, hooks de entrada, NumPy,
+Gemini...) se sigan cargando solo al usarlas.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_import_time [--runs 5] [--top 5] [--module agent.cli ...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Puntos de entrada que se miden por defecto
+DEFAULT_MODULES = (
+    "main",
+    "gui.main_window",
+    "agent.cli",
+    "core.input_controller",
+    "core.screen_capture",
+    "vision.action_monitor",
+    "vision.gemini_analyzer",
+)
+# Dependencias que no deberían cargarse hasta usarse
+HEAVY_MODULES = ("customtkinter", "tkinter", "pynput", "inputs", "pydirectinput", "vgamepad",
+                 "google.generativeai", "numpy", "mss", "pygetwindow")
+# Los procesos se lanzan en una carpeta temporal para no pisar logs/app.log al importar el logger
+WORK_DIR = tempfile.mkdtemp(prefix="bench_import_")
+ENV = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (ROOT, os.environ.get("PYTHONPATH")))))
+
+
+def _measure_interpreter() -> float:
+    """Tiempo de un intérprete que no importa nada (se descuenta del de cada módulo)."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], cwd=WORK_DIR, env=ENV, check=True)
+    return time.perf_counter() - started
+
+
+def _import_once(module: str) -> dict:
+    """Importa `module` en un proceso nuevo. Devuelve tiempos, módulos pesados cargados y el detalle de importtime."""
+    code = (f"import {module}; import sys, json; "
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=WORK_DIR, env=ENV,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"código {proc.returncode}"
+        return {"error": error}
+
+    # importtime lista cada módulo después de sus dependencias, con una sangría de dos espacios por nivel
+    entries = []   # (acumulado en µs, nombre) de las importaciones directas del módulo medido
+    children = []
+    own_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # Cabecera
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                own_us, entries = int(cumulative), children
+            children = []
+    return {
+        "wall": wall,
+        "import_us": own_us,
+        "heavy": json.loads(proc.stdout.strip().splitlines()[-1]),
+        "entries": entries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", action="append", help="Módulo a medir (se puede repetir). Por defecto, los principales.")
+    parser.add_argument("--runs", type=int, default=5, help="Procesos por módulo (se usa la mediana).")
+    parser.add_argument("--top", type=int, default=5, help="Importaciones más lentas que se muestran por módulo.")
+    args = parser.parse_args()
+
+    baseline = statistics.median(_measure_interpreter() for _ in range(args.runs))
+    print(f"Arranque del intérprete vacío: {baseline * 1000:.1f} ms\n")
+    print(f"{'módulo':<26}{'import ms':>10}{'proceso ms':>12}  pesados cargados")
+    details = []
+    for module in args.module or DEFAULT_MODULES:
+        runs = [_import_once(module) for _ in range(args.runs)]
+        failed = next((r for r in runs if "error" in r), None)
+        if failed:
+            print(f"{module:<26}{'-':>10}{'-':>12}  no disponible: {failed['error']}")
+            continue
+        import_ms = statistics.median(r["import_us"] for r in runs) / 1000
+        wall_ms = (statistics.median(r["wall"] for r in runs) - baseline) * 1000
+        heavy = ", ".join(runs[-1]["heavy"]) or "-"
+        print(f"{module:<26}{import_ms:>10.1f}{wall_ms:>12.1f}  {heavy}")
+        details.append((module, runs[-1]["entries"]))
+
+    for module, entries in details:
+        print(f"\n{module}: importaciones directas más lentas")
+        for us, name in sorted(entries, reverse=True)[:args.top]:
+            print(f"  {us / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# benchmarks/bench_macro_jitter.py
+
+"""
+Mide la precisión temporal de las macros (`core/macros.py`) con el backend de
+entrada falso, comparando la espera solo durmiendo con la espera mixta
+(dormir + girar) del planificador.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_macro_jitter [--macro "MOVE_DOWN*4, CONFIRM, wait 200, CONFIRM"] [--runs 5] [--verbose]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.controls import KEYBOARD_MAPPING  # noqa: E402
+from core.input_backends import RecordingInputBackend  # noqa: E402
+from core.input_scheduler import DEFAULT_SPIN_THRESHOLD, InputScheduler  # noqa: E402
+from core.macros import compile_macro, format_jitter_report, play_macro  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--macro", default="MOVE_DOWN*4, CONFIRM, wait 200, CONFIRM, SPRINT:300+PASS_THROUGH")
+    parser.add_argument("--runs", type=int, default=5, help="Reproducciones por modo.")
+    parser.add_argument("--verbose", action="store_true", help="Muestra el detalle de la última reproducción.")
+    args = parser.parse_args()
+
+    macro = compile_macro(args.macro, KEYBOARD_MAPPING)
+    print(f"{macro}\n")
+    print(f"{'modo':<24}{'eventos':>9}{'media ms':>10}{'p95 ms':>9}{'máx ms':>9}")
+    for label, spin in (("solo dormir", 0.0), (f"mixta (giro {DEFAULT_SPIN_THRESHOLD * 1000:.0f} ms)", DEFAULT_SPIN_THRESHOLD)):
+        scheduler = InputScheduler(RecordingInputBackend(), spin_threshold=spin)
+        jitters = []
+        for _ in range(args.runs):
+            report = play_macro(macro, scheduler).wait().jitter_report()
+            jitters.extend(sorted(abs(e["jitter_ms"]) for e in report["events"]))
+        scheduler.stop()
+
+        jitters.sort()
+        print(f"{label:<24}{len(jitters):>9}{sum(jitters) / len(jitters):>10.3f}"
+              f"{jitters[int(0.95 * (len(jitters) - 1))]:>9.3f}{jitters[-1]:>9.3f}")
+        if args.verbose:
+            print(format_jitter_report(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
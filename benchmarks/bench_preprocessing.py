@@ -0,0 +1,101 @@
+# benchmarks/bench_preprocessing.py
+
+"""
+Compara los presets de `vision/preprocessing.py` sobre un conjunto de capturas.
+
+Para cada preset muestra el tamaño codificado medio, la reducción frente a la
+captura original en PNG, el tiempo medio de codificación y los tokens de imagen
+estimados por petición.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_preprocessing [carpeta_con_capturas] [--repeat N]
+
+Sin carpeta se generan capturas sintéticas con aspecto de menú.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vision.preprocessing import PRESETS, FramePreprocessor, estimate_image_tokens  # noqa: E402
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+
+def load_frames(folder: str) -> list[Image.Image]:
+    """Carga todas las imágenes de una carpeta."""
+    frames = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with Image.open(os.path.join(folder, name)) as img:
+                frames.append(img.convert("RGB"))
+    return frames
+
+
+def synthetic_frames(count: int = 6, size: tuple[int, int] = (1936, 1119)) -> list[Image.Image]:
+    """
+    Genera capturas parecidas a un menú del juego: marco de ventana, bandas negras,
+    fondo degradado y una columna de opciones con una de ellas resaltada.
+    """
+    rng = random.Random(42)
+    frames = []
+    for index in range(count):
+        img = Image.new("RGB", size, (0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((0, 0, size[0] - 1, 30), fill=(240, 240, 240))  # barra de título
+        for y in range(90, size[1] - 60, 4):
+            shade = 30 + (y * 60) // size[1]
+            draw.rectangle((8, y, size[0] - 8, y + 3), fill=(shade // 2, shade, shade + 40))
+        for option in range(6):
+            top = 200 + option * 120
+            color = (230, 200, 20) if option == index % 6 else (60, 70, 110)
+            draw.rectangle((120, top, 720, top + 90), fill=color)
+            draw.text((150, top + 35), f"OPCION {option} " + "x" * rng.randint(4, 14), fill=(255, 255, 255))
+        frames.append(img)
+    return frames
+
+
+def run(frames: list[Image.Image], repeat: int):
+    reference_size = None
+    print(f"{len(frames)} capturas, {repeat} repeticiones\n")
+    print(f"{'preset':<12}{'tamaño':>16}{'bytes medios':>14}{'vs original':>13}{'ms/captura':>12}{'tokens':>8}")
+
+    for name in PRESETS:
+        preprocessor = FramePreprocessor(name)
+        total_bytes = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for frame in frames:
+                prepared = preprocessor.prepare(frame)
+                total_bytes += len(prepared.data)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / (repeat * len(frames))
+
+        mean_bytes = total_bytes / (repeat * len(frames))
+        if reference_size is None:
+            reference_size = mean_bytes
+        width, height = prepared.size
+        print(f"{name:<12}{f'{width}x{height}':>16}{mean_bytes:>14,.0f}{mean_bytes / reference_size:>12.1%}"
+              f"{elapsed_ms:>12.1f}{estimate_image_tokens(width, height):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", nargs="?", help="Carpeta con capturas de ejemplo.")
+    parser.add_argument("--repeat", type=int, default=3, help="Veces que se procesa cada captura.")
+    args = parser.parse_args()
+
+    frames = load_frames(args.folder) if args.folder else synthetic_frames()
+    if not frames:
+        print(f"Error: No se encontraron imágenes en '{args.folder}'.")
+        return
+    run(frames, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_vision_replay.py
+
+"""
+Mide latencia y rendimiento del analizador de visión reproduciendo una sesión
+grabada con EFOOTBALL_VISION_BACKEND=record, sin red ni API Key.
+
+Las capturas se leen de la carpeta de frames del archivo y se pasan por el
+analizador con un `ReplayBackend`, primero en serie (analyze_image) y después
+en paralelo (analyze_many).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_vision_replay [--archive RUTA] [--frames CARPETA] [--scale 1.0] [--preset NOMBRE]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import VISION_ARCHIVE_FRAMES_DIR, VISION_ARCHIVE_PATH  # noqa: E402
+from vision.async_analyzer import AsyncVisionAnalyzer  # noqa: E402
+from vision.backends import ReplayBackend  # noqa: E402
+from vision.gemini_analyzer import GeminiVisionAnalyzer  # noqa: E402
+from vision.preprocessing import FramePreprocessor  # noqa: E402
+
+
+def load_frames(folder: str) -> list[Image.Image]:
+    """Carga las capturas grabadas (solo las que se guardaron como imagen PIL sin preprocesar)."""
+    frames = []
+    if not os.path.isdir(folder):
+        return frames  # Aún no se ha grabado nada (EFOOTBALL_VISION_BACKEND=record)
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".png"):
+            with Image.open(os.path.join(folder, name)) as img:
+                img.load()
+                frames.append(img)
+    return frames
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", default=VISION_ARCHIVE_PATH, help="Archivo de grabación (JSON Lines).")
+    parser.add_argument("--frames", default=VISION_ARCHIVE_FRAMES_DIR, help="Carpeta con las capturas grabadas.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Factor de latencia (0 = sin esperas).")
+    parser.add_argument("--preset", default=None, help="Preset de preprocesado usado al grabar, si lo hubo.")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames)
+    if not frames:
+        print(f"Error: No hay capturas en '{args.frames}'.")
+        return
+
+    backend = ReplayBackend(args.archive, latency_scale=args.scale)
+    preprocessor = FramePreprocessor(args.preset) if args.preset else None
+    analyzer = GeminiVisionAnalyzer(backend=backend, preprocessor=preprocessor)
+    print(f"{len(backend)} respuestas grabadas, {len(frames)} capturas, escala de latencia {args.scale}\n")
+
+    latencies = []
+    start = time.perf_counter()
+    for frame in frames:
+        call_start = time.perf_counter()
+        analyzer.analyze_image(frame)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    serial_elapsed = time.perf_counter() - start
+
+    print("En serie (analyze_image):")
+    print(f"  p50 {statistics.median(latencies):.1f} ms | p95 {percentile(latencies, 0.95):.1f} ms | "
+          f"{len(frames) / serial_elapsed:.1f} capturas/s")
+
+    # Sin cuota: al reproducir no hay API que proteger
+    async_analyzer = AsyncVisionAnalyzer(analyzer, requests_per_minute=1e9)
+    start = time.perf_counter()
+    asyncio.run(async_analyzer.analyze_many(frames))
+    parallel_elapsed = time.perf_counter() - start
+    print("En paralelo (analyze_many):")
+    print(f"  total {parallel_elapsed * 1000:.1f} ms | {len(frames) / parallel_elapsed:.1f} capturas/s")
+
+    print(f"\nAciertos exactos: {backend.hits} | aproximados: {backend.fuzzy_hits} | fallos: {backend.misses}")
+
+
+if __name__ == "__main__":
+    main()
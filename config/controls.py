@@ -60,7 +60,7 @@ GAMEPAD_MAPPING = {
     'MOVE_DOWN': 'dpad_down',
     'MOVE_LEFT': 'dpad_left',
     'MOVE_RIGHT': 'dpad_right',
-    # NOTA: El movimiento del jugador con el stick izquierdo es analógico y se gestionará de forma diferente.
+    # NOTA: El movimiento del jugador con el stick izquierdo es analógico: se controla con trayectorias (core/analog.py).
 
     # Acciones en el Juego (Ataque)
     SPRINT: 'right_trigger',       # RT
@@ -0,0 +1,43 @@
+# config/roi_profiles.py
+
+"""
+Regiones de interés (ROI) de cada pantalla del juego.
+
+La mayoría de decisiones solo necesitan una parte pequeña de la pantalla (la
+opción resaltada, el título de la cabecera, la barra de resistencia...). Cada
+perfil asocia un `current_screen` (el que devuelve Gemini) a un conjunto de
+regiones con nombre, que la sesión de captura recorta directamente.
+
+Las regiones se expresan como fracciones (0-1) del área de juego de la ventana,
+sin el marco de Windows: (left, top, right, bottom). Así no dependen de la resolución.
+"""
+
+# Perfil que se usa para las pantallas sin perfil propio.
+DEFAULT_PROFILE = "default"
+
+ROI_PROFILES = {
+    DEFAULT_PROFILE: {
+        "full": (0.0, 0.0, 1.0, 1.0),
+        "header": (0.0, 0.0, 1.0, 0.12),
+    },
+    "main_menu": {
+        "header": (0.0, 0.0, 1.0, 0.12),
+        "options": (0.0, 0.12, 0.5, 0.92),
+    },
+    "game_plan": {
+        "header": (0.0, 0.0, 1.0, 0.1),
+        "formation": (0.3, 0.1, 1.0, 0.9),
+        "options": (0.0, 0.1, 0.3, 0.9),
+    },
+    "match_settings": {
+        "header": (0.0, 0.0, 1.0, 0.12),
+        "options": (0.05, 0.12, 0.95, 0.88),
+    },
+    "in_match_pause_menu": {
+        "options": (0.3, 0.15, 0.7, 0.85),
+    },
+    "in_match": {
+        "scoreboard": (0.0, 0.0, 0.35, 0.08),
+        "stamina": (0.35, 0.88, 0.65, 1.0),
+    },
+}
@@ -0,0 +1,273 @@
+# core/analog.py
+
+"""
+Control analógico del gamepad virtual: sticks y gatillos siguiendo trayectorias.
+
+Las trayectorias (líneas, arcos, rampas con curvas de aceleración) se generan
+de una vez como arrays de NumPy, con una muestra por informe, y
+`AnalogStreamer` las envía al backend a un ritmo fijo desde su propio hilo.
+Varios canales (ej. stick izquierdo + gatillo derecho) se combinan en el mismo
+informe.
+
+Convención: sticks como (x, y) en [-1, 1], con x positiva a la derecha e y
+positiva hacia arriba; gatillos en [0, 1]. Los ángulos de `arc` van en grados,
+con 0 a la derecha y 90 arriba.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from config.settings import ANALOG_REPORT_RATE
+from core.input_backends import ANALOG_CHANNELS, STICKS, InputBackend
+from core.input_scheduler import DEFAULT_SPIN_THRESHOLD, sleep_until
+
+# Curvas de aceleración: reciben el progreso t en [0, 1] (array) y devuelven el progreso suavizado
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t,
+    "ease_out": lambda t: 1 - (1 - t) ** 2,
+    "ease_in_out": lambda t: t * t * (3 - 2 * t),
+}
+
+NEUTRAL = {"left_stick": (0.0, 0.0), "right_stick": (0.0, 0.0), "left_trigger": 0.0, "right_trigger": 0.0}
+
+
+# --- TRAYECTORIAS ---
+
+def _progress(duration: float, rate: float, easing: str) -> np.ndarray:
+    """Progreso (0, 1] de cada muestra de una trayectoria de `duration` segundos."""
+    if easing not in EASINGS:
+        raise ValueError(f"Curva desconocida: '{easing}'. Opciones: {', '.join(EASINGS)}")
+    count = max(1, round(duration * rate))
+    return EASINGS[easing](np.arange(1, count + 1, dtype=np.float64) / count)
+
+
+def clip_stick(samples: np.ndarray) -> np.ndarray:
+    """Lleva al círculo unidad las muestras (n, 2) que se salen de él, conservando su dirección."""
+    norms = np.linalg.norm(samples, axis=1, keepdims=True)
+    return np.where(norms > 1.0, samples / np.maximum(norms, 1e-12), samples)
+
+
+def line(start, end, duration: float, rate: float = ANALOG_REPORT_RATE, easing: str = "linear") -> np.ndarray:
+    """Stick en línea recta de `start` a `end` (puntos (x, y)). Devuelve un array (n, 2)."""
+    start, end = np.asarray(start, dtype=np.float64), np.asarray(end, dtype=np.float64)
+    t = _progress(duration, rate, easing)[:, None]
+    return clip_stick(start + (end - start) * t)
+
+
+def arc(radius: float, start_angle: float, end_angle: float, duration: float, center=(0.0, 0.0),
+        rate: float = ANALOG_REPORT_RATE, easing: str = "linear") -> np.ndarray:
+    """Stick a lo largo de un arco de circunferencia (ej. un regate en semicírculo). Array (n, 2)."""
+    t = _progress(duration, rate, easing)
+    angles = np.radians(start_angle + (end_angle - start_angle) * t)
+    points = np.column_stack((np.cos(angles), np.sin(angles))) * radius + np.asarray(center, dtype=np.float64)
+    return clip_stick(points)
+
+
+def ramp(start: float, end: float, duration: float, rate: float = ANALOG_REPORT_RATE,
+         easing: str = "linear") -> np.ndarray:
+    """Gatillo que pasa de `start` a `end` (ej. presión progresiva). Array (n,) en [0, 1]."""
+    t = _progress(duration, rate, easing)
+    return np.clip(start + (end - start) * t, 0.0, 1.0)
+
+
+def hold(value, duration: float, rate: float = ANALOG_REPORT_RATE) -> np.ndarray:
+    """Mantiene un valor fijo: (x, y) para un stick (array (n, 2)) o un número para un gatillo (array (n,))."""
+    count = max(1, round(duration * rate))
+    value = np.asarray(value, dtype=np.float64)
+    return np.repeat(value[None, ...], count, axis=0) if value.ndim else np.full(count, float(value))
+
+
+def concat(*segments: np.ndarray) -> np.ndarray:
+    """Une varios tramos en una sola trayectoria."""
+    return np.concatenate(segments, axis=0)
+
+
+# --- ENVÍO A RITMO FIJO ---
+
+class _Trajectory:
+    __slots__ = ("channel", "samples", "start_tick", "neutral_after", "future")
+
+    def __init__(self, channel, samples, start_tick, neutral_after):
+        self.channel = channel
+        self.samples = samples
+        self.start_tick = start_tick
+        self.neutral_after = neutral_after
+        self.future = Future()
+
+
+class AnalogStreamer:
+    """
+    Hilo que envía las trayectorias activas al backend a `rate` informes por segundo.
+
+    Si el hilo se retrasa, salta las muestras atrasadas en lugar de acumular
+    retraso: la trayectoria termina a su hora. Sin trayectorias activas no envía nada.
+    """
+
+    def __init__(self, backend: InputBackend, rate: float = ANALOG_REPORT_RATE,
+                 spin_threshold: float = DEFAULT_SPIN_THRESHOLD, stats_window: int = 2000):
+        """
+        Args:
+            backend (InputBackend): Backend con `set_analog` (gamepad virtual o el falso que graba).
+            rate (float): Informes por segundo.
+            spin_threshold (float): Segundos finales de cada espera que se hacen girando.
+            stats_window (int): Número de intervalos recientes que se guardan para las estadísticas.
+        """
+        self.backend = backend
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.spin_threshold = spin_threshold
+
+        self._active = {}            # canal -> _Trajectory
+        self._pending_static = {}    # Valores fijos que se envían en el siguiente informe
+        self._condition = threading.Condition()
+        self._running = True
+        self._clock_start = None     # Instante del tick 0 (se reinicia al salir de reposo)
+        self._tick = 0
+        self._last_report = None
+        self._intervals = deque(maxlen=stats_window)
+        self.reports_sent = 0
+        self.ticks_skipped = 0
+        self._thread = threading.Thread(target=self._run, name=f"AnalogStreamer-{backend.name}", daemon=True)
+        self._thread.start()
+
+    # --- API pública ---
+
+    def play(self, channel: str, samples, neutral_after: bool = True) -> Future:
+        """
+        Reproduce una trayectoria en un canal ("left_stick", "right_stick", "left_trigger", "right_trigger").
+        Sustituye a la que hubiera en ese canal (su Future se cancela).
+
+        Args:
+            samples (np.ndarray): Una muestra por informe: (n, 2) para sticks, (n,) para gatillos.
+            neutral_after (bool): Volver a la posición de reposo al terminar.
+
+        Returns:
+            Future: Se completa al enviar la última muestra con el instante `time.perf_counter()` del envío.
+        """
+        if channel not in ANALOG_CHANNELS:
+            raise ValueError(f"Canal analógico desconocido: '{channel}'. Opciones: {', '.join(ANALOG_CHANNELS)}")
+        samples = np.asarray(samples, dtype=np.float64)
+        valid = samples.ndim == 2 and samples.shape[1] == 2 if channel in STICKS else samples.ndim == 1
+        if not valid or len(samples) == 0:
+            raise ValueError(f"Muestras con forma {samples.shape} no válidas para el canal '{channel}'.")
+
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("El emisor analógico está detenido.")
+            if not self._active:
+                self._restart_clock()
+            trajectory = _Trajectory(channel, samples, self._tick, neutral_after)
+            previous = self._active.get(channel)
+            self._active[channel] = trajectory
+            self._condition.notify()
+        if previous is not None:
+            previous.future.cancel()
+        return trajectory.future
+
+    def set(self, channel: str, value):
+        """Fija un canal a un valor (ej. soltar el stick) en el siguiente informe, cancelando su trayectoria."""
+        with self._condition:
+            previous = self._active.pop(channel, None)
+            self._pending_static[channel] = value
+            if not self._active:
+                self._restart_clock()
+            self._condition.notify()
+        if previous is not None:
+            previous.future.cancel()
+
+    def neutral(self):
+        """Suelta sticks y gatillos."""
+        for channel, value in NEUTRAL.items():
+            self.set(channel, value)
+
+    def stop(self):
+        """Detiene el hilo dejando los controles en reposo."""
+        self.neutral()
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=1.0)
+        try:
+            self.backend.set_analog(dict(NEUTRAL))
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        """Ritmo real de informes y jitter (desviación de cada intervalo respecto al periodo)."""
+        with self._condition:
+            intervals = np.array(self._intervals)
+        result = {"reports": self.reports_sent, "ticks_skipped": self.ticks_skipped, "target_rate": self.rate}
+        if len(intervals):
+            jitter = np.abs(intervals - self.period) * 1000
+            result.update({
+                "rate": float(1.0 / intervals.mean()),
+                "jitter_mean_ms": float(jitter.mean()),
+                "jitter_p95_ms": float(np.percentile(jitter, 95)),
+                "jitter_max_ms": float(jitter.max()),
+            })
+        return result
+
+    # --- Hilo ---
+
+    def _restart_clock(self):
+        """Empieza a contar ticks desde ahora (con el lock adquirido)."""
+        self._clock_start = time.perf_counter() + self.period / 4  # Margen para programar el primer informe
+        self._tick = 0
+        self._last_report = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._active and not self._pending_static:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                due = self._clock_start + self._tick * self.period
+
+            sleep_until(due, self.spin_threshold)
+
+            finished = []
+            with self._condition:
+                now = time.perf_counter()
+                late_ticks = int((now - due) / self.period)
+                if late_ticks > 0:
+                    # Vamos tarde: saltamos las muestras atrasadas para no acumular retraso
+                    self.ticks_skipped += late_ticks
+                    self._tick += late_ticks
+
+                values = dict(self._pending_static)
+                self._pending_static.clear()
+                for channel, trajectory in list(self._active.items()):
+                    index = self._tick - trajectory.start_tick
+                    if index < len(trajectory.samples):
+                        values[channel] = trajectory.samples[index]
+                    if index >= len(trajectory.samples) - 1:
+                        del self._active[channel]
+                        finished.append(trajectory)
+                        if trajectory.neutral_after:
+                            # Se envía en el siguiente informe, tras la última muestra
+                            self._pending_static[channel] = NEUTRAL[channel]
+                self._tick += 1
+
+            if values:
+                try:
+                    self.backend.set_analog(values)
+                except Exception as e:
+                    for trajectory in finished:
+                        trajectory.future.set_exception(e)
+                    finished = []
+                    print(f"ADVERTENCIA: Fallo al enviar el informe analógico: {e}")
+                sent_at = time.perf_counter()
+                with self._condition:
+                    if self._last_report is not None:
+                        self._intervals.append(sent_at - self._last_report)
+                    self._last_report = sent_at
+                    self.reports_sent += 1
+                for trajectory in finished:
+                    if not trajectory.future.done():
+                        trajectory.future.set_result(sent_at)
@@ -0,0 +1,514 @@
+# core/capture_session.py
+
+"""
+Sesión de captura persistente.
+
+`capture_window` buscaba la ventana del juego entre todas las ventanas y la
+activaba en cada captura. `CaptureSession` resuelve la ventana una sola vez,
+refresca su geometría de forma barata y delega la captura en un backend
+intercambiable (ImageGrab, un capturador de buffer crudo o uno sintético para
+pruebas sin pantalla en Linux). También mide la latencia de cada captura.
+"""
+
+import os
+import platform
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+from config.settings import (
+    CAPTURE_BACKEND,
+    CAPTURE_SYNTHETIC_SOURCE,
+    GAME_WINDOW_TITLE,
+    SCREEN_CHANGE_THRESHOLD,
+    SCREEN_CHANGE_TIMEOUT,
+    SCREEN_SETTLE_MS,
+    WINDOW_CHROME_MARGINS,
+)
+from config.roi_profiles import DEFAULT_PROFILE, ROI_PROFILES
+
+
+class WindowNotFoundError(RuntimeError):
+    """No hay ninguna ventana cuyo título contenga el del juego."""
+
+
+def mean_abs_diff(thumb: np.ndarray, previous: np.ndarray, scratch: np.ndarray) -> float:
+    """
+    Diferencia media absoluta (0-255) entre una miniatura uint8 y la anterior (int16),
+    usando `scratch` (int16, misma forma) para no reservar memoria en cada comparación.
+    """
+    np.subtract(thumb, previous, out=scratch, dtype=np.int16)
+    np.abs(scratch, out=scratch)
+    return float(scratch.mean())
+
+
+# --- BACKENDS DE CAPTURA ---
+
+class CaptureBackend:
+    """Interfaz común: captura una región (left, top, right, bottom) de la pantalla."""
+
+    name = "base"
+
+    def grab(self, bbox: tuple[int, int, int, int]) -> Image.Image:
+        raise NotImplementedError
+
+    def grab_into(self, bbox: tuple[int, int, int, int], out: np.ndarray):
+        """
+        Captura directamente en un array (alto, ancho, 3) uint8 ya reservado.
+        Los backends que pueden evitar la imagen intermedia de Pillow lo sobrescriben.
+        """
+        np.copyto(out, np.asarray(self.grab(bbox).convert("RGB")))
+
+    def close(self):
+        """Libera los recursos del backend (si los tiene)."""
+
+
+class ImageGrabBackend(CaptureBackend):
+    """Captura con `PIL.ImageGrab` (GDI en Windows). Es el método original."""
+
+    name = "imagegrab"
+
+    def __init__(self):
+        from PIL import ImageGrab
+        self._grab = ImageGrab.grab
+
+    def grab(self, bbox):
+        return self._grab(bbox, all_screens=True)
+
+
+class MssBackend(CaptureBackend):
+    """
+    Captura del buffer crudo de la pantalla con la librería `mss`, más rápida que
+    ImageGrab. La imagen se construye sobre el buffer BGRA sin conversiones intermedias.
+    Los objetos de `mss` no se pueden compartir entre hilos, así que se crea uno por hilo.
+    """
+
+    name = "mss"
+
+    def __init__(self):
+        import mss  # Dependencia opcional: pip install mss
+        self._mss = mss
+        self._local = threading.local()
+
+    def _instance(self):
+        instance = getattr(self._local, "instance", None)
+        if instance is None:
+            instance = self._mss.mss()
+            self._local.instance = instance
+        return instance
+
+    def grab(self, bbox):
+        left, top, right, bottom = bbox
+        shot = self._instance().grab({"left": left, "top": top, "width": right - left, "height": bottom - top})
+        return Image.frombuffer("RGB", shot.size, shot.bgra, "raw", "BGRX", 0, 1)
+
+    def grab_into(self, bbox, out):
+        left, top, right, bottom = bbox
+        shot = self._instance().grab({"left": left, "top": top, "width": right - left, "height": bottom - top})
+        # Vista sin copia sobre el buffer BGRA; la única copia es la de BGR -> RGB al array de destino
+        raw = np.frombuffer(shot.bgra, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        np.copyto(out, raw[..., 2::-1])
+
+    def close(self):
+        instance = getattr(self._local, "instance", None)
+        if instance is not None:
+            instance.close()
+            self._local.instance = None
+
+
+class SyntheticBackend(CaptureBackend):
+    """
+    Backend sin pantalla para pruebas en Linux: devuelve capturas leídas de una
+    carpeta (o de una lista de imágenes) en bucle. Cada llamada a `advance()` pasa
+    a la siguiente imagen; con `auto_advance` se pasa en cada captura.
+    """
+
+    name = "synthetic"
+
+    IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+    def __init__(self, source=CAPTURE_SYNTHETIC_SOURCE, size: tuple[int, int] = (1280, 720), auto_advance: bool = False):
+        """
+        Args:
+            source (str | list[Image.Image] | None): Carpeta con imágenes o lista de imágenes.
+                Si no hay ninguna, se genera una imagen gris del tamaño indicado.
+            size (tuple[int, int]): Tamaño de la "pantalla" sintética si no hay imágenes.
+            auto_advance (bool): Pasar a la siguiente imagen en cada captura.
+        """
+        self.frames = self._load(source) or [Image.new("RGB", size, (64, 64, 64))]
+        self._arrays = [None] * len(self.frames)  # Versión NumPy de cada imagen, creada al usarla
+        self.index = 0
+        self.auto_advance = auto_advance
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _load(cls, source) -> list[Image.Image]:
+        if isinstance(source, (list, tuple)):
+            return [image.convert("RGB") for image in source]
+        if not source or not os.path.isdir(source):
+            return []
+        frames = []
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(cls.IMAGE_EXTENSIONS):
+                with Image.open(os.path.join(source, name)) as img:
+                    frames.append(img.convert("RGB"))
+        return frames
+
+    @property
+    def screen_size(self) -> tuple[int, int]:
+        return self.frames[0].size
+
+    def advance(self, steps: int = 1):
+        """Pasa a la siguiente imagen (simula un cambio de pantalla)."""
+        with self._lock:
+            self.index = (self.index + steps) % len(self.frames)
+
+    def grab(self, bbox):
+        with self._lock:
+            frame = self.frames[self.index]
+            if self.auto_advance:
+                self.index = (self.index + 1) % len(self.frames)
+        if bbox == (0, 0, frame.width, frame.height):
+            return frame.copy()
+        return frame.crop(bbox)
+
+    def grab_into(self, bbox, out):
+        with self._lock:
+            index = self.index
+            if self.auto_advance:
+                self.index = (self.index + 1) % len(self.frames)
+            if self._arrays[index] is None:
+                self._arrays[index] = np.asarray(self.frames[index])
+            array = self._arrays[index]
+        left, top, right, bottom = bbox
+        np.copyto(out, array[top:bottom, left:right])
+
+
+CAPTURE_BACKENDS = {
+    ImageGrabBackend.name: ImageGrabBackend,
+    MssBackend.name: MssBackend,
+    SyntheticBackend.name: SyntheticBackend,
+}
+
+
+def create_capture_backend(name: str = CAPTURE_BACKEND) -> CaptureBackend:
+    """Crea un backend de captura por nombre ("imagegrab", "mss" o "synthetic")."""
+    if name not in CAPTURE_BACKENDS:
+        raise ValueError(f"Backend de captura desconocido: '{name}'. Opciones: {', '.join(CAPTURE_BACKENDS)}")
+    return CAPTURE_BACKENDS[name]()
+
+
+# --- SESIÓN DE CAPTURA ---
+
+class CaptureSession:
+    """
+    Mantiene localizada la ventana del juego y captura su contenido.
+
+    La ventana se busca una vez; después solo se relee su rectángulo cada
+    `geometry_ttl` segundos (una llamada al sistema barata) y, si la ventana
+    desaparece, se vuelve a buscar. Con un backend sintético no hace falta ventana.
+    """
+
+    def __init__(self, backend: CaptureBackend | None = None, window_title: str | None = GAME_WINDOW_TITLE,
+                 activate_on_start: bool = True, geometry_ttl: float = 0.5, latency_window: int = 1000):
+        """
+        Args:
+            backend (CaptureBackend | None): Backend de captura. Por defecto, el de CAPTURE_BACKEND.
+            window_title (str | None): Texto que debe contener el título de la ventana.
+                None para capturar toda la "pantalla" del backend (solo backend sintético).
+            activate_on_start (bool): Traer la ventana al frente la primera vez (solo Windows).
+                Ya no se activa en cada captura, que robaba el foco y añadía latencia.
+            geometry_ttl (float): Segundos durante los que se reutiliza la geometría leída.
+            latency_window (int): Número de latencias recientes que se guardan.
+        """
+        self.backend = backend if backend is not None else create_capture_backend()
+        self.window_title = window_title
+        self.activate_on_start = activate_on_start
+        self.geometry_ttl = geometry_ttl
+
+        self._window = None
+        self._bbox = None
+        self._bbox_read_at = 0.0
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self.grab_count = 0
+        self.geometry_changes = 0
+
+    # --- Ventana y geometría ---
+
+    def _find_window(self):
+        """Busca la ventana del juego (coincidencia parcial del título)."""
+        import pygetwindow as gw  # Solo existe en Windows/macOS: se importa al necesitarlo
+
+        for window in gw.getAllWindows():
+            if self.window_title in window.title:
+                return window
+        raise WindowNotFoundError(f"No se encontró ninguna ventana que contenga el título '{self.window_title}'.")
+
+    def _activate(self, window):
+        if platform.system() != "Windows" or window.isActive:
+            return
+        try:
+            window.activate()
+        except Exception:
+            # A veces la activación puede fallar si la ventana está minimizada
+            window.restore()
+            window.activate()
+
+    def resolve(self):
+        """Localiza la ventana (si aún no se ha hecho) y devuelve su rectángulo actual."""
+        with self._lock:
+            return self._current_bbox(force=True)
+
+    def _current_bbox(self, force: bool = False) -> tuple[int, int, int, int]:
+        """Devuelve el rectángulo de captura, releyéndolo solo si ha caducado (con el lock adquirido)."""
+        now = time.monotonic()
+        if not force and self._bbox is not None and now - self._bbox_read_at < self.geometry_ttl:
+            return self._bbox
+
+        if self.window_title is None:
+            width, height = getattr(self.backend, "screen_size", (0, 0))
+            bbox = (0, 0, width, height)
+        else:
+            if self._window is None:
+                self._window = self._find_window()
+                if self.activate_on_start:
+                    self._activate(self._window)
+            try:
+                left, top, width, height = self._window.box
+            except Exception:
+                # La ventana se ha cerrado o recreado: la buscamos otra vez
+                self._window = self._find_window()
+                left, top, width, height = self._window.box
+            bbox = (left, top, left + width, top + height)
+
+        if bbox != self._bbox:
+            if self._bbox is not None:
+                self.geometry_changes += 1
+            self._bbox = bbox
+        self._bbox_read_at = now
+        return bbox
+
+    @property
+    def bbox(self) -> tuple[int, int, int, int] | None:
+        """Último rectángulo conocido de la ventana (coordenadas de pantalla)."""
+        return self._bbox
+
+    def invalidate(self):
+        """Olvida la ventana y la geometría (ej. tras reiniciar el juego)."""
+        with self._lock:
+            self._window = None
+            self._bbox = None
+
+    # --- Captura ---
+
+    def _target_bbox(self, region: tuple[int, int, int, int] | None) -> tuple[int, int, int, int]:
+        """Rectángulo de pantalla que hay que capturar para la región (relativa a la ventana) pedida."""
+        with self._lock:
+            left, top, right, bottom = self._current_bbox()
+
+        if region is None:
+            return (left, top, right, bottom)
+        r_left, r_top, r_right, r_bottom = region
+        return (left + r_left, top + r_top, min(right, left + r_right), min(bottom, top + r_bottom))
+
+    def frame_size(self, region: tuple[int, int, int, int] | None = None) -> tuple[int, int]:
+        """Tamaño (ancho, alto) que tendrá la próxima captura de la ventana o de la región."""
+        left, top, right, bottom = self._target_bbox(region)
+        return (right - left, bottom - top)
+
+    def grab(self, region: tuple[int, int, int, int] | None = None) -> Image.Image:
+        """
+        Captura la ventana del juego.
+
+        Args:
+            region (tuple | None): Subrectángulo (left, top, right, bottom) relativo a la
+                ventana. None para capturar la ventana completa.
+
+        Raises:
+            WindowNotFoundError: Si la ventana del juego no existe.
+        """
+        bbox = self._target_bbox(region)
+        start = time.perf_counter()
+        image = self.backend.grab(bbox)
+        self._record_latency(time.perf_counter() - start)
+        return image
+
+    def grab_into(self, out: np.ndarray, region: tuple[int, int, int, int] | None = None) -> bool:
+        """
+        Captura la ventana (o una región) dentro de un array (alto, ancho, 3) uint8 ya reservado.
+
+        Returns:
+            bool: False si el tamaño de la ventana ya no coincide con el del array (no se captura nada).
+        """
+        left, top, right, bottom = self._target_bbox(region)
+        if out.shape[:2] != (bottom - top, right - left):
+            return False
+
+        start = time.perf_counter()
+        self.backend.grab_into((left, top, right, bottom), out)
+        self._record_latency(time.perf_counter() - start)
+        return True
+
+    # --- Regiones de interés ---
+
+    def roi_region(self, screen: str | None, name: str) -> tuple[int, int, int, int]:
+        """
+        Convierte una región del perfil de `config/roi_profiles.py` a píxeles relativos a la ventana.
+
+        Args:
+            screen (str | None): `current_screen` de la pantalla. Si no tiene perfil se usa el genérico.
+            name (str): Nombre de la región dentro del perfil (ej. "header", "options").
+
+        Raises:
+            KeyError: Si la región no existe en el perfil.
+        """
+        profile = ROI_PROFILES.get(screen) or ROI_PROFILES[DEFAULT_PROFILE]
+        if name not in profile:
+            raise KeyError(f"La pantalla '{screen}' no tiene la región '{name}'. Opciones: {', '.join(profile)}")
+        f_left, f_top, f_right, f_bottom = profile[name]
+
+        width, height = self.frame_size()
+        # Las fracciones se refieren al área de juego, sin el marco de la ventana
+        left, top = WINDOW_CHROME_MARGINS["left"], WINDOW_CHROME_MARGINS["top"]
+        right, bottom = width - WINDOW_CHROME_MARGINS["right"], height - WINDOW_CHROME_MARGINS["bottom"]
+        if right <= left or bottom <= top:
+            left, top, right, bottom = 0, 0, width, height
+        content_width, content_height = right - left, bottom - top
+        return (left + round(f_left * content_width), top + round(f_top * content_height),
+                left + round(f_right * content_width), top + round(f_bottom * content_height))
+
+    def grab_roi(self, screen: str | None, name: str) -> tuple[Image.Image, tuple[int, int, int, int]]:
+        """
+        Captura solo una región de interés de la pantalla indicada.
+
+        Returns:
+            tuple: (imagen recortada, región (left, top, right, bottom) relativa a la ventana).
+                La región sirve para traducir coordenadas del recorte a la ventana.
+        """
+        region = self.roi_region(screen, name)
+        return self.grab(region), region
+
+    def grab_rois(self, screen: str | None, names: list[str] | None = None) -> dict:
+        """Captura varias regiones de interés de una pantalla (por defecto, todas las de su perfil)."""
+        if names is None:
+            names = list(ROI_PROFILES.get(screen) or ROI_PROFILES[DEFAULT_PROFILE])
+        return {name: self.grab_roi(screen, name) for name in names}
+
+    def wait_for_screen_change(self, region: tuple[int, int, int, int] | None = None,
+                               threshold: float = SCREEN_CHANGE_THRESHOLD, settle_ms: float = SCREEN_SETTLE_MS,
+                               timeout: float = SCREEN_CHANGE_TIMEOUT, reference=None, require_change: bool = True,
+                               poll_interval: float = 0.02, diff_step: int = 8) -> Image.Image | None:
+        """
+        Espera a que la pantalla cambie y después se mantenga estable.
+
+        Sustituye a las pausas fijas: vuelve en cuanto la transición del juego ha
+        terminado, tarde 100 ms o varios segundos. Las capturas se hacen en un
+        array reservado una vez y se comparan sobre una versión submuestreada.
+
+        Args:
+            region (tuple | None): Región de la ventana a vigilar (None = ventana completa).
+            threshold (float): Diferencia media (0-255) a partir de la cual se considera un cambio.
+            settle_ms (float): Milisegundos sin cambios para dar la pantalla por estable.
+            timeout (float): Tiempo máximo de espera en segundos.
+            reference (np.ndarray | Image.Image | None): Fotograma "de antes" (ej. capturado antes
+                de pulsar un botón) con el mismo tamaño que la región. Por defecto, la primera captura.
+            require_change (bool): Si es False, solo se espera a que la pantalla esté estable.
+            poll_interval (float): Segundos entre capturas.
+            diff_step (int): Paso de submuestreo para las comparaciones.
+
+        Returns:
+            Image.Image | None: La última captura (ya estable) o None si la pantalla no cambió
+                dentro del plazo. Si cambió pero no llegó a estabilizarse, se devuelve la última captura.
+
+        Raises:
+            WindowNotFoundError: Si la ventana del juego no existe.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        settle = settle_ms / 1000
+
+        frame = previous = scratch = None
+        changed = not require_change
+        stable_since = start
+        while True:
+            if frame is None:
+                width, height = self.frame_size(region)
+                frame = np.empty((height, width, 3), dtype=np.uint8)
+                thumb_shape = frame[::diff_step, ::diff_step].shape
+                scratch = np.empty(thumb_shape, dtype=np.int16)
+                if reference is not None:
+                    reference = np.asarray(reference)[..., :3]
+                    if reference.shape[:2] == (height, width):
+                        previous = reference[::diff_step, ::diff_step].astype(np.int16)
+                    reference = None
+
+            if not self.grab_into(frame, region):
+                # La ventana ha cambiado de tamaño: también es un cambio de pantalla
+                frame = previous = None
+                changed = True
+                stable_since = time.monotonic()
+                continue
+            now = time.monotonic()
+
+            thumb = frame[::diff_step, ::diff_step]
+            if previous is None:
+                previous = thumb.astype(np.int16)
+            elif mean_abs_diff(thumb, previous, scratch) >= threshold:
+                changed = True
+                stable_since = now
+                np.copyto(previous, thumb)
+            else:
+                np.copyto(previous, thumb)
+                if changed and now - stable_since >= settle:
+                    return Image.fromarray(frame)
+
+            if now >= deadline:
+                return Image.fromarray(frame) if changed else None
+            time.sleep(poll_interval)
+
+    def _record_latency(self, elapsed: float):
+        with self._lock:
+            self._latencies.append(elapsed)
+            self.grab_count += 1
+
+    def latency_stats(self) -> dict:
+        """Estadísticas (en milisegundos) de las capturas recientes."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return {"backend": self.backend.name, "count": 0}
+
+        def percentile(fraction):
+            return samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000
+
+        return {
+            "backend": self.backend.name,
+            "count": len(samples),
+            "mean_ms": sum(samples) / len(samples) * 1000,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": samples[-1] * 1000,
+        }
+
+    def close(self):
+        self.backend.close()
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session() -> CaptureSession:
+    """Sesión compartida por toda la aplicación (se crea la primera vez que se usa)."""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            backend = create_capture_backend()
+            # El backend sintético no tiene ventana: se captura su "pantalla" completa
+            window_title = None if backend.name == SyntheticBackend.name else GAME_WINDOW_TITLE
+            _default_session = CaptureSession(backend, window_title)
+        return _default_session
@@ -0,0 +1,272 @@
+# core/frame_grabber.py
+
+"""
+Capturador en segundo plano.
+
+En lugar de capturar bajo demanda y esperar, un hilo captura la ventana del
+juego a un ritmo fijo dentro de un buffer circular de NumPy reservado de
+antemano (sin reservar memoria por fotograma) y detecta cambios comparando una
+versión reducida de cada fotograma con la del anterior. Así el bot siempre
+tiene un fotograma reciente disponible.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from config.settings import SCREEN_CHANGE_THRESHOLD, SCREEN_CHANGE_TIMEOUT, SCREEN_SETTLE_MS
+from core.capture_session import CaptureSession, get_default_session, mean_abs_diff
+
+
+class FrameGrabber:
+    """
+    Hilo que captura fotogramas en un buffer circular preasignado.
+
+    Los fotogramas se devuelven como vistas de solo lectura sobre el buffer
+    (sin copias). Una vista es válida hasta que el hilo da la vuelta al buffer,
+    es decir, durante los `capacity - 1` fotogramas siguientes; quien necesite conservarla más
+    tiempo debe copiarla.
+    """
+
+    def __init__(self, session: CaptureSession | None = None, fps: float = 15.0, capacity: int = 32,
+                 diff_step: int = 8, change_threshold: float = SCREEN_CHANGE_THRESHOLD, region: tuple[int, int, int, int] | None = None):
+        """
+        Args:
+            session (CaptureSession | None): Sesión de captura. Por defecto, la compartida.
+            fps (float): Fotogramas por segundo que se intentan capturar.
+            capacity (int): Número de fotogramas que caben en el buffer circular.
+            diff_step (int): Paso de submuestreo para comparar fotogramas (8 = 1 de cada 64 píxeles).
+            change_threshold (float): Diferencia media (0-255) a partir de la cual un fotograma "ha cambiado".
+            region (tuple | None): Región de la ventana a capturar (None = ventana completa).
+        """
+        if capacity < 2:
+            raise ValueError("capacity debe ser al menos 2.")
+
+        self.session = session if session is not None else get_default_session()
+        self.period = 1.0 / fps
+        self.capacity = capacity
+        self.diff_step = diff_step
+        self.change_threshold = change_threshold
+        self.region = region
+
+        # Buffers (se reservan al conocer el tamaño de la ventana)
+        self._frames = None
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._sequence = np.full(capacity, -1, dtype=np.int64)
+        self._thumb_prev = None
+        self._thumb_diff = None
+
+        self._seq = -1                 # Número del último fotograma escrito
+        self._last_change_seq = -1
+        self.last_diff = 0.0
+        self.frames_captured = 0
+        self.frames_late = 0          # Fotogramas en los que no se llegó a tiempo al ritmo pedido
+
+        self._condition = threading.Condition()
+        # Evento de "la pantalla ha cambiado" para quien prefiera un Event (hay que limpiarlo tras esperar)
+        self.frame_changed = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Arranca el hilo de captura (no bloqueante)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo de captura."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        with self._condition:
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Bucle de captura ---
+
+    def _allocate(self, width: int, height: int):
+        """Reserva el buffer circular y los buffers de comparación para un tamaño de ventana."""
+        self._frames = np.zeros((self.capacity, height, width, 3), dtype=np.uint8)
+        thumb_shape = self._frames[0, ::self.diff_step, ::self.diff_step].shape
+        self._thumb_prev = np.zeros(thumb_shape, dtype=np.int16)
+        self._thumb_diff = np.zeros(thumb_shape, dtype=np.int16)
+        self._sequence.fill(-1)
+
+    def _run(self):
+        next_time = time.perf_counter()
+        while not self._stop_event.is_set():
+            try:
+                self._capture_once()
+            except Exception as e:
+                print(f"ADVERTENCIA: Fallo en el capturador en segundo plano: {e}")
+                self._stop_event.wait(0.5)
+
+            next_time += self.period
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                # Vamos tarde: no intentamos recuperar los fotogramas perdidos
+                self.frames_late += 1
+                next_time = time.perf_counter()
+
+    def _capture_once(self):
+        width, height = self.session.frame_size(self.region)
+        if self._frames is None or self._frames.shape[1:3] != (height, width):
+            self._allocate(width, height)
+            first = True
+        else:
+            first = self._seq < 0
+
+        slot = (self._seq + 1) % self.capacity
+        frame = self._frames[slot]
+        with self._condition:
+            # El hueco aún guarda el fotograma más antiguo: deja de ser válido antes de sobrescribirlo,
+            # para que `frames_since` no devuelva una vista a medio escribir (ni tras un fallo)
+            self._sequence[slot] = -1
+        if not self.session.grab_into(frame, self.region):
+            return  # La ventana ha cambiado de tamaño: se reasigna en la siguiente vuelta
+        timestamp = time.perf_counter()
+
+        # Comparación barata con el fotograma anterior sobre una versión submuestreada
+        thumb = frame[::self.diff_step, ::self.diff_step]
+        diff = mean_abs_diff(thumb, self._thumb_prev, self._thumb_diff)
+        np.copyto(self._thumb_prev, thumb)
+
+        changed = not first and diff >= self.change_threshold
+        with self._condition:
+            self._seq += 1
+            self._timestamps[slot] = timestamp
+            self._sequence[slot] = self._seq
+            self.last_diff = diff
+            self.frames_captured += 1
+            if changed:
+                self._last_change_seq = self._seq
+                self.frame_changed.set()
+            self._condition.notify_all()
+
+    # --- Lectura ---
+
+    def _view(self, slot: int) -> np.ndarray:
+        view = self._frames[slot].view()
+        view.flags.writeable = False
+        return view
+
+    def latest_frame(self) -> tuple[int, float, np.ndarray] | None:
+        """
+        Devuelve el fotograma más reciente como vista sin copia.
+
+        Returns:
+            tuple | None: (número de fotograma, instante `time.perf_counter()`, array alto x ancho x 3 RGB)
+                          o None si aún no se ha capturado nada.
+        """
+        with self._condition:
+            if self._seq < 0:
+                return None
+            slot = self._seq % self.capacity
+            return self._seq, float(self._timestamps[slot]), self._view(slot)
+
+    def frames_since(self, timestamp: float) -> list[tuple[int, float, np.ndarray]]:
+        """
+        Devuelve, en orden, los fotogramas del buffer capturados después de `timestamp`
+        (instante de `time.perf_counter()`), como vistas sin copia.
+        """
+        with self._condition:
+            if self._seq < 0:
+                return []
+            first_seq = max(0, self._seq - self.capacity + 1)
+            result = []
+            for seq in range(first_seq, self._seq + 1):
+                slot = seq % self.capacity
+                if self._sequence[slot] == seq and self._timestamps[slot] > timestamp:
+                    result.append((seq, float(self._timestamps[slot]), self._view(slot)))
+            return result
+
+    def wait_for_frame(self, after_seq: int, timeout: float | None = None) -> bool:
+        """Espera a que haya un fotograma posterior a `after_seq`. Devuelve False si se agota el tiempo."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._seq > after_seq or self._stop_event.is_set(), timeout) \
+                and self._seq > after_seq
+
+    def wait_for_change(self, after_seq: int | None = None, timeout: float | None = None) -> int | None:
+        """
+        Espera a que se capture un fotograma distinto del anterior.
+
+        Args:
+            after_seq (int | None): Solo cuentan los cambios posteriores a este fotograma
+                (por defecto, al último fotograma capturado al llamar).
+            timeout (float | None): Tiempo máximo de espera en segundos.
+
+        Returns:
+            int | None: Número del fotograma en el que se detectó el cambio, o None si se agotó el tiempo.
+        """
+        with self._condition:
+            if after_seq is None:
+                after_seq = self._seq
+            ok = self._condition.wait_for(
+                lambda: self._last_change_seq > after_seq or self._stop_event.is_set(), timeout)
+            return self._last_change_seq if ok and self._last_change_seq > after_seq else None
+
+    def wait_for_screen_change(self, settle_ms: float = SCREEN_SETTLE_MS, timeout: float = SCREEN_CHANGE_TIMEOUT,
+                               after_seq: int | None = None, require_change: bool = True):
+        """
+        Espera a que la pantalla cambie y después se mantenga estable, igual que
+        `CaptureSession.wait_for_screen_change` pero sin capturar: usa los fotogramas del hilo.
+
+        Args:
+            settle_ms (float): Milisegundos sin cambios para dar la pantalla por estable.
+            timeout (float): Tiempo máximo de espera en segundos.
+            after_seq (int | None): Solo cuentan los cambios posteriores a este fotograma
+                (ej. el último antes de pulsar un botón). Por defecto, el último capturado.
+            require_change (bool): Si es False, solo se espera a que la pantalla esté estable.
+
+        Returns:
+            tuple | None: Como `latest_frame()`, o None si la pantalla no cambió dentro del plazo.
+        """
+        deadline = time.perf_counter() + timeout
+        if after_seq is None:
+            with self._condition:
+                after_seq = self._seq
+        if require_change:
+            seq = self.wait_for_change(after_seq, timeout)
+            if seq is None:
+                return None
+        else:
+            seq = after_seq
+
+        # Cada cambio nuevo reinicia la espera de estabilidad
+        while not self._stop_event.is_set():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            next_change = self.wait_for_change(seq, min(settle_ms / 1000, remaining))
+            if next_change is None:
+                break
+            seq = next_change
+        return self.latest_frame()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "frames_captured": self.frames_captured,
+                "frames_late": self.frames_late,
+                "last_diff": self.last_diff,
+                "capacity": self.capacity,
+                "buffer_mb": self._frames.nbytes / 1e6 if self._frames is not None else 0.0,
+            }
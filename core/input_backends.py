@@ -0,0 +1,246 @@
+# core/input_backends.py
+
+"""
+Backends de entrada para el planificador de `core/input_scheduler.py`.
+
+Cada backend sabe "bajar" y "subir" un control (tecla, botón o gatillo) sin
+esperar: la duración de la pulsación la decide el planificador. Así se pueden
+mantener varios controles pulsados a la vez (ej. sprint + pase al hueco).
+"""
+
+import threading
+import time
+from functools import partial
+
+from config import controls
+
+# Canales analógicos del mando: sticks (x, y) y gatillos (valor único)
+STICKS = ("left_stick", "right_stick")
+ANALOG_CHANNELS = STICKS + ("left_trigger", "right_trigger")
+
+
+class InputBackend:
+    """Interfaz común: pulsa (`press`) y suelta (`release`) un control por su nombre."""
+
+    name = "base"
+
+    def press(self, control: str):
+        raise NotImplementedError
+
+    def release(self, control: str):
+        raise NotImplementedError
+
+    def has_control(self, control: str) -> bool:
+        """Indica si el backend sabe pulsar `control`."""
+        return True
+
+    def compile_control(self, control: str) -> tuple:
+        """
+        Prepara `control` para pulsarlo muchas veces: devuelve las funciones sin
+        argumentos (pulsar, soltar) con todo lo que se pueda resuelto de antemano
+        (ej. el código de botón del gamepad).
+
+        Raises:
+            ValueError: Si el backend no sabe pulsar `control`.
+        """
+        if not self.has_control(control):
+            raise ValueError(f"El control '{control}' no tiene un código de botón asociado en el backend '{self.name}'.")
+        return (lambda: self.press(control)), (lambda: self.release(control))
+
+    def set_analog(self, values: dict):
+        """
+        Envía un informe con los valores de los canales analógicos indicados
+        (ver ANALOG_CHANNELS): sticks como (x, y) en [-1, 1] (y positiva hacia arriba)
+        y gatillos en [0, 1]. Todos los canales del diccionario van en el mismo informe.
+        """
+        raise NotImplementedError(f"El backend '{self.name}' no tiene controles analógicos.")
+
+    def close(self):
+        """Suelta lo que quede pulsado y libera los recursos del backend (si los tiene)."""
+
+
+class KeyboardBackend(InputBackend):
+    """Teclado con `pydirectinput` (DirectInput, el que registra el juego)."""
+
+    name = "keyboard"
+
+    def __init__(self):
+        import pydirectinput  # Solo existe en Windows: se importa al necesitarlo
+        self._input = pydirectinput
+
+    def has_control(self, control):
+        return control in self._input.KEYBOARD_MAPPING
+
+    def press(self, control):
+        # _pause=False: sin la pausa fija que pydirectinput añade tras cada llamada
+        self._input.keyDown(control, _pause=False)
+
+    def release(self, control):
+        self._input.keyUp(control, _pause=False)
+
+    def compile_control(self, control):
+        if not self.has_control(control):
+            raise ValueError(f"La tecla '{control}' no existe en pydirectinput.")
+        return (partial(self._input.keyDown, control, _pause=False),
+                partial(self._input.keyUp, control, _pause=False))
+
+
+class GamepadBackend(InputBackend):
+    """
+    Mando de Xbox 360 virtual con `vgamepad` (requiere el driver ViGEmBus).
+    Los gatillos son ejes: se "pulsan" al máximo y se sueltan a cero.
+    """
+
+    name = "gamepad"
+
+    TRIGGERS = ("left_trigger", "right_trigger")
+
+    def __init__(self):
+        import vgamepad as vg
+        self.gamepad = vg.VX360Gamepad()
+        self._lock = threading.Lock()  # Un único mando compartido por todos los hilos
+        self._compiled = {}            # control -> (pulsar, soltar) ya resueltos
+        self.button_codes = {
+            'dpad_up': vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_UP,
+            'dpad_down': vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_DOWN,
+            'dpad_left': vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_LEFT,
+            'dpad_right': vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_RIGHT,
+            'button_south': vg.XUSB_BUTTON.XUSB_GAMEPAD_A,
+            'button_east': vg.XUSB_BUTTON.XUSB_GAMEPAD_B,
+            'button_west': vg.XUSB_BUTTON.XUSB_GAMEPAD_X,
+            'button_north': vg.XUSB_BUTTON.XUSB_GAMEPAD_Y,
+            'left_bumper': vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_SHOULDER,
+            'right_bumper': vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_SHOULDER,
+            'left_stick_press': vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_THUMB,
+            'right_stick_press': vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_THUMB,
+            'start_button': vg.XUSB_BUTTON.XUSB_GAMEPAD_START,
+        }
+        print("Controlador de Gamepad: Gamepad virtual (VBus) inicializado correctamente.")
+
+    def has_control(self, control):
+        return control in self.button_codes or control in self.TRIGGERS
+
+    def compile_control(self, control):
+        gamepad, lock = self.gamepad, self._lock
+        if control in self.TRIGGERS:
+            set_trigger = gamepad.left_trigger_float if control == "left_trigger" else gamepad.right_trigger_float
+
+            def press():
+                with lock:
+                    set_trigger(value_float=1.0)
+                    gamepad.update()
+
+            def release():
+                with lock:
+                    set_trigger(value_float=0.0)
+                    gamepad.update()
+        elif control in self.button_codes:
+            code = self.button_codes[control]
+
+            def press():
+                with lock:
+                    gamepad.press_button(button=code)
+                    gamepad.update()
+
+            def release():
+                with lock:
+                    gamepad.release_button(button=code)
+                    gamepad.update()
+        else:
+            raise ValueError(f"El control de gamepad '{control}' no tiene un código de botón asociado.")
+        return press, release
+
+    def _handlers(self, control: str) -> tuple:
+        handlers = self._compiled.get(control)
+        if handlers is None:
+            handlers = self._compiled[control] = self.compile_control(control)
+        return handlers
+
+    def press(self, control):
+        self._handlers(control)[0]()
+
+    def release(self, control):
+        self._handlers(control)[1]()
+
+    def set_analog(self, values):
+        with self._lock:
+            for channel, value in values.items():
+                if channel == "left_stick":
+                    self.gamepad.left_joystick_float(x_value_float=float(value[0]), y_value_float=float(value[1]))
+                elif channel == "right_stick":
+                    self.gamepad.right_joystick_float(x_value_float=float(value[0]), y_value_float=float(value[1]))
+                elif channel == "left_trigger":
+                    self.gamepad.left_trigger_float(value_float=float(value))
+                elif channel == "right_trigger":
+                    self.gamepad.right_trigger_float(value_float=float(value))
+                else:
+                    raise ValueError(f"Canal analógico desconocido: '{channel}'.")
+            self.gamepad.update()
+
+    def close(self):
+        with self._lock:
+            self.gamepad.reset()
+            self.gamepad.update()
+
+
+class RecordingInputBackend(InputBackend):
+    """
+    Backend falso que no pulsa nada: registra cada evento con su instante
+    `time.perf_counter()`. Sirve para probar el planificador y las macros sin juego.
+    """
+
+    name = "recording"
+
+    def __init__(self, known_controls=None):
+        """
+        Args:
+            known_controls (iterable | None): Controles válidos. None acepta cualquiera.
+        """
+        self.known_controls = set(known_controls) if known_controls is not None else None
+        self.events = []  # (instante, "press" | "release", control)
+        self.held = set()
+        self.reports = []  # (instante, {canal: valor}) por cada informe analógico
+        self.analog_state = {}
+        self._lock = threading.Lock()
+
+    def has_control(self, control):
+        return self.known_controls is None or control in self.known_controls
+
+    def press(self, control):
+        with self._lock:
+            self.events.append((time.perf_counter(), "press", control))
+            self.held.add(control)
+
+    def release(self, control):
+        with self._lock:
+            self.events.append((time.perf_counter(), "release", control))
+            self.held.discard(control)
+
+    def set_analog(self, values):
+        unknown = set(values) - set(ANALOG_CHANNELS)
+        if unknown:
+            raise ValueError(f"Canal analógico desconocido: '{unknown.pop()}'.")
+        with self._lock:
+            self.reports.append((time.perf_counter(), dict(values)))
+            self.analog_state.update(values)
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self.reports.clear()
+
+
+def backend_name_for_scheme(scheme: dict) -> str:
+    """Nombre del backend que corresponde a un esquema de `config/controls.py`."""
+    if scheme is controls.KEYBOARD_MAPPING:
+        return KeyboardBackend.name
+    if scheme is controls.GAMEPAD_MAPPING:
+        return GamepadBackend.name
+    raise ValueError("Esquema de control no reconocido.")
+
+
+INPUT_BACKENDS = {
+    KeyboardBackend.name: KeyboardBackend,
+    GamepadBackend.name: GamepadBackend,
+    RecordingInputBackend.name: RecordingInputBackend,
+}
@@ -1,110 +1,401 @@
 # core/input_controller.py
 
-import pydirectinput
+import threading
 import time
+from concurrent.futures import Future
 
 # Importamos todas las variables de control necesarias
 from config import controls
+from core.input_backends import INPUT_BACKENDS, backend_name_for_scheme
+from core.input_scheduler import HoldHandle, InputScheduler
+from core.macros import MacroRun, compile_macro, play_macro
+from core.play_recording import PlayRecording, ReplayRun, load_play_recording
+
+# Duración por defecto de una pulsación (suficiente para que el juego la registre)
+DEFAULT_PRESS_DURATION = 0.1
+
+# --- PLANIFICADORES DE ENTRADA ---
+# Uno por backend (teclado / gamepad). Se crean solo cuando se necesitan para evitar errores
+# si pydirectinput no está disponible o ViGEmBus no está instalado.
+_schedulers = {}
+_analog_streamers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(scheme_or_backend) -> InputScheduler:
+    """
+    Devuelve (creándolo la primera vez) el planificador de entradas de un esquema
+    de `config/controls.py` o de un backend por nombre ("keyboard", "gamepad", "recording").
+
+    Raises:
+        ValueError: Si el esquema no se reconoce.
+        Exception: Si el backend no se puede inicializar (ej. falta ViGEmBus).
+    """
+    name = scheme_or_backend if isinstance(scheme_or_backend, str) else backend_name_for_scheme(scheme_or_backend)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(name)
+        if scheduler is None:
+            scheduler = InputScheduler(INPUT_BACKENDS[name]())
+            _schedulers[name] = scheduler
+        return scheduler
+
+
+def get_analog_streamer(backend_name: str = "gamepad") -> "AnalogStreamer":
+    """
+    Devuelve (creándolo la primera vez) el emisor de trayectorias analógicas
+    (sticks y gatillos, ver `core/analog.py`). Comparte backend con el planificador.
+    """
+    from core.analog import AnalogStreamer  # Carga NumPy: solo se importa si se usan los sticks
+
+    scheduler = get_scheduler(backend_name)
+    with _schedulers_lock:
+        streamer = _analog_streamers.get(backend_name)
+        if streamer is None:
+            streamer = AnalogStreamer(scheduler.backend)
+            _analog_streamers[backend_name] = streamer
+        return streamer
 
-# --- GESTIÓN DEL GAMEPAD VIRTUAL ---
-# El gamepad se inicializará solo cuando sea necesario para evitar errores si ViGEmBus no está instalado.
-gamepad = None
-VGPAD_BUTTON_CODES = {}
 
 def initialize_gamepad():
     """Inicializa el gamepad virtual si aún no se ha hecho."""
-    global gamepad, VGPAD_BUTTON_CODES
-    if gamepad is not None:
-        return True
-
     try:
-        import vgamepad as vg
-        gamepad = vg.VX360Gamepad()
-        print("Controlador de Gamepad: Gamepad virtual (VBus) inicializado correctamente.")
-
-        # Rellenamos el diccionario de códigos de botones una vez importado vg
-        VGPAD_BUTTON_CODES.update({
-            'dpad_up': vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_UP,
-            'dpad_down': vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_DOWN,
-            'dpad_left': vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_LEFT,
-            'dpad_right': vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_RIGHT,
-            'button_south': vg.XUSB_BUTTON.XUSB_GAMEPAD_A,
-            'button_east': vg.XUSB_BUTTON.XUSB_GAMEPAD_B,
-            'button_west': vg.XUSB_BUTTON.XUSB_GAMEPAD_X,
-            'button_north': vg.XUSB_BUTTON.XUSB_GAMEPAD_Y,
-            'left_bumper': vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_SHOULDER,
-            'right_bumper': vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_SHOULDER,
-            'left_stick_press': vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_THUMB,
-            'right_stick_press': vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_THUMB,
-            'start_button': vg.XUSB_BUTTON.XUSB_GAMEPAD_START,
-        })
+        get_scheduler(controls.GAMEPAD_MAPPING)
         return True
-    except (ImportError, Exception) as e:
-        gamepad = None # Aseguramos que siga siendo None si falla
+    except Exception as e:
         print(f"ADVERTENCIA: No se pudo inicializar el gamepad virtual. {e}")
         print("Asegúrate de que ViGEmBus está instalado para usar el modo gamepad.")
         return False
 
-def execute_action(action: str, scheme: dict) -> str:
+
+# --- ESQUEMAS COMPILADOS ---
+# Cada esquema se traduce una sola vez a un manejador por acción, con el planificador y el control
+# ya resueltos y las funciones del backend precompiladas. Si se modifica un esquema en caliente,
+# hay que llamar a `clear_compiled_schemes()`.
+_compiled_schemes = {}
+
+DEVICE_NAMES = {"keyboard": "Tecla", "gamepad": "Botón de Gamepad", "recording": "Control"}
+
+# Tipos de error de ActionResult.error_kind
+ERROR_UNKNOWN_ACTION = "unknown_action"          # La acción no está en el esquema
+ERROR_UNKNOWN_SCHEME = "unknown_scheme"          # El esquema no es ni el de teclado ni el de gamepad
+ERROR_UNSUPPORTED_CONTROL = "unsupported_control"  # El backend no sabe pulsar el control de la acción
+ERROR_BACKEND_UNAVAILABLE = "backend_unavailable"  # No se pudo inicializar el backend (ej. falta ViGEmBus)
+ERROR_INPUT_FAILED = "input_failed"              # El backend falló al pulsar o soltar
+
+
+class ActionHandler:
+    """Acción de un esquema compilada: sabe qué control pulsar y con qué planificador."""
+
+    __slots__ = ("action", "control", "device", "scheduler")
+
+    def __init__(self, action: str, control: str, device: str, scheduler: InputScheduler):
+        self.action = action
+        self.control = control
+        self.device = device
+        self.scheduler = scheduler
+
+    def press(self, duration: float = DEFAULT_PRESS_DURATION, delay: float = 0.0) -> Future:
+        return self.scheduler.press(self.control, duration=duration, delay=delay, label=self.action)
+
+    def hold(self, delay: float = 0.0, duration: float | None = None) -> HoldHandle:
+        return self.scheduler.hold(self.control, delay=delay, duration=duration, label=self.action)
+
+    def press_at(self, start: float, duration: float) -> HoldHandle:
+        return self.scheduler.press_at(self.control, start, duration, label=self.action)
+
+
+class CompiledScheme:
+    """Esquema de control traducido a manejadores. Las acciones inválidas guardan su error."""
+
+    def __init__(self, scheme: dict, scheduler: InputScheduler, device: str):
+        self.scheme = scheme
+        self.scheduler = scheduler
+        self.device = device
+        self.handlers = {}  # acción -> ActionHandler
+        self.errors = {}    # acción -> (tipo de error, mensaje)
+        for action, control in scheme.items():
+            if not control:
+                continue
+            try:
+                scheduler.prepare(control)
+            except ValueError as e:
+                self.errors[action] = (ERROR_UNSUPPORTED_CONTROL, str(e))
+                continue
+            self.handlers[action] = ActionHandler(action, control, device, scheduler)
+
+    def handler(self, action: str) -> ActionHandler:
+        """
+        Raises:
+            ValueError: Si la acción no está en el esquema o su control no se puede pulsar.
+        """
+        handler = self.handlers.get(action)
+        if handler is None:
+            _, message = self.errors.get(
+                action, (ERROR_UNKNOWN_ACTION, f"Acción '{action}' no definida en el esquema de control activo."))
+            raise ValueError(message)
+        return handler
+
+    def error_for(self, action: str) -> tuple[str, str]:
+        """(tipo de error, mensaje) de una acción que no tiene manejador."""
+        return self.errors.get(
+            action, (ERROR_UNKNOWN_ACTION, f"Acción '{action}' no definida en el esquema de control activo."))
+
+
+def compile_scheme(scheme: dict) -> CompiledScheme:
     """
-    Recibe una acción abstracta (ej. 'UP'), comprueba el esquema de control
-    activo (teclado o gamepad) y ejecuta la pulsación correspondiente.
+    Devuelve (compilándolo la primera vez) el esquema de control traducido a manejadores.
 
-    Devuelve un string con el resultado de la operación.
+    Raises:
+        ValueError: Si el esquema no se reconoce.
+        Exception: Si el backend no se puede inicializar (ej. falta ViGEmBus).
     """
-    # 1. Obtiene el control específico (ej. 'w' o 'dpad_up') desde el esquema activo
-    control_to_press = scheme.get(action)
+    compiled = _compiled_schemes.get(id(scheme))
+    if compiled is not None and compiled.scheme is scheme:
+        return compiled
+    name = backend_name_for_scheme(scheme)
+    compiled = CompiledScheme(scheme, get_scheduler(name), DEVICE_NAMES.get(name, name))
+    with _schedulers_lock:
+        _compiled_schemes[id(scheme)] = compiled
+    return compiled
 
-    if not control_to_press:
-        return f"Error: Acción '{action}' no definida en el esquema de control activo."
 
-    # 2. Comprueba qué esquema está activo y actúa en consecuencia
-    if scheme is controls.KEYBOARD_MAPPING:
-        # MODO TECLADO
-        try:
-            pydirectinput.press(control_to_press)
-            return f"Acción '{action}' ejecutada -> Tecla '{control_to_press}'"
-        except Exception as e:
-            return f"Error de teclado al pulsar '{control_to_press}': {e}"
-
-    elif scheme is controls.GAMEPAD_MAPPING:
-        # MODO GAMEPAD
-        # Intentamos inicializar el gamepad si es la primera vez que se usa
-        if not initialize_gamepad():
-            return "Error: Se intentó usar el gamepad, pero no está inicializado."
-
-        # Busca el código del botón en nuestro diccionario de traducción
-        button_code = VGPAD_BUTTON_CODES.get(control_to_press)
-
-        # Manejo especial para triggers (son ejes, no botones)
-        if control_to_press == 'left_trigger':
-            gamepad.left_trigger_float(value_float=1.0)
-            gamepad.update()
-            time.sleep(0.1)
-            gamepad.left_trigger_float(value_float=0.0)
-            gamepad.update()
-            return f"Acción '{action}' ejecutada -> Gamepad Trigger Izquierdo"
-        elif control_to_press == 'right_trigger':
-            gamepad.right_trigger_float(value_float=1.0)
-            gamepad.update()
-            time.sleep(0.1)
-            gamepad.right_trigger_float(value_float=0.0)
-            gamepad.update()
-            return f"Acción '{action}' ejecutada -> Gamepad Trigger Derecho"
-
-        if not button_code:
-            return f"Error: El control de gamepad '{control_to_press}' no tiene un código de botón asociado o no es un botón estándar (ej. trigger)."
+def clear_compiled_schemes():
+    """Olvida los esquemas compilados (necesario si se cambia un mapeo de `config/controls.py` en caliente)."""
+    with _schedulers_lock:
+        _compiled_schemes.clear()
+
+
+def press_action(action: str, scheme: dict, duration: float = DEFAULT_PRESS_DURATION, delay: float = 0.0) -> Future:
+    """
+    Pulsa la tecla o botón de una acción sin bloquear.
+
+    Returns:
+        Future: Se completa al soltar el control con (instante de pulsación, instante de liberación).
+
+    Raises:
+        ValueError: Si la acción o su control no existen en el esquema.
+    """
+    return compile_scheme(scheme).handler(action).press(duration=duration, delay=delay)
+
+
+def hold_action(action: str, scheme: dict, delay: float = 0.0, duration: float | None = None) -> HoldHandle:
+    """
+    Mantiene pulsada la tecla o botón de una acción (ej. SPRINT) hasta llamar a
+    `release()` del handle devuelto. Se puede combinar con otras pulsaciones.
+    """
+    return compile_scheme(scheme).handler(action).hold(delay=delay, duration=duration)
+
+
+def run_macro(spec: str | list[str], scheme: dict, wait: bool = True, **options) -> MacroRun:
+    """
+    Compila y reproduce una macro (ej. "MOVE_DOWN*4, CONFIRM, wait 500, CONFIRM").
+    Ver `core/macros.py` para el formato y las opciones (`press_duration`, `gap`).
 
+    Raises:
+        MacroSyntaxError: Si la macro no es válida en el esquema activo.
+    """
+    macro = compile_macro(spec, scheme, **options)
+    run = play_macro(macro, get_scheduler(scheme))
+    return run.wait() if wait else run
+
+
+def replay_recording(recording: PlayRecording | str, scheme: dict, speed: float = 1.0, wait: bool = True,
+                     **options) -> ReplayRun:
+    """
+    Reproduce una partida grabada con `PlayRecorder` (ver `core/play_recording.py`)
+    con su ritmo original o acelerado (`speed`), usando el esquema de control indicado.
+
+    Raises:
+        ValueError: Si el fichero no es una grabación válida.
+    """
+    if isinstance(recording, str):
+        recording = load_play_recording(recording)
+    run = ReplayRun(recording, compile_scheme(scheme), speed=speed, **options)
+    return run.wait() if wait else run
+
+
+# --- EJECUCIÓN CON RESULTADO ---
+
+class ActionResult:
+    """
+    Resultado de `execute_action`: `ok`, tipo de error (`error_kind`, ver ERROR_*)
+    e instantes reales de pulsación y liberación. `str(result)` da el mensaje para el log.
+    """
+
+    __slots__ = ("action", "control", "ok", "error_kind", "message", "scheduled_at", "pressed_at", "released_at",
+                 "future")
+
+    def __init__(self, action: str, control: str | None, ok: bool, message: str, error_kind: str | None = None,
+                 future: Future | None = None):
+        self.action = action
+        self.control = control
+        self.ok = ok
+        self.error_kind = error_kind
+        self.message = message
+        self.scheduled_at = None  # Instantes `time.perf_counter()`: previsto para la pulsación,
+        self.pressed_at = None    # real de la pulsación y real de la liberación (None si no se esperó)
+        self.released_at = None
+        self.future = future     # Future de la pulsación (con wait=False, para esperarla después)
+
+    @classmethod
+    def failure(cls, action: str, control: str | None, error_kind: str, message: str) -> "ActionResult":
+        return cls(action, control, False, message, error_kind)
+
+    @property
+    def duration(self) -> float | None:
+        """Segundos que el control estuvo realmente pulsado."""
+        if self.pressed_at is None or self.released_at is None:
+            return None
+        return self.released_at - self.pressed_at
+
+    def _complete(self, timeout: float | None = None) -> "ActionResult":
+        """Espera la pulsación y anota sus instantes (o el error del backend)."""
         try:
-            # El gamepad ya está inicializado y disponible aquí
-            gamepad.press_button(button=button_code)
-            gamepad.update()
-            time.sleep(0.1)  # Pausa breve para asegurar que el juego registre la pulsación
-            gamepad.release_button(button=button_code)
-            gamepad.update()
-            return f"Acción '{action}' ejecutada -> Botón de Gamepad '{control_to_press}'"
+            self.pressed_at, self.released_at = self.future.result(timeout)
         except Exception as e:
-            return f"Error de gamepad al pulsar '{control_to_press}': {e}"
+            self.ok = False
+            self.error_kind = ERROR_INPUT_FAILED
+            self.message = f"Error al pulsar '{self.control}': {e}"
+        return self
+
+    def __bool__(self):
+        return self.ok
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"ActionResult({self.action!r}, ok={self.ok}, error_kind={self.error_kind!r})"
+
+
+def _compile_for(action: str, scheme: dict) -> tuple[CompiledScheme | None, ActionResult | None]:
+    """Esquema compilado, o el ActionResult de error si no se puede usar."""
+    try:
+        return compile_scheme(scheme), None
+    except ValueError as e:
+        return None, ActionResult.failure(action, None, ERROR_UNKNOWN_SCHEME, f"Error: {e}")
+    except Exception as e:
+        print(f"ADVERTENCIA: No se pudo inicializar el backend de entrada. {e}")
+        if scheme is controls.GAMEPAD_MAPPING:
+            print("Asegúrate de que ViGEmBus está instalado para usar el modo gamepad.")
+            message = "Error: Se intentó usar el gamepad, pero no está inicializado."
+        else:
+            message = f"Error: No se pudo inicializar el backend de entrada: {e}"
+        return None, ActionResult.failure(action, None, ERROR_BACKEND_UNAVAILABLE, message)
+
+
+def _start(compiled: CompiledScheme, action: str, press, scheduled_at: float) -> ActionResult:
+    """Lanza `press(handler)` para una acción y devuelve su resultado (aún sin esperar)."""
+    handler = compiled.handlers.get(action)
+    if handler is None:
+        error_kind, message = compiled.error_for(action)
+        return ActionResult.failure(action, compiled.scheme.get(action), error_kind, f"Error: {message}")
+    try:
+        future = press(handler)
+    except Exception as e:
+        return ActionResult.failure(action, handler.control, ERROR_INPUT_FAILED, f"Error al pulsar '{handler.control}': {e}")
+    result = ActionResult(action, handler.control, True,
+                          f"Acción '{action}' ejecutada -> {handler.device} '{handler.control}'", future=future)
+    result.scheduled_at = scheduled_at
+    return result
+
+
+def execute_action(action: str, scheme: dict, duration: float = DEFAULT_PRESS_DURATION,
+                   wait: bool = True) -> ActionResult:
+    """
+    Recibe una acción abstracta (ej. 'UP') y la pulsa con el esquema de control
+    activo (teclado o gamepad). El esquema se compila la primera vez que se usa.
+
+    La pulsación la ejecuta el planificador de entradas; con `wait=False` la
+    función vuelve en cuanto la pulsación está programada (`result.future` permite esperarla).
+
+    Returns:
+        ActionResult: `ok`, `error_kind`, instantes reales y mensaje para el log (`str(result)`).
+    """
+    compiled, error = _compile_for(action, scheme)
+    if error is not None:
+        return error
+    result = _start(compiled, action, lambda handler: handler.press(duration=duration), time.perf_counter())
+    if result.ok and wait:
+        result._complete()
+    return result
+
+
+def execute_actions(actions: list[str], scheme: dict, duration: float = DEFAULT_PRESS_DURATION,
+                    gap: float = 0.05, wait: bool = True) -> list[ActionResult]:
+    """
+    Ejecuta varias acciones seguidas con una sola compilación y programándolas
+    todas de una vez en el planificador (cada una empieza `gap` segundos después
+    de soltar la anterior). Las acciones con error se saltan sin ocupar hueco.
+
+    Returns:
+        list[ActionResult]: Un resultado por acción, en el mismo orden.
+    """
+    if not actions:
+        return []
+    compiled, error = _compile_for(actions[0], scheme)
+    if error is not None:
+        return [ActionResult.failure(action, None, error.error_kind, error.message) for action in actions]
+
+    results = []
+    cursor = time.perf_counter() + 0.005  # Margen para programar la primera pulsación a tiempo
+    for action in actions:
+        result = _start(compiled, action, lambda handler: handler.press_at(cursor, duration).future, cursor)
+        if result.ok:
+            cursor += duration + gap
+        results.append(result)
+    if wait:
+        for result in results:
+            if result.ok:
+                result._complete()
+    return results
+
+
+def timing_report(results: list[ActionResult], duration: float = DEFAULT_PRESS_DURATION) -> dict:
+    """
+    Resume la precisión de unas pulsaciones ya terminadas (ej. de `execute_actions`).
+
+    Args:
+        results (list[ActionResult]): Resultados esperados (`wait=True`).
+        duration (float): Duración pedida para cada pulsación.
+
+    Returns:
+        dict: Número de pulsaciones y fallos (con sus tipos), y media / p95 / máximo en ms
+            del retraso de despacho (real - previsto) y del error de duración (real - pedida).
+    """
+    def summary(values: list[float]) -> dict:
+        if not values:
+            return {}
+        ordered = sorted(values)
+        return {"mean_ms": 1000 * sum(ordered) / len(ordered),
+                "p95_ms": 1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+                "max_ms": 1000 * max(ordered, key=abs)}
+
+    done = [r for r in results if r.ok and r.pressed_at is not None]
+    failures = [r for r in results if not r.ok]
+    failure_kinds = {}
+    for result in failures:
+        failure_kinds[result.error_kind] = failure_kinds.get(result.error_kind, 0) + 1
+    return {
+        "count": len(results),
+        "ok": len(done),
+        "failures": [(r.action, r.error_kind, r.message) for r in failures],
+        "failure_kinds": failure_kinds,
+        "dispatch": summary([r.pressed_at - r.scheduled_at for r in done if r.scheduled_at is not None]),
+        "hold_error": summary([r.duration - duration for r in done]),
+    }
+
 
-    else:
-        return "Error: Esquema de control no reconocido."
\ No newline at end of file
+def format_timing_report(report: dict) -> str:
+    """Texto legible de `timing_report`, para el log."""
+    lines = [f"Pulsaciones: {report['ok']}/{report['count']} correctas."]
+    for title, key in (("Retraso de despacho", "dispatch"), ("Error de duración", "hold_error")):
+        s = report[key]
+        if s:
+            lines.append(f"{title}: media {s['mean_ms']:.2f} ms | p95 {s['p95_ms']:.2f} ms | máx {s['max_ms']:.2f} ms")
+    grouped = {}  # Un mismo fallo (ej. backend no disponible) se muestra una sola vez
+    for action, error_kind, message in report["failures"]:
+        grouped.setdefault((error_kind, message), []).append(action)
+    for (error_kind, message), actions in grouped.items():
+        lines.append(f"  ✗ {', '.join(actions)} [{error_kind}]: {message}")
+    return "\n".join(lines)
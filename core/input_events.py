@@ -0,0 +1,387 @@
+# core/input_events.py
+
+"""
+Bus de eventos de entrada compartido por todo el proceso.
+
+Antes, cada ventana que escuchaba al jugador (el monitor de acciones del
+entrenamiento, el monitor de entradas...) abría su propio hook de teclado de
+`pynput` y su propio bucle de `get_gamepad`. `InputEventBus` es el único dueño
+de esos hooks: traduce cada pulsación a su acción una sola vez, la guarda en un
+historial circular (`EventRing`) y la reparte a los suscriptores, cada uno con
+su cola acotada y su contador de eventos descartados. Los hooks se abren con el
+primer suscriptor y se cierran al irse el último.
+
+Uso:
+    with get_input_bus().subscribe() as events:
+        for event in events.wait(timeout=1.0):
+            ...
+"""
+
+import importlib.util
+import itertools
+import threading
+import time
+from collections import deque
+
+from config.controls import GAMEPAD_MAPPING, KEYBOARD_MAPPING
+
+# Tipos de evento
+KEY_DOWN = "down"
+KEY_UP = "up"
+DEVICE_STATUS = "status"  # Aviso de un dispositivo (ej. no hay gamepad); el texto va en `control`
+
+# Capacidad por defecto del historial y de la cola de cada suscriptor
+DEFAULT_EVENT_CAPACITY = 4096
+DEFAULT_QUEUE_SIZE = 1024
+
+# 'inputs' enumera los dispositivos al importarse: solo se comprueba que está instalada
+# y se importa al abrir el hilo del gamepad
+GAMEPAD_AVAILABLE = importlib.util.find_spec("inputs") is not None
+
+
+class InputEvent:
+    """Pulsación o liberación de una tecla o botón, con su instante y la acción que representa (si la hay)."""
+
+    __slots__ = ("seq", "timestamp", "wall_time", "device", "kind", "control", "action")
+
+    def __init__(self, seq: int, timestamp: float, wall_time: float, device: str, kind: str, control: str,
+                 action: str | None):
+        self.seq = seq              # Número de orden global del evento
+        self.timestamp = timestamp  # time.perf_counter() (para medir intervalos)
+        self.wall_time = wall_time  # time.time() (para asociarlo a capturas y grabaciones)
+        self.device = device        # "keyboard" o "gamepad"
+        self.kind = kind            # KEY_DOWN, KEY_UP o DEVICE_STATUS
+        self.control = control      # Tecla o código de botón tal como lo da el listener
+        self.action = action        # Acción abstracta de `config/controls.py`, o None si no tiene
+
+    def __repr__(self):
+        return f"InputEvent(#{self.seq}, {self.device} {self.kind} {self.control!r} -> {self.action})"
+
+
+class EventRing:
+    """
+    Buffer circular de eventos de tamaño fijo.
+
+    Los escritores (un hilo por dispositivo) reservan un número de orden con un
+    contador atómico y escriben en su hueco. Los lectores no toman ningún lock:
+    llevan su propio cursor y, si un hueco ya se ha sobrescrito, los eventos
+    perdidos se cuentan como descartados en lugar de frenar a los escritores.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_EVENT_CAPACITY):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._counter = itertools.count()
+        self._head = 0                          # Número de orden del siguiente evento a escribir
+        self._new_event = threading.Condition()  # Solo para despertar a los lectores que esperan
+
+    @property
+    def head(self) -> int:
+        return self._head
+
+    def append(self, timestamp: float, wall_time: float, device: str, kind: str, control: str,
+               action: str | None) -> InputEvent:
+        seq = next(self._counter)
+        event = InputEvent(seq, timestamp, wall_time, device, kind, control, action)
+        self._slots[seq % self.capacity] = event
+        with self._new_event:
+            self._head = max(self._head, seq + 1)
+            self._new_event.notify_all()
+        return event
+
+    def read(self, cursor: int, limit: int | None = None) -> tuple[list[InputEvent], int, int]:
+        """
+        Eventos desde el número de orden `cursor`.
+
+        Returns:
+            tuple: (eventos, nuevo cursor, eventos perdidos por sobrescritura).
+        """
+        head = self._head
+        dropped = 0
+        if head - cursor > self.capacity:
+            dropped = head - self.capacity - cursor
+            cursor = head - self.capacity
+        if limit is not None:
+            head = min(head, cursor + limit)
+
+        events = []
+        while cursor < head:
+            event = self._slots[cursor % self.capacity]
+            if event is None or event.seq < cursor:
+                break  # Hueco reservado pero aún sin escribir: se leerá la próxima vez
+            if event.seq > cursor:
+                dropped += 1  # Sobrescrito mientras leíamos
+            else:
+                events.append(event)
+            cursor += 1
+        return events, cursor, dropped
+
+    def wait(self, cursor: int, timeout: float | None = None) -> bool:
+        """Espera a que haya eventos a partir de `cursor`. Devuelve False si vence el plazo."""
+        with self._new_event:
+            return self._new_event.wait_for(lambda: self._head > cursor, timeout)
+
+
+class EventSubscription:
+    """
+    Lector independiente del historial de eventos. `poll()` devuelve lo nuevo sin
+    bloquear; iterar sobre la suscripción espera a los eventos según llegan.
+    """
+
+    def __init__(self, ring: EventRing, cursor: int):
+        self._ring = ring
+        self.cursor = cursor
+        self.dropped = 0  # Eventos perdidos porque el lector se quedó atrás
+
+    def poll(self, limit: int | None = None) -> list[InputEvent]:
+        events, self.cursor, dropped = self._ring.read(self.cursor, limit)
+        self.dropped += dropped
+        return events
+
+    def wait(self, timeout: float | None = None) -> list[InputEvent]:
+        """Espera hasta `timeout` segundos a que haya eventos nuevos y los devuelve."""
+        self._ring.wait(self.cursor, timeout)
+        return self.poll()
+
+    def __iter__(self):
+        while True:
+            yield from self.wait(timeout=0.5)
+
+
+class BusSubscription:
+    """
+    Cola acotada de un suscriptor del bus. Si el suscriptor no la vacía a
+    tiempo, se descartan los eventos más antiguos (contados en `dropped`) en
+    lugar de frenar los hooks o crecer sin límite.
+    """
+
+    def __init__(self, bus: "InputEventBus", maxsize: int, devices=None, kinds=None):
+        self._bus = bus
+        self.maxsize = maxsize
+        self.devices = frozenset(devices) if devices is not None else None
+        self.kinds = frozenset(kinds) if kinds is not None else None
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self.received = 0
+        self.dropped = 0
+        self.closed = False
+
+    def _put(self, event: InputEvent):
+        """Llamado desde el hilo del hook: debe ser rápido."""
+        if self.devices is not None and event.device not in self.devices:
+            return
+        if self.kinds is not None and event.kind not in self.kinds:
+            return
+        with self._condition:
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(event)
+            self.received += 1
+            self._condition.notify()
+
+    def poll(self, limit: int | None = None) -> list[InputEvent]:
+        """Saca sin bloquear hasta `limit` eventos pendientes (todos, si es None)."""
+        with self._condition:
+            count = len(self._queue) if limit is None else min(limit, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def wait(self, timeout: float | None = None, limit: int | None = None) -> list[InputEvent]:
+        """Espera hasta `timeout` segundos a que haya eventos y los devuelve."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._queue or self.closed, timeout)
+        return self.poll(limit)
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def __iter__(self):
+        while not self.closed:
+            yield from self.wait(timeout=0.5)
+
+    def close(self):
+        """Se da de baja del bus (si era el último suscriptor, se cierran los hooks)."""
+        if self.closed:
+            return
+        self.closed = True
+        with self._condition:
+            self._condition.notify_all()
+        self._bus._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class InputEventBus:
+    """Dueño único de los hooks de teclado y gamepad; reparte sus eventos a los suscriptores."""
+
+    def __init__(self, keyboard_mapping: dict = KEYBOARD_MAPPING, gamepad_mapping: dict = GAMEPAD_MAPPING,
+                 capacity: int = DEFAULT_EVENT_CAPACITY):
+        """
+        Args:
+            keyboard_mapping (dict): Mapeo de acciones a teclas (se invierte una sola vez).
+            gamepad_mapping (dict): Mapeo de acciones a botones de gamepad.
+            capacity (int): Número de eventos que guarda el historial.
+        """
+        # Invertimos los mapeos para una búsqueda rápida: {'up': 'MOVE_UP', ...}
+        self.key_to_action_map = {v: k for k, v in keyboard_mapping.items()}
+        self.gamepad_to_action_map = {v: k for k, v in gamepad_mapping.items()}
+
+        self.history = EventRing(capacity)
+        self._subscribers = ()    # Tupla: el hilo del hook la recorre sin lock
+        self._listeners = ()      # Callbacks síncronos (ver add_listener)
+        self._users = 0           # Suscriptores + usuarios del historial (acquire/release)
+        self._lock = threading.Lock()
+        self._running = False
+        self._keyboard_listener = None
+        self._gamepad_thread = None
+        self._keys_down = set()   # Para ignorar la autorrepetición del teclado
+        self.gamepad_status = None if GAMEPAD_AVAILABLE else "Librería 'inputs' no encontrada."
+
+    # --- Suscripciones ---
+
+    def subscribe(self, maxsize: int = DEFAULT_QUEUE_SIZE, devices=None, kinds=None) -> BusSubscription:
+        """
+        Crea una cola de eventos para un suscriptor y abre los hooks si hace falta.
+
+        Args:
+            maxsize (int): Eventos que puede acumular la cola antes de descartar los más antiguos.
+            devices (iterable | None): Dispositivos que interesan ("keyboard", "gamepad"). None = todos.
+            kinds (iterable | None): Tipos de evento que interesan (KEY_DOWN, KEY_UP, DEVICE_STATUS). None = todos.
+        """
+        subscription = BusSubscription(self, maxsize, devices, kinds)
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+        self.acquire()
+        return subscription
+
+    def add_listener(self, callback):
+        """
+        Registra `callback(event)`, que se llama desde el hilo del hook con cada
+        evento, justo después de guardarlo en el historial. Debe ser rápido (retrasa
+        los eventos siguientes); para trabajo pesado, mejor una suscripción.
+        """
+        with self._lock:
+            self._listeners = self._listeners + (callback,)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            self._listeners = tuple(c for c in self._listeners if c != callback)
+
+    def _unsubscribe(self, subscription: BusSubscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+        self.release()
+
+    def acquire(self):
+        """Registra un usuario del bus (ej. quien solo lee `history`) y abre los hooks si es el primero."""
+        with self._lock:
+            self._users += 1
+            if self._users == 1:
+                self._start_hooks()
+
+    def release(self):
+        """Da de baja a un usuario; con el último, se cierran los hooks."""
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users == 0:
+                self._stop_hooks()
+
+    def stats(self) -> dict:
+        """Eventos publicados y, por suscriptor, recibidos, pendientes y descartados."""
+        return {
+            "events": self.history.head,
+            "running": self._running,
+            "subscribers": [{"received": s.received, "pending": s.pending(), "dropped": s.dropped}
+                            for s in self._subscribers],
+        }
+
+    # --- Hooks (con el lock adquirido) ---
+
+    def _start_hooks(self):
+        from pynput import keyboard  # Solo se necesita al abrir los hooks
+        self._running = True
+        self._keys_down.clear()
+        self._keyboard_listener = keyboard.Listener(on_press=self._on_key_press, on_release=self._on_key_release)
+        self._keyboard_listener.daemon = True
+        self._keyboard_listener.start()
+
+        # get_gamepad() no se puede interrumpir: si el hilo anterior sigue esperando un evento, se reutiliza
+        if GAMEPAD_AVAILABLE and not (self._gamepad_thread and self._gamepad_thread.is_alive()):
+            self._gamepad_thread = threading.Thread(target=self._run_gamepad, name="InputEventBus-gamepad",
+                                                    daemon=True)
+            self._gamepad_thread.start()
+
+    def _stop_hooks(self):
+        self._running = False
+        if self._keyboard_listener:
+            self._keyboard_listener.stop()
+            self._keyboard_listener = None
+
+    def _publish(self, device: str, kind: str, control: str, action: str | None):
+        event = self.history.append(time.perf_counter(), time.time(), device, kind, control, action)
+        for subscription in self._subscribers:
+            subscription._put(event)
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"ADVERTENCIA: Fallo en un oyente del bus de entrada: {e}")
+
+    @staticmethod
+    def _key_name(key) -> str:
+        try:
+            return key.char
+        except AttributeError:
+            return key.name
+
+    def _on_key_press(self, key):
+        key_str = self._key_name(key)
+        if key_str is None or key_str in self._keys_down:
+            return  # Tecla sin nombre o autorrepetición de una tecla mantenida
+        self._keys_down.add(key_str)
+        self._publish("keyboard", KEY_DOWN, key_str, self.key_to_action_map.get(key_str))
+
+    def _on_key_release(self, key):
+        key_str = self._key_name(key)
+        if key_str is None:
+            return
+        self._keys_down.discard(key_str)
+        self._publish("keyboard", KEY_UP, key_str, self.key_to_action_map.get(key_str))
+
+    def _run_gamepad(self):
+        """Hilo que escucha el gamepad mientras haya suscriptores."""
+        from inputs import UnpluggedError, get_gamepad
+        while self._running:
+            try:
+                for event in get_gamepad():
+                    if self.gamepad_status is not None:
+                        self.gamepad_status = None
+                        self._publish("gamepad", DEVICE_STATUS, "Gamepad conectado.", None)
+                    # Nos interesan solo los botones (estado 1 = pulsado, 0 = soltado)
+                    if self._running and event.ev_type == 'Key':
+                        self._publish("gamepad", KEY_DOWN if event.state else KEY_UP, event.code,
+                                      self.gamepad_to_action_map.get(event.code))
+            except (OSError, UnpluggedError) as e:
+                # Puede fallar si no hay un gamepad conectado: se avisa una vez y se reintenta cada poco
+                if self.gamepad_status is None:
+                    self.gamepad_status = "No se detecta ningún gamepad."
+                    print(f"INFO: No se detecta el gamepad, se reintentará en segundo plano. Razón: {e}")
+                    self._publish("gamepad", DEVICE_STATUS, self.gamepad_status, None)
+                time.sleep(2.0)
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_input_bus() -> InputEventBus:
+    """Devuelve el bus de eventos de entrada del proceso (creándolo la primera vez)."""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = InputEventBus()
+        return _bus
@@ -0,0 +1,281 @@
+# core/input_scheduler.py
+
+"""
+Planificador de entradas no bloqueante.
+
+`execute_action` dormía 0.1 s en cada pulsación y solo podía pulsar una cosa a
+la vez. `InputScheduler` ejecuta en un hilo propio eventos de pulsar/soltar
+programados sobre un reloj monotónico de alta resolución (`time.perf_counter`;
+en Windows `time.monotonic` solo avanza cada ~15 ms), de modo que:
+
+- quien pide una pulsación recibe un `Future` y sigue trabajando;
+- se pueden mantener varios controles a la vez (ej. una dirección mantenida
+  mientras se pulsa un botón, o sprint + pase al hueco);
+- si dos órdenes mantienen el mismo control, solo se suelta cuando terminan ambas.
+"""
+
+import heapq
+import itertools
+import platform
+import threading
+import time
+from concurrent.futures import Future
+
+from core.input_backends import InputBackend
+
+PRESS = "press"
+RELEASE = "release"
+
+# Margen (s) que se espera "girando" en lugar de durmiendo: el sueño del sistema es poco preciso
+# (en Windows, ~15 ms), así que se duerme hasta poco antes y el resto se espera activamente.
+DEFAULT_SPIN_THRESHOLD = 0.016 if platform.system() == "Windows" else 0.002
+
+
+def sleep_until(deadline: float, spin_threshold: float = DEFAULT_SPIN_THRESHOLD):
+    """
+    Espera hasta el instante `deadline` de `time.perf_counter()` con precisión
+    submilisegundo: duerme mientras falta más de `spin_threshold` y gira el resto.
+    """
+    remaining = deadline - time.perf_counter()
+    if remaining > spin_threshold:
+        time.sleep(remaining - spin_threshold)
+    while time.perf_counter() < deadline:
+        pass
+
+
+class HoldHandle:
+    """
+    Control mantenido por el planificador. Se suelta con `release()` (o al
+    vencer su duración, si se indicó una). `future` se completa al soltarlo con
+    la tupla (instante de pulsación, instante de liberación) de `time.perf_counter()`.
+    """
+
+    def __init__(self, scheduler: "InputScheduler", control: str, label: str | None = None):
+        self.scheduler = scheduler
+        self.control = control
+        self.label = label or control  # Nombre para informes (ej. la acción abstracta)
+        self.future = Future()
+        self.pressed_at = None
+        self.released = False
+
+    def release(self, delay: float = 0.0):
+        """Programa la liberación del control dentro de `delay` segundos."""
+        self.scheduler._schedule(time.perf_counter() + delay, RELEASE, self)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout: float | None = None):
+        """Espera a que el control se suelte y devuelve (pulsado, soltado)."""
+        return self.future.result(timeout)
+
+    def __repr__(self):
+        return f"HoldHandle({self.control!r}, released={self.released})"
+
+
+class InputScheduler:
+    """Hilo que ejecuta pulsaciones y liberaciones programadas sobre un backend de entrada."""
+
+    def __init__(self, backend: InputBackend, spin_threshold: float = DEFAULT_SPIN_THRESHOLD):
+        """
+        Args:
+            backend (InputBackend): Backend que pulsa realmente los controles.
+            spin_threshold (float): Segundos finales de cada espera que se hacen girando (0 = solo dormir).
+        """
+        self.backend = backend
+        self.spin_threshold = spin_threshold
+        self._queue = []               # Montículo de (instante, orden, tipo, handle)
+        self._counter = itertools.count()  # Desempate: a igual instante, en orden de llegada
+        self._holds = {}               # control -> número de órdenes que lo mantienen pulsado
+        self._active = set()           # Handles pulsados y aún no soltados
+        self._condition = threading.Condition()
+        self._running = True
+        self._spinning_for = float("inf")  # Instante que el hilo está esperando fuera del lock
+        self._preempted = False        # Se ha programado algo antes de ese instante (o se vació la cola)
+        self.max_lateness = 0.0        # Mayor retraso observado al ejecutar un evento (s)
+        self.events_executed = 0
+        self._listeners = []
+        self._handlers = {}            # control -> (pulsar, soltar) compilados por el backend
+        self._thread = threading.Thread(target=self._run, name=f"InputScheduler-{backend.name}", daemon=True)
+        self._thread.start()
+
+    # --- API pública ---
+
+    def press(self, control: str, duration: float = 0.1, delay: float = 0.0, label: str | None = None) -> Future:
+        """
+        Pulsa un control durante `duration` segundos, empezando dentro de `delay` segundos.
+
+        Returns:
+            Future: Se completa al soltar el control con (instante de pulsación, instante de liberación).
+        """
+        handle = self.hold(control, delay=delay, label=label)
+        handle.release(delay + duration)
+        return handle.future
+
+    def hold(self, control: str, delay: float = 0.0, duration: float | None = None,
+             label: str | None = None) -> HoldHandle:
+        """
+        Mantiene un control pulsado hasta llamar a `release()` del handle devuelto
+        (o durante `duration` segundos, si se indica).
+        """
+        handle = HoldHandle(self, control, label)
+        start = time.perf_counter() + delay
+        self._schedule(start, PRESS, handle)
+        if duration is not None:
+            self._schedule(start + duration, RELEASE, handle)
+        return handle
+
+    def press_at(self, control: str, start: float, duration: float, label: str | None = None) -> HoldHandle:
+        """Como `press`, pero con instantes absolutos de `time.perf_counter()`. Útil para secuencias."""
+        handle = HoldHandle(self, control, label)
+        self._schedule(start, PRESS, handle)
+        self._schedule(start + duration, RELEASE, handle)
+        return handle
+
+    def prepare(self, control: str):
+        """
+        Compila de antemano las funciones de pulsar y soltar `control`, para que la
+        primera pulsación no pague ese coste.
+
+        Raises:
+            ValueError: Si el backend no sabe pulsar `control`.
+        """
+        if control not in self._handlers:
+            self._handlers[control] = self.backend.compile_control(control)
+
+    def add_listener(self, callback):
+        """
+        Registra `callback(kind, handle, timestamp)`, que se llama desde el hilo del
+        planificador justo después de cada pulsación (PRESS) o liberación (RELEASE)
+        real. Debe ser rápido: retrasa los eventos siguientes.
+        """
+        with self._condition:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._condition:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def held_controls(self) -> list[str]:
+        """Controles que están pulsados ahora mismo."""
+        with self._condition:
+            return [control for control, count in self._holds.items() if count > 0]
+
+    def release_all(self):
+        """Suelta inmediatamente todo lo pulsado y descarta los eventos pendientes."""
+        with self._condition:
+            pending = [handle for _, _, _, handle in self._queue]
+            self._queue.clear()
+            self._preempted = True
+            active = list(self._active)
+        for handle in active:
+            self._execute(RELEASE, handle)
+        for handle in pending:
+            if not handle.future.done():
+                handle.future.cancel()
+
+    def stop(self):
+        """Detiene el hilo soltando antes todo lo pulsado."""
+        self.release_all()
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=1.0)
+
+    # --- Hilo del planificador ---
+
+    def _schedule(self, when: float, kind: str, handle: HoldHandle):
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("El planificador de entradas está detenido.")
+            heapq.heappush(self._queue, (when, next(self._counter), kind, handle))
+            if when < self._spinning_for:
+                self._preempted = True  # Corta la espera del hilo: este evento va antes
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    if self._queue:
+                        delay = self._queue[0][0] - time.perf_counter()
+                        if delay <= self.spin_threshold:
+                            break
+                        self._condition.wait(delay - self.spin_threshold)
+                    else:
+                        self._condition.wait()
+                if not self._running:
+                    return
+                due = self._queue[0][0]
+                self._spinning_for = due
+                self._preempted = False
+
+            # Último tramo girando (o durmiendo, si spin_threshold es 0), sin el lock para no
+            # bloquear a quien programa eventos. Un evento anterior a `due` corta la espera.
+            remaining = due - time.perf_counter()
+            if remaining > self.spin_threshold:
+                time.sleep(remaining - self.spin_threshold)
+            while not self._preempted and time.perf_counter() < due:
+                pass
+            with self._condition:
+                self._spinning_for = float("inf")
+                if not self._queue or self._queue[0][0] > time.perf_counter():
+                    continue  # Se programó algo antes o release_all() vació la cola: se vuelve a mirar la cabeza
+                when, _, kind, handle = heapq.heappop(self._queue)
+            self.max_lateness = max(self.max_lateness, time.perf_counter() - when)
+            self._execute(kind, handle)
+
+    def _execute(self, kind: str, handle: HoldHandle):
+        """Aplica un evento al backend, contando cuántas órdenes mantienen cada control."""
+        if handle.future.done():
+            return
+        control = handle.control
+        try:
+            with self._condition:
+                if kind == PRESS:
+                    if handle.pressed_at is not None:
+                        return
+                    count = self._holds.get(control, 0)
+                    self._holds[control] = count + 1
+                    self._active.add(handle)
+                    handle.pressed_at = time.perf_counter()
+                    first = count == 0
+                else:
+                    if handle.pressed_at is None:
+                        # Liberación antes de la pulsación (ej. release() inmediato): se anula la pulsación
+                        handle.released = True
+                        handle.future.cancel()
+                        return
+                    count = self._holds.get(control, 0) - 1
+                    self._holds[control] = max(0, count)
+                    self._active.discard(handle)
+                    last = count <= 0
+
+            handlers = self._handlers.get(control)
+            if handlers is None:
+                self.prepare(control)
+                handlers = self._handlers[control]
+            if kind == PRESS:
+                if first:
+                    handlers[0]()
+                timestamp = handle.pressed_at
+            else:
+                if last:
+                    handlers[1]()
+                timestamp = time.perf_counter()
+                handle.released = True
+                handle.future.set_result((handle.pressed_at, timestamp))
+            self.events_executed += 1
+            for listener in list(self._listeners):
+                try:
+                    listener(kind, handle, timestamp)
+                except Exception as e:
+                    print(f"ADVERTENCIA: Fallo en un oyente del planificador de entradas: {e}")
+        except Exception as e:
+            with self._condition:
+                if handle in self._active:
+                    self._active.discard(handle)
+                    self._holds[control] = max(0, self._holds.get(control, 0) - 1)
+            if not handle.future.done():
+                handle.future.set_exception(e)
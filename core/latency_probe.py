@@ -0,0 +1,278 @@
+# core/latency_probe.py
+
+"""
+Medición de la latencia entre una entrada y la reacción de la pantalla.
+
+Todas las esperas del bot (tras pulsar, antes de capturar...) estaban fijadas
+a ojo. `LatencyProbe` anota el instante real de cada pulsación que ejecuta el
+planificador de entradas y busca en el flujo del `FrameGrabber` el primer
+fotograma que cambia después. Las latencias se acumulan en histogramas por
+acción, por pantalla y por transición (pantalla + acción), de los que se
+obtienen percentiles para ajustar cada espera con datos.
+
+Resolución: el cambio se detecta en el primer fotograma capturado después de
+producirse, así que la medida es una cota superior con un error de hasta un
+intervalo del capturador (1 / fps), que también se registra.
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from core.frame_grabber import FrameGrabber
+from core.input_scheduler import PRESS, InputScheduler
+
+
+class LatencyHistogram:
+    """Histograma de latencias con cubetas fijas (memoria constante en sesiones largas)."""
+
+    def __init__(self, max_ms: float = 3000.0, bin_ms: float = 5.0):
+        self.bin_ms = bin_ms
+        self.edges = np.arange(0.0, max_ms + bin_ms, bin_ms)
+        self.counts = np.zeros(len(self.edges), dtype=np.int64)  # La última cubeta recoge lo que supera max_ms
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0       # Entradas tras las que la pantalla no cambió
+
+    def add(self, latency_ms: float):
+        index = min(int(latency_ms // self.bin_ms), len(self.counts) - 1)
+        self.counts[max(0, index)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Percentil aproximado (límite superior de la cubeta que lo contiene), en ms."""
+        if not self.count:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.counts), fraction * self.count))
+        return float(min(self.edges[min(index, len(self.edges) - 1)] + self.bin_ms, self.max_ms))
+
+    def summary(self) -> dict:
+        result = {"count": self.count, "timeouts": self.timeouts}
+        if self.count:
+            result.update({
+                "mean_ms": self.total_ms / self.count,
+                "p50_ms": self.percentile(0.5),
+                "p90_ms": self.percentile(0.9),
+                "p99_ms": self.percentile(0.99),
+                "max_ms": self.max_ms,
+            })
+        return result
+
+
+class LatencyProbe:
+    """
+    Mide la latencia entrada -> cambio de pantalla.
+
+    Hay dos formas de usarla:
+    - `measure(dispatch)`: lanza una entrada y espera su reacción (medición activa).
+    - `attach(scheduler)`: observa todas las pulsaciones del planificador (acciones,
+      macros...) mientras el bot juega. Si llega otra pulsación antes de que la
+      pantalla cambie, no se puede saber cuál causó el cambio y la muestra se descarta.
+    """
+
+    def __init__(self, grabber: FrameGrabber, screen_provider=None, timeout: float = 3.0,
+                 max_ms: float = 3000.0, bin_ms: float = 5.0):
+        """
+        Args:
+            grabber (FrameGrabber): Capturador en marcha del que se leen los cambios.
+            screen_provider (callable | None): Función sin argumentos que devuelve el
+                `current_screen` actual (ej. el último análisis). Sin ella no hay histogramas por pantalla.
+            timeout (float): Segundos tras los que se considera que la entrada no cambió la pantalla.
+            max_ms (float): Límite superior de los histogramas.
+            bin_ms (float): Anchura de cada cubeta de los histogramas.
+        """
+        self.grabber = grabber
+        self.screen_provider = screen_provider
+        self.timeout = timeout
+        self._histogram_args = (max_ms, bin_ms)
+        self.by_action = {}
+        self.by_screen = {}
+        self.by_transition = {}
+        self.discarded = 0
+        self._lock = threading.Lock()
+
+        self._pending = deque()     # Pulsaciones observadas pendientes de su cambio de pantalla
+        self._pending_event = threading.Event()
+        self._schedulers = []
+        self._worker = None
+        self._running = False
+
+    # --- Registro ---
+
+    def _histogram(self, table: dict, key) -> LatencyHistogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = LatencyHistogram(*self._histogram_args)
+        return histogram
+
+    def record(self, action: str, screen: str | None, latency_ms: float | None):
+        """Añade una muestra (None = la pantalla no cambió dentro del plazo)."""
+        with self._lock:
+            histograms = [self._histogram(self.by_action, action)]
+            if screen is not None:
+                histograms.append(self._histogram(self.by_screen, screen))
+                histograms.append(self._histogram(self.by_transition, (screen, action)))
+            for histogram in histograms:
+                if latency_ms is None:
+                    histogram.timeouts += 1
+                else:
+                    histogram.add(latency_ms)
+
+    def _current_screen(self) -> str | None:
+        if self.screen_provider is None:
+            return None
+        try:
+            return self.screen_provider()
+        except Exception:
+            return None
+
+    def _latency_after(self, pressed_at: float, after_seq: int, timeout: float) -> float | None:
+        """
+        Espera el primer cambio de pantalla posterior a `after_seq` capturado después de
+        `pressed_at` y devuelve la latencia en ms (None si no hubo cambio dentro del plazo).
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            seq = self.grabber.wait_for_change(after_seq, max(0.0, deadline - time.perf_counter()))
+            if seq is None:
+                return None
+            changed_at = next((ts for s, ts, _ in self.grabber.frames_since(pressed_at - 1.0) if s == seq), None)
+            if changed_at is None:
+                return None  # El fotograma ya salió del buffer circular
+            if changed_at >= pressed_at:
+                return (changed_at - pressed_at) * 1000
+            after_seq = seq  # Cambio anterior a la pulsación: no es su reacción
+
+    # --- Medición activa ---
+
+    def measure(self, dispatch, action: str, screen: str | None = None) -> float | None:
+        """
+        Lanza una entrada y mide cuánto tarda la pantalla en reaccionar.
+
+        Args:
+            dispatch (callable): Función que envía la entrada y devuelve el instante
+                `time.perf_counter()` de la pulsación, o un Future de `press_action`
+                (se usa su instante de pulsación real).
+            action (str): Nombre de la acción, para los histogramas.
+            screen (str | None): Pantalla desde la que se lanza. Por defecto, la de `screen_provider`.
+
+        Returns:
+            float | None: Latencia en ms, o None si la pantalla no cambió.
+        """
+        screen = screen if screen is not None else self._current_screen()
+        latest = self.grabber.latest_frame()
+        after_seq = latest[0] if latest else -1
+        sent_at = time.perf_counter()
+        result = dispatch()
+        if hasattr(result, "result"):
+            pressed_at = result.result(self.timeout)[0]
+        else:
+            pressed_at = result if result is not None else sent_at
+
+        latency_ms = self._latency_after(pressed_at, after_seq, self.timeout)
+        self.record(action, screen, latency_ms)
+        return latency_ms
+
+    # --- Observación pasiva ---
+
+    def attach(self, scheduler: InputScheduler):
+        """Empieza a observar las pulsaciones de un planificador de entradas."""
+        scheduler.add_listener(self._on_input)
+        self._schedulers.append(scheduler)
+        if self._worker is None or not self._worker.is_alive():
+            self._running = True
+            self._worker = threading.Thread(target=self._run, name="LatencyProbe", daemon=True)
+            self._worker.start()
+
+    def detach(self):
+        """Deja de observar los planificadores."""
+        for scheduler in self._schedulers:
+            scheduler.remove_listener(self._on_input)
+        self._schedulers.clear()
+        self._running = False
+        self._pending_event.set()
+        if self._worker:
+            self._worker.join(timeout=1.0)
+
+    def _on_input(self, kind, handle, timestamp):
+        # Se llama desde el hilo del planificador: solo se anota la pulsación
+        if kind != PRESS:
+            return
+        latest = self.grabber.latest_frame()
+        self._pending.append((handle.label, self._current_screen(), timestamp, latest[0] if latest else -1))
+        self._pending_event.set()
+
+    def _run(self):
+        while self._running:
+            if not self._pending:
+                self._pending_event.wait(0.5)
+                self._pending_event.clear()
+                continue
+
+            action, screen, pressed_at, after_seq = self._pending.popleft()
+            remaining = self.timeout - (time.perf_counter() - pressed_at)
+            latency_ms = self._latency_after(pressed_at, after_seq, max(0.0, remaining))
+
+            # Si hubo otra pulsación antes del cambio, el cambio no se puede atribuir a una sola
+            if latency_ms is not None and self._pending and self._pending[0][2] < pressed_at + latency_ms / 1000:
+                with self._lock:
+                    self.discarded += 1
+                while self._pending and self._pending[0][2] < pressed_at + latency_ms / 1000:
+                    self._pending.popleft()
+                    with self._lock:
+                        self.discarded += 1
+                continue
+            self.record(action, screen, latency_ms)
+
+    # --- Informe ---
+
+    def report(self) -> dict:
+        """
+        Resumen de los histogramas: número de muestras, pulsaciones sin cambio de
+        pantalla y media / p50 / p90 / p99 / máximo en ms, por acción, pantalla y transición.
+        """
+        with self._lock:
+            return {
+                "by_action": {k: h.summary() for k, h in self.by_action.items()},
+                "by_screen": {k: h.summary() for k, h in self.by_screen.items()},
+                "by_transition": {f"{screen} -> {action}": h.summary()
+                                  for (screen, action), h in self.by_transition.items()},
+                "discarded": self.discarded,
+                "resolution_ms": 1000 * self.grabber.period,
+            }
+
+    def suggested_delay(self, action: str, screen: str | None = None, fraction: float = 0.99,
+                        margin_ms: float = 20.0) -> float | None:
+        """
+        Espera recomendada (en segundos) tras `action`: el percentil indicado de su
+        latencia (de la transición si se da `screen`) más un margen. None si no hay datos.
+        """
+        with self._lock:
+            histogram = self.by_transition.get((screen, action)) if screen is not None else None
+            histogram = histogram or self.by_action.get(action)
+            value = histogram.percentile(fraction) if histogram else None
+        return None if value is None else (value + margin_ms) / 1000
+
+
+def format_latency_report(report: dict) -> str:
+    """Texto legible de `LatencyProbe.report()`, para el log o la consola."""
+    lines = []
+    for title, key in (("Por acción", "by_action"), ("Por pantalla", "by_screen"), ("Por transición", "by_transition")):
+        if not report[key]:
+            continue
+        lines.append(f"{title}:")
+        lines.append(f"  {'':<36}{'n':>5}{'sin cambio':>12}{'p50':>8}{'p90':>8}{'p99':>8}{'máx':>8}")
+        for name, s in sorted(report[key].items()):
+            if s["count"]:
+                lines.append(f"  {name:<36}{s['count']:>5}{s['timeouts']:>12}{s['p50_ms']:>8.0f}"
+                             f"{s['p90_ms']:>8.0f}{s['p99_ms']:>8.0f}{s['max_ms']:>8.0f}")
+            else:
+                lines.append(f"  {name:<36}{0:>5}{s['timeouts']:>12}")
+    lines.append(f"Resolución: {report['resolution_ms']:.0f} ms | muestras descartadas (entradas solapadas): "
+                 f"{report['discarded']}")
+    return "\n".join(lines)
@@ -0,0 +1,220 @@
+# core/macros.py
+
+"""
+Macros de entrada: secuencias de acciones compiladas a una línea de tiempo.
+
+La navegación por menús suele ser una secuencia fija ("abajo x4, confirmar,
+esperar, confirmar"). En lugar de lanzarla acción a acción con
+`execute_action`, la macro se compila una vez a una lista de eventos con su
+instante relativo y se entrega entera al planificador de entradas, que la
+ejecuta con esperas mixtas (dormir + girar) de precisión submilisegundo.
+
+Formato (pasos separados por comas; los nombres son acciones de `config/controls.py`):
+
+    "MOVE_DOWN*4, CONFIRM, wait 500, CONFIRM"
+
+    ACCION          Pulsación con la duración por defecto.
+    ACCION*N        N pulsaciones seguidas.
+    ACCION:150      Pulsación mantenida 150 ms.
+    ACCION+ACCION   Pulsación simultánea (ej. "SPRINT:400+PASS_THROUGH").
+    wait 500        Pausa de 500 ms.
+
+Al reproducirla se mide, para cada evento, la diferencia entre el instante
+programado y el real (`MacroRun.jitter_report`), para poder ajustar los tiempos.
+"""
+
+import re
+import time
+
+from core.input_scheduler import PRESS, RELEASE, InputScheduler
+
+# Duración de cada pulsación y separación entre pasos (segundos)
+DEFAULT_PRESS_DURATION = 0.08
+DEFAULT_GAP = 0.06
+
+_STEP_PATTERN = re.compile(r"^(?P<action>[A-Z_]+)(?::(?P<hold>\d+(?:\.\d+)?))?(?:\*(?P<repeat>\d+))?$")
+_WAIT_PATTERN = re.compile(r"^wait[\s:]+(?P<ms>\d+(?:\.\d+)?)$", re.IGNORECASE)
+
+
+class MacroSyntaxError(ValueError):
+    """La macro no tiene el formato esperado o usa acciones que no existen."""
+
+
+class MacroEvent:
+    """Un evento de la línea de tiempo: pulsar o soltar un control en un instante relativo."""
+
+    __slots__ = ("offset", "kind", "control", "action", "press_id")
+
+    def __init__(self, offset: float, kind: str, control: str, action: str, press_id: int):
+        self.offset = offset        # Segundos desde el inicio de la macro
+        self.kind = kind            # PRESS o RELEASE
+        self.control = control
+        self.action = action
+        self.press_id = press_id    # Pulsación a la que pertenece (une su PRESS y su RELEASE)
+
+    def __repr__(self):
+        return f"MacroEvent({self.offset * 1000:.1f} ms, {self.kind}, {self.action} -> {self.control!r})"
+
+
+class Macro:
+    """Macro compilada: pulsaciones (control, inicio, duración) y su línea de tiempo de eventos."""
+
+    def __init__(self, name: str, presses: list[tuple[str, str, float, float]]):
+        """
+        Args:
+            name (str): Nombre descriptivo (por defecto, el texto de la macro).
+            presses (list): Tuplas (acción, control, inicio, duración) en segundos.
+        """
+        self.name = name
+        self.presses = presses
+        events = []
+        for press_id, (action, control, start, duration) in enumerate(presses):
+            events.append(MacroEvent(start, PRESS, control, action, press_id))
+            events.append(MacroEvent(start + duration, RELEASE, control, action, press_id))
+        events.sort(key=lambda e: (e.offset, e.kind == PRESS))  # A igual instante, primero se suelta
+        self.events = events
+        self.duration = events[-1].offset if events else 0.0
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __repr__(self):
+        return f"Macro({self.name!r}, {len(self.presses)} pulsaciones, {self.duration * 1000:.0f} ms)"
+
+
+def compile_macro(spec: str | list[str], scheme: dict, press_duration: float = DEFAULT_PRESS_DURATION,
+                  gap: float = DEFAULT_GAP, name: str | None = None) -> Macro:
+    """
+    Compila una macro a su línea de tiempo.
+
+    Args:
+        spec (str | list[str]): Texto de la macro o lista de pasos.
+        scheme (dict): Esquema de control activo (KEYBOARD_MAPPING o GAMEPAD_MAPPING).
+        press_duration (float): Duración por defecto de cada pulsación, en segundos.
+        gap (float): Separación entre el final de un paso y el inicio del siguiente.
+        name (str | None): Nombre de la macro.
+
+    Raises:
+        MacroSyntaxError: Si un paso no se entiende o usa una acción que no está en el esquema.
+    """
+    steps = [s.strip() for s in spec.split(",")] if isinstance(spec, str) else [s.strip() for s in spec]
+    presses = []
+    cursor = 0.0
+    after_press = False  # El cursor incluye ya la separación tras la última pulsación
+    for step in steps:
+        if not step:
+            continue
+
+        wait = _WAIT_PATTERN.match(step)
+        if wait:
+            # La pausa sustituye a la separación normal tras una pulsación; las pausas seguidas se suman
+            cursor += float(wait.group("ms")) / 1000 - (gap if after_press else 0.0)
+            after_press = False
+            continue
+
+        # Pulsaciones simultáneas: todas empiezan a la vez; el paso dura lo que la más larga
+        parts = []
+        repeat = 1
+        for part in step.split("+"):
+            match = _STEP_PATTERN.match(part.strip())
+            if not match:
+                raise MacroSyntaxError(f"Paso de macro no válido: '{step}'.")
+            action = match.group("action")
+            control = scheme.get(action)
+            if not control:
+                raise MacroSyntaxError(f"Acción '{action}' no definida en el esquema de control activo.")
+            duration = float(match.group("hold")) / 1000 if match.group("hold") else press_duration
+            parts.append((action, control, duration))
+            repeat = max(repeat, int(match.group("repeat") or 1))
+
+        for _ in range(repeat):
+            for action, control, duration in parts:
+                presses.append((action, control, cursor, duration))
+            cursor += max(duration for _, _, duration in parts) + gap
+        after_press = True
+
+    return Macro(name or (spec if isinstance(spec, str) else ", ".join(steps)), presses)
+
+
+class MacroRun:
+    """Reproducción en curso de una macro: permite esperarla y medir su precisión."""
+
+    def __init__(self, macro: Macro, start: float, handles: list):
+        self.macro = macro
+        self.start = start      # Instante `time.perf_counter()` programado para el inicio
+        self.handles = handles  # Un HoldHandle por pulsación, en el orden de `macro.presses`
+
+    def done(self) -> bool:
+        return all(handle.done() for handle in self.handles)
+
+    def wait(self, timeout: float | None = None) -> "MacroRun":
+        """Espera a que termine la macro. Propaga el error de la primera pulsación que falle."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for handle in self.handles:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            handle.wait(remaining)
+        return self
+
+    def jitter_report(self) -> dict:
+        """
+        Compara los instantes programados con los reales (la macro debe haber terminado).
+
+        Returns:
+            dict: "events" con una entrada por evento (acción, tipo, programado y real en ms desde
+                el inicio, y jitter en ms) y un resumen: media, p95 y máximo del jitter absoluto.
+        """
+        events = []
+        for event in self.macro.events:
+            handle = self.handles[event.press_id]
+            if not handle.future.done() or handle.future.cancelled() or handle.future.exception():
+                continue
+            pressed_at, released_at = handle.future.result()
+            actual = pressed_at if event.kind == PRESS else released_at
+            events.append({
+                "action": event.action,
+                "control": event.control,
+                "kind": event.kind,
+                "scheduled_ms": event.offset * 1000,
+                "actual_ms": (actual - self.start) * 1000,
+                "jitter_ms": (actual - self.start - event.offset) * 1000,
+            })
+
+        jitters = sorted(abs(e["jitter_ms"]) for e in events)
+        summary = {"events": events, "count": len(jitters)}
+        if jitters:
+            summary.update({
+                "mean_ms": sum(jitters) / len(jitters),
+                "p95_ms": jitters[min(len(jitters) - 1, int(0.95 * len(jitters)))],
+                "max_ms": jitters[-1],
+            })
+        return summary
+
+
+def play_macro(macro: Macro, scheduler: InputScheduler, start_delay: float = 0.01) -> MacroRun:
+    """
+    Entrega todos los eventos de la macro al planificador y vuelve sin bloquear.
+
+    Args:
+        macro (Macro): Macro compilada.
+        scheduler (InputScheduler): Planificador del backend que debe ejecutarla.
+        start_delay (float): Margen antes del primer evento para que la programación no lo retrase.
+
+    Returns:
+        MacroRun: Con `wait()` se espera el final y con `jitter_report()` se mide la precisión.
+    """
+    start = time.perf_counter() + start_delay
+    handles = [scheduler.press_at(control, start + offset, duration, label=action)
+               for action, control, offset, duration in macro.presses]
+    return MacroRun(macro, start, handles)
+
+
+def format_jitter_report(report: dict) -> str:
+    """Texto legible del informe de `MacroRun.jitter_report`, para el log."""
+    lines = [f"{'evento':<28}{'programado':>12}{'real':>10}{'jitter':>10}"]
+    for e in report["events"]:
+        label = f"{e['kind']} {e['action']}"
+        lines.append(f"{label:<28}{e['scheduled_ms']:>10.1f}ms{e['actual_ms']:>8.1f}ms{e['jitter_ms']:>8.2f}ms")
+    if report["count"]:
+        lines.append(f"Jitter: media {report['mean_ms']:.3f} ms | p95 {report['p95_ms']:.3f} ms | "
+                     f"máx {report['max_ms']:.3f} ms")
+    return "\n".join(lines)
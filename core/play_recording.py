@@ -0,0 +1,279 @@
+# core/play_recording.py
+
+"""
+Grabación de partidas humanas y reproducción con su ritmo original.
+
+Las secuencias rutinarias de menús (cobrar recompensas, relanzar el partido...)
+se pueden grabar una vez jugándolas a mano y reproducirlas después sin llamar
+a Gemini. `PlayRecorder` lee el flujo de eventos del monitor de acciones
+(`vision/action_monitor.py`) y guarda cada pulsación y liberación de una
+acción en un log binario compacto:
+
+    cabecera    b"EFPR", versión (u16), longitud (u32) y un JSON con la tabla de acciones.
+    registros   12 bytes cada uno (ver RECORD): instante desde el primer evento (f64),
+                dispositivo (u8), tipo (u8: pulsar / soltar) e índice de la acción (u16).
+
+Se graban acciones, no teclas: una partida grabada con teclado se puede
+reproducir con el gamepad. `ReplayRun` entrega las pulsaciones al planificador
+de entradas por tramos, con instantes absolutos (el error no se acumula), y
+mide la deriva de cada pulsación real respecto a la prevista; si el sistema se
+detiene un momento y la deriva supera un umbral, reancla el resto de la
+grabación para que las pulsaciones siguientes no salgan todas de golpe.
+"""
+
+import json
+import struct
+import threading
+import time
+from concurrent.futures import CancelledError
+
+from core.input_events import KEY_DOWN, KEY_UP
+
+FORMAT_VERSION = 1
+MAGIC = b"EFPR"
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<dBBH")
+
+DEVICES = ("keyboard", "gamepad")
+KINDS = (KEY_DOWN, KEY_UP)
+
+
+class PlayRecording:
+    """Grabación cargada: eventos (instante, dispositivo, tipo, acción) con instantes en segundos desde el inicio."""
+
+    def __init__(self, meta: dict, events: list[tuple[float, str, str, str]]):
+        self.meta = meta
+        self.events = events
+        self.duration = events[-1][0] if events else 0.0
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def presses(self) -> list[tuple[str, float, float]]:
+        """
+        Empareja pulsaciones y liberaciones.
+
+        Returns:
+            list: Tuplas (acción, inicio, duración mantenida) ordenadas por inicio. Una
+                pulsación sin liberación se mantiene hasta el final de la grabación; una
+                liberación sin pulsación (la tecla ya estaba pulsada al empezar) se ignora.
+        """
+        open_presses = {}
+        presses = []
+        for t, device, kind, action in self.events:
+            key = (device, action)
+            if kind == KEY_DOWN:
+                open_presses.setdefault(key, t)
+            elif key in open_presses:
+                start = open_presses.pop(key)
+                presses.append((action, start, t - start))
+        for (_, action), start in open_presses.items():
+            presses.append((action, start, self.duration - start))
+        presses.sort(key=lambda p: p[1])
+        return presses
+
+    def __repr__(self):
+        return f"PlayRecording({len(self.events)} eventos, {self.duration:.1f} s)"
+
+
+def load_play_recording(path: str) -> PlayRecording:
+    """
+    Lee un log de `PlayRecorder`.
+
+    Raises:
+        ValueError: Si el fichero no tiene el formato esperado.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"'{path}' no es una grabación de partida.")
+    magic, version, meta_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"'{path}' no es una grabación de partida compatible (versión {version}).")
+    meta = json.loads(data[HEADER.size:HEADER.size + meta_length].decode("utf-8"))
+    actions = meta["actions"]
+
+    body = memoryview(data)[HEADER.size + meta_length:]
+    body = body[:len(body) - len(body) % RECORD.size]  # Un último registro a medias (cierre brusco) se descarta
+    events = [(t, DEVICES[device], KINDS[kind], actions[action]) for t, device, kind, action in RECORD.iter_unpack(body)]
+    return PlayRecording(meta, events)
+
+
+class PlayRecorder:
+    """
+    Graba en disco las acciones que hace el jugador.
+
+    El monitor se lee desde un hilo propio; los registros se escriben según
+    llegan, así que un cierre brusco solo pierde lo que quedaba en el buffer del fichero.
+    """
+
+    def __init__(self, path: str, monitor, name: str | None = None):
+        """
+        Args:
+            path (str): Fichero de salida (se sobrescribe).
+            monitor (ActionMonitor): Monitor de acciones del que se leen los eventos.
+            name (str | None): Nombre descriptivo que se guarda en la cabecera.
+        """
+        self.path = path
+        self.monitor = monitor
+        actions = sorted(set(monitor.key_to_action_map.values()) | set(monitor.gamepad_to_action_map.values()))
+        self._action_index = {action: i for i, action in enumerate(actions)}
+        meta = json.dumps({"name": name, "created": time.time(), "actions": actions}).encode("utf-8")
+
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(meta)))
+        self._file.write(meta)
+        self._header_bytes = HEADER.size + len(meta)
+        self._t0 = None
+        self.events_written = 0
+
+        monitor.start()
+        self._subscription = monitor.subscribe()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="PlayRecorder", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            self._write(self._subscription.wait(timeout=0.2))
+        self._write(self._subscription.poll())
+
+    def _write(self, events):
+        records = []
+        for event in events:
+            action = self.monitor.action_for(event)
+            if action is None or event.kind not in KINDS or event.device not in DEVICES:
+                continue
+            if self._t0 is None:
+                self._t0 = event.timestamp  # La grabación empieza con la primera acción
+            records.append(RECORD.pack(event.timestamp - self._t0, DEVICES.index(event.device),
+                                       KINDS.index(event.kind), self._action_index[action]))
+        if records:
+            self._file.write(b"".join(records))
+            self.events_written += len(records)
+
+    def stats(self) -> dict:
+        """Eventos grabados, bytes escritos y eventos perdidos porque el grabador se quedó atrás."""
+        return {"events": self.events_written, "dropped": self._subscription.dropped,
+                "bytes": self._header_bytes + self.events_written * RECORD.size}
+
+    def stop(self) -> PlayRecording:
+        """Termina la grabación y devuelve la grabación cargada desde disco."""
+        if self._running:
+            self._running = False
+            self._thread.join(timeout=1.0)
+            self._file.close()
+        return load_play_recording(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class ReplayRun:
+    """
+    Reproducción en curso de una grabación sobre un esquema compilado
+    (ver `compile_scheme` en `core/input_controller.py`).
+    """
+
+    def __init__(self, recording: PlayRecording, compiled_scheme, speed: float = 1.0, lookahead: float = 0.25,
+                 resync_threshold: float = 0.05, min_press: float = 0.03, start_delay: float = 0.05):
+        """
+        Args:
+            recording (PlayRecording): Grabación que se reproduce.
+            compiled_scheme (CompiledScheme): Esquema con el que se pulsa cada acción.
+            speed (float): Factor de velocidad (2.0 = el doble de rápido). Escala esperas y pulsaciones.
+            lookahead (float): Segundos de grabación que se entregan por adelantado al planificador.
+            resync_threshold (float): Deriva (s) a partir de la cual se reancla el resto de la grabación.
+            min_press (float): Duración mínima de una pulsación acelerada, para que el juego la registre.
+            start_delay (float): Margen antes de la primera pulsación.
+        """
+        if speed <= 0:
+            raise ValueError("El factor de velocidad debe ser positivo.")
+        self.recording = recording
+        self.speed = speed
+        self.lookahead = lookahead
+        self.resync_threshold = resync_threshold
+
+        self.presses = []   # (acción, inicio, duración) en segundos reales desde el ancla
+        self.skipped = {}   # acción -> veces que no se pudo pulsar (no existe en el esquema)
+        self._handlers = []
+        for action, start, duration in recording.presses():
+            handler = compiled_scheme.handlers.get(action)
+            if handler is None:
+                self.skipped[action] = self.skipped.get(action, 0) + 1
+                continue
+            self.presses.append((action, start / speed, max(min_press, duration / speed)))
+            self._handlers.append(handler)
+
+        self.handles = []   # (HoldHandle, instante previsto, ancla usada) de lo ya entregado al planificador
+        self.resyncs = 0
+        self._anchor = time.perf_counter() + start_delay
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ReplayRun", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        index = 0
+        measured = 0
+        while index < len(self.presses) and not self._stopped.is_set():
+            # Deriva de las pulsaciones que ya han ocurrido
+            while measured < len(self.handles) and self.handles[measured][0].pressed_at is not None:
+                handle, planned, anchor = self.handles[measured]
+                drift = handle.pressed_at - planned
+                measured += 1
+                # Solo reancla la primera pulsación retrasada de cada ancla (las ya entregadas traen el mismo retraso)
+                if drift > self.resync_threshold and anchor == self._anchor:
+                    self._anchor += drift  # Se reancla: lo que queda conserva su ritmo relativo
+                    self.resyncs += 1
+
+            horizon = time.perf_counter() + self.lookahead
+            while index < len(self.presses) and self._anchor + self.presses[index][1] <= horizon:
+                _, start, duration = self.presses[index]
+                planned = self._anchor + start
+                self.handles.append((self._handlers[index].press_at(planned, duration), planned, self._anchor))
+                index += 1
+
+            if index < len(self.presses):
+                next_due = self._anchor + self.presses[index][1] - self.lookahead
+                self._stopped.wait(max(0.0, min(self.lookahead / 2, next_due - time.perf_counter())))
+
+    def done(self) -> bool:
+        return not self._thread.is_alive() and all(handle.done() for handle, _, _ in self.handles)
+
+    def wait(self, timeout: float | None = None) -> "ReplayRun":
+        """Espera a que termine la reproducción."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        self._thread.join(timeout)
+        for handle, _, _ in list(self.handles):
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                handle.wait(remaining)
+            except CancelledError:
+                pass  # Pulsaciones anuladas con stop()
+        return self
+
+    def stop(self):
+        """Detiene la reproducción soltando lo que esté pulsado y anulando lo pendiente."""
+        self._stopped.set()
+        self._thread.join(timeout=1.0)
+        for handle, _, _ in self.handles:
+            if not handle.done():
+                handle.release()
+
+    def report(self) -> dict:
+        """Pulsaciones entregadas, acciones saltadas, reanclajes y deriva (media, p95, máximo en ms)."""
+        drifts = sorted(abs(handle.pressed_at - planned) * 1000 for handle, planned, _ in self.handles
+                        if handle.pressed_at is not None)
+        result = {"presses": len(self.handles), "planned": len(self.presses), "skipped": dict(self.skipped),
+                  "resyncs": self.resyncs, "speed": self.speed}
+        if drifts:
+            result.update({
+                "drift_mean_ms": sum(drifts) / len(drifts),
+                "drift_p95_ms": drifts[min(len(drifts) - 1, int(0.95 * len(drifts)))],
+                "drift_max_ms": drifts[-1],
+            })
+        return result
+
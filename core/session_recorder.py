@@ -0,0 +1,382 @@
+# core/session_recorder.py
+
+"""
+Grabación compacta en disco de sesiones de entrenamiento (capturas y acciones).
+
+Guardar las capturas como imágenes PIL en memoria ocuparía gigabytes en una
+sesión larga. `SessionRecorder` las escribe en una carpeta con este formato:
+
+    meta.json           Versión del formato y parámetros (tamaño de tesela...).
+    index.bin           Una entrada de tamaño fijo por fotograma (ver INDEX_DTYPE).
+    chunk_00000.bin...  Datos de los fotogramas, en ficheros de tamaño acotado
+                        escritos y leídos con `np.memmap`.
+    actions.jsonl       Acciones con marca de tiempo (una por línea).
+
+Cada cierto número de fotogramas (o cuando la pantalla cambia mucho) se guarda
+un fotograma clave completo; el resto se guardan como "delta": solo las
+teselas que difieren del último fotograma clave. Como el delta se calcula
+siempre respecto al clave (no al fotograma anterior), leer cualquier fotograma
+cuesta como mucho un clave y un delta, sin recorrer la sesión. Dos capturas
+casi idénticas de un menú ocupan solo su entrada del índice. Los fotogramas
+clave se guardan comprimidos con zlib.
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+
+KEYFRAME = 0
+DELTA = 1
+KEYFRAME_ZLIB = 2  # Fotograma clave comprimido con zlib (desde la versión 2)
+
+# Tamaño inicial de cada fichero de datos: crece al doble según hace falta, hasta `chunk_bytes`
+INITIAL_CHUNK_BYTES = 8 * 1024 * 1024
+# Nivel de zlib de los fotogramas clave (1 = el más rápido; las capturas de menús comprimen mucho igualmente)
+KEYFRAME_COMPRESSION = 1
+
+# Entrada del índice: dónde está cada fotograma y cómo reconstruirlo
+INDEX_DTYPE = np.dtype([
+    ("timestamp", "<f8"),   # time.time() de la captura
+    ("kind", "u1"),         # KEYFRAME, KEYFRAME_ZLIB o DELTA
+    ("chunk", "<u4"),       # Número de fichero de datos
+    ("offset", "<u8"),      # Posición dentro del fichero
+    ("length", "<u8"),      # Bytes que ocupa
+    ("keyframe", "<i8"),    # Fotograma clave de referencia (él mismo si es clave)
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("tiles", "<u4"),       # Teselas guardadas (0 en un delta = idéntico al clave)
+])
+
+
+def _chunk_name(number: int) -> str:
+    return f"chunk_{number:05d}.bin"
+
+
+class SessionRecorder:
+    """
+    Graba capturas y acciones en una carpeta de sesión.
+
+    Es seguro llamar a `add_frame` y `add_action` desde hilos distintos, también
+    mientras otro hilo llama a `close()`: tras cerrar, lanzan ValueError (como un
+    fichero cerrado) en lugar de escribir en ficheros ya cerrados. También permite
+    leer fotogramas mientras se graba.
+    """
+
+    def __init__(self, path: str, tile_size: int = 32, keyframe_interval: int = 60,
+                 tile_threshold: float = 1.0, max_delta_ratio: float = 0.5, chunk_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            path (str): Carpeta de la sesión (se crea si no existe; no debe contener otra sesión).
+            tile_size (int): Lado en píxeles de cada tesela de los deltas.
+            keyframe_interval (int): Se guarda un fotograma clave al menos cada N fotogramas.
+            tile_threshold (float): Diferencia media (0-255) para considerar que una tesela ha cambiado.
+                Con 0 la grabación es exacta; por encima, se ignoran cambios mínimos (ruido de compresión).
+            max_delta_ratio (float): Si cambia más de esta fracción de teselas, se guarda un clave.
+            chunk_bytes (int): Tamaño máximo de cada fichero de datos. Cada fichero empieza
+                con INITIAL_CHUNK_BYTES y crece según hace falta, así que una sesión corta ocupa poco.
+        """
+        if os.path.exists(os.path.join(path, "index.bin")):
+            raise FileExistsError(f"Ya hay una sesión grabada en '{path}'.")
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.tile_threshold = tile_threshold
+        self.max_delta_ratio = max_delta_ratio
+        self.chunk_bytes = chunk_bytes
+
+        self._lock = threading.Lock()
+        self._index_file = open(os.path.join(path, "index.bin"), "ab")
+        self._actions_file = open(os.path.join(path, "actions.jsonl"), "a", encoding="utf-8")
+        self._chunk = None          # memmap del fichero de datos actual
+        self._chunk_number = -1
+        self._chunk_used = 0
+        self._closed = False
+        self._entries = []          # Copia en memoria del índice (unas decenas de bytes por fotograma)
+        self._keyframe_index = -1
+        self._keyframe_tiles = None  # Último clave como teselas (filas, columnas, t, t, 3)
+        self.frame_count = 0
+        self.bytes_written = 0
+        self.raw_bytes = 0          # Lo que habrían ocupado los fotogramas sin codificar
+
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "tile_size": tile_size, "created": time.time()}, f)
+
+    # --- Escritura ---
+
+    def add_frame(self, image, timestamp: float | None = None) -> int:
+        """
+        Añade una captura a la sesión.
+
+        Args:
+            image (Image.Image | np.ndarray): La captura (se guarda en RGB).
+            timestamp (float | None): Instante `time.time()` de la captura. Por defecto, ahora.
+
+        Returns:
+            int: Índice del fotograma.
+        """
+        frame = np.asarray(image.convert("RGB") if isinstance(image, Image.Image) else image, dtype=np.uint8)
+        timestamp = time.time() if timestamp is None else timestamp
+        height, width = frame.shape[:2]
+        tiles = self._to_tiles(frame)
+
+        with self._lock:
+            if self._closed:
+                raise ValueError("La grabación de la sesión está cerrada.")
+            index = self.frame_count
+            is_key = (
+                self._keyframe_tiles is None
+                or self._keyframe_tiles.shape != tiles.shape
+                or index - self._keyframe_index >= self.keyframe_interval
+            )
+
+            changed = None
+            if not is_key:
+                diff = np.abs(tiles.astype(np.int16) - self._keyframe_tiles).mean(axis=(2, 3, 4))
+                changed = np.flatnonzero(diff > self.tile_threshold).astype(np.uint32)
+                is_key = len(changed) > self.max_delta_ratio * diff.size
+
+            if is_key:
+                payload = np.frombuffer(zlib.compress(np.ascontiguousarray(frame), KEYFRAME_COMPRESSION),
+                                        dtype=np.uint8)
+                kind, keyframe, tile_count = KEYFRAME_ZLIB, index, 0
+                self._keyframe_index = index
+                self._keyframe_tiles = tiles.astype(np.int16)
+            else:
+                rows, cols = tiles.shape[:2]
+                tile_data = tiles.reshape(rows * cols, -1)[changed]
+                payload = np.concatenate([changed.view(np.uint8), tile_data.reshape(-1)])
+                kind, keyframe, tile_count = DELTA, self._keyframe_index, len(changed)
+
+            chunk, offset = self._write(payload)
+            entry = np.array([(timestamp, kind, chunk, offset, payload.size, keyframe, width, height, tile_count)],
+                             dtype=INDEX_DTYPE)
+            self._index_file.write(entry.tobytes())
+            self._index_file.flush()
+            self._entries.append(entry[0])
+            self.frame_count += 1
+            self.raw_bytes += frame.nbytes
+            return index
+
+    def add_action(self, action: str, timestamp: float | None = None, **extra):
+        """
+        Registra una acción (ej. de `ActionMonitor`) asociada al último fotograma grabado.
+
+        Args:
+            action (str): Nombre de la acción (ej. 'CONFIRM').
+            timestamp (float | None): Instante `time.time()` de la acción. Por defecto, ahora.
+            **extra: Campos adicionales que se guardan con la acción.
+        """
+        with self._lock:
+            if self._closed:
+                raise ValueError("La grabación de la sesión está cerrada.")
+            record = {"t": time.time() if timestamp is None else timestamp, "action": action,
+                      "frame": self.frame_count - 1, **extra}
+            self._actions_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._actions_file.flush()
+
+    def _to_tiles(self, frame: np.ndarray) -> np.ndarray:
+        """Divide el fotograma en teselas (filas, columnas, t, t, 3), rellenando los bordes con ceros."""
+        t = self.tile_size
+        height, width = frame.shape[:2]
+        rows, cols = -(-height // t), -(-width // t)
+        if (rows * t, cols * t) != (height, width):
+            padded = np.zeros((rows * t, cols * t, 3), dtype=np.uint8)
+            padded[:height, :width] = frame
+            frame = padded
+        return frame.reshape(rows, t, cols, t, 3).swapaxes(1, 2)
+
+    def _write(self, payload: np.ndarray) -> tuple[int, int]:
+        """Copia los datos en el fichero de datos actual (abre uno nuevo si no caben)."""
+        needed = self._chunk_used + payload.size
+        if self._chunk is not None and needed > self._chunk.size and needed <= self.chunk_bytes:
+            # Crece al doble (sin pasar de chunk_bytes): en NTFS el fichero no es disperso
+            self._resize_chunk(max(needed, min(self.chunk_bytes, 2 * self._chunk.size)))
+        elif self._chunk is None or needed > self._chunk.size:
+            self._close_chunk()
+            self._chunk_number += 1
+            self._chunk = np.memmap(os.path.join(self.path, _chunk_name(self._chunk_number)), dtype=np.uint8,
+                                    mode="w+", shape=(max(min(INITIAL_CHUNK_BYTES, self.chunk_bytes), payload.size),))
+            self._chunk_used = 0
+
+        offset = self._chunk_used
+        self._chunk[offset:offset + payload.size] = payload
+        self._chunk_used += payload.size
+        self.bytes_written += payload.size
+        return self._chunk_number, offset
+
+    def _resize_chunk(self, size: int):
+        """Reabre el fichero de datos actual con otro tamaño (np.memmap amplía el fichero en modo r+)."""
+        self._chunk.flush()
+        chunk_path = self._chunk.filename
+        del self._chunk
+        self._chunk = np.memmap(chunk_path, dtype=np.uint8, mode="r+", shape=(size,))
+
+    def _close_chunk(self):
+        if self._chunk is None:
+            return
+        self._chunk.flush()
+        chunk_path = self._chunk.filename
+        del self._chunk
+        self._chunk = None
+        with open(chunk_path, "r+b") as f:
+            f.truncate(self._chunk_used)
+
+    def close(self):
+        """Vacía y cierra los ficheros. La sesión queda lista para `SessionReader`."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._close_chunk()
+            self._index_file.close()
+            self._actions_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Lectura durante la grabación ---
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def read_frame(self, index: int) -> np.ndarray:
+        """Reconstruye un fotograma ya grabado (ver `SessionReader.read_frame`)."""
+        with self._lock:
+            if self._chunk is not None:
+                self._chunk.flush()
+            entries = np.array(self._entries, dtype=INDEX_DTYPE)
+        return _decode(self.path, entries, index, self.tile_size, {})
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "frames": self.frame_count,
+                "keyframes": sum(1 for e in self._entries if e["kind"] != DELTA),
+                "bytes_written": self.bytes_written,
+                "raw_bytes": self.raw_bytes,
+                "ratio": self.raw_bytes / self.bytes_written if self.bytes_written else 0.0,
+            }
+
+
+class SessionReader:
+    """
+    Lee una sesión grabada con acceso aleatorio por índice de fotograma.
+
+    El índice y los ficheros de datos se abren con `np.memmap`: solo se leen
+    del disco las partes que se usan.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Versión de sesión no soportada: {meta.get('version')}")
+
+        self.path = path
+        self.tile_size = meta["tile_size"]
+        index_path = os.path.join(path, "index.bin")
+        count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+        self.index = (np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", shape=(count,))
+                      if count else np.empty(0, dtype=INDEX_DTYPE))
+        self._chunks = {}
+
+        self.actions = []
+        actions_path = os.path.join(path, "actions.jsonl")
+        if os.path.exists(actions_path):
+            with open(actions_path, encoding="utf-8") as f:
+                self.actions = [json.loads(line) for line in f if line.strip()]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def timestamp(self, index: int) -> float:
+        return float(self.index[index]["timestamp"])
+
+    def read_frame(self, index: int) -> np.ndarray:
+        """
+        Reconstruye un fotograma: su clave de referencia más, si es un delta, sus teselas.
+
+        Returns:
+            np.ndarray: Array (alto, ancho, 3) uint8 en RGB.
+        """
+        return _decode(self.path, self.index, index, self.tile_size, self._chunks)
+
+    def read_image(self, index: int) -> Image.Image:
+        return Image.fromarray(self.read_frame(index))
+
+    def frame_at(self, timestamp: float) -> int:
+        """Índice del último fotograma capturado en o antes de `timestamp` (-1 si no hay)."""
+        return int(np.searchsorted(self.index["timestamp"], timestamp, side="right")) - 1
+
+    def actions_between(self, start: int, end: int) -> list[dict]:
+        """Acciones registradas entre los fotogramas `start` (incluido) y `end` (excluido)."""
+        return [a for a in self.actions if start <= a["frame"] < end]
+
+    def events(self):
+        """
+        Recorre la sesión en orden temporal, intercalando fotogramas y acciones.
+
+        Yields:
+            tuple: ("frame", timestamp, índice) o ("action", timestamp, registro de la acción).
+        """
+        actions = sorted(self.actions, key=lambda a: a["t"])
+        a = 0
+        for index, timestamp in enumerate(self.index["timestamp"]):
+            while a < len(actions) and actions[a]["t"] <= timestamp:
+                yield "action", actions[a]["t"], actions[a]
+                a += 1
+            yield "frame", float(timestamp), index
+        for action in actions[a:]:
+            yield "action", action["t"], action
+
+
+def _decode(path: str, entries: np.ndarray, index: int, tile_size: int, chunks: dict) -> np.ndarray:
+    """Reconstruye el fotograma `index` a partir del índice y los ficheros de datos."""
+    if not 0 <= index < len(entries):
+        raise IndexError(f"No existe el fotograma {index} (la sesión tiene {len(entries)}).")
+
+    def data(entry) -> np.ndarray:
+        chunk = int(entry["chunk"])
+        mapped = chunks.get(chunk)
+        end = int(entry["offset"]) + int(entry["length"])
+        if mapped is None or mapped.size < end:
+            # El fichero puede haber crecido (o estar reservado) si la sesión sigue grabándose
+            mapped = np.memmap(os.path.join(path, _chunk_name(chunk)), dtype=np.uint8, mode="r")
+            chunks[chunk] = mapped
+        return mapped[int(entry["offset"]):end]
+
+    entry = entries[index]
+    key = entries[int(entry["keyframe"])]
+    width, height = int(key["width"]), int(key["height"])
+    if key["kind"] == KEYFRAME_ZLIB:
+        frame = np.frombuffer(zlib.decompress(data(key)), dtype=np.uint8).reshape(height, width, 3).copy()
+    else:
+        frame = np.array(data(key)).reshape(height, width, 3)
+    if entry["kind"] != DELTA or entry["tiles"] == 0:
+        return frame
+
+    t = tile_size
+    rows, cols = -(-height // t), -(-width // t)
+    padded = np.zeros((rows * t, cols * t, 3), dtype=np.uint8)
+    padded[:height, :width] = frame
+    tiles = padded.reshape(rows, t, cols, t, 3).swapaxes(1, 2)
+
+    payload = data(entry)
+    count = int(entry["tiles"])
+    positions = np.frombuffer(payload[:count * 4].tobytes(), dtype=np.uint32)
+    tile_data = payload[count * 4:].reshape(count, t, t, 3)
+    tiles[positions // cols, positions % cols] = tile_data
+    return padded[:height, :width].copy()
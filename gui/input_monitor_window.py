@@ -1,17 +1,18 @@
 # gui/input_monitor_window.py
 
+import time
+from collections import deque
+
 import customtkinter as ctk
-import threading
-from queue import Queue
 
 from .base_window import BaseToplevelWindow  # Cambiado a BaseToplevelWindow
-from pynput import keyboard
-try:
-    from inputs import get_gamepad, UnpluggedError
-except ImportError:
-    get_gamepad = None
+from core.input_events import DEVICE_STATUS, GAMEPAD_AVAILABLE, KEY_DOWN, get_input_bus
 
-from config.controls import KEYBOARD_MAPPING, GAMEPAD_MAPPING
+# Cada cuánto se vacía la cola y cuánto tiempo como máximo puede dedicar cada pasada (ms)
+TICK_MS = 50
+DRAIN_BUDGET_MS = 10
+# Cada cuántas pasadas se refrescan las métricas
+METRICS_EVERY_TICKS = 5
 
 class InputMonitorWindow(BaseToplevelWindow):  # Cambiado a BaseToplevelWindow
     """
@@ -22,12 +23,15 @@ class InputMonitorWindow(BaseToplevelWindow):  # Cambiado a BaseToplevelWindow
         super().__init__(title="Monitor de Entradas", width=600, height=400)
 
         # --- Estado y Lógica ---
-        self.key_to_action_map = {v: k for k, v in KEYBOARD_MAPPING.items()}
-        self.gamepad_to_action_map = {v: k for k, v in GAMEPAD_MAPPING.items()}
+        # Los hooks de teclado y gamepad son del bus compartido: la ventana solo se suscribe
+        self.subscription = None
+        self._closed = False
+        self._ticks = 0
 
-        self.stop_event = threading.Event()
-        self.queue = Queue()
-        self.keyboard_listener = None # Referencia para el listener
+        # --- Métricas ---
+        self._event_times = deque()           # Instantes de los eventos del último segundo
+        self._latencies = deque(maxlen=500)   # Latencia hook -> pantalla de los últimos eventos (s)
+        self._processed = 0
 
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
@@ -69,66 +73,91 @@ class InputMonitorWindow(BaseToplevelWindow):  # Cambiado a BaseToplevelWindow
         self.gamepad_action_label = ctk.CTkLabel(gp_frame, text="---")
         self.gamepad_action_label.grid(row=1, column=1, sticky="w", padx=10)
 
-        if not get_gamepad:
+        if not GAMEPAD_AVAILABLE:
             self.last_gamepad_label.configure(text="Librería 'inputs' no encontrada.", text_color="orange")
 
+        # --- Métricas ---
+        self.metrics_label = ctk.CTkLabel(main_frame, text="Esperando eventos...", justify="left",
+                                          font=ctk.CTkFont(family="Courier", size=12))
+        self.metrics_label.pack(fill="x", padx=10, pady=(15, 0))
+
         ctk.CTkButton(main_frame, text="Cerrar", command=self.on_close).pack(side="bottom", pady=(20, 0))
 
     def start_listeners(self):
-        threading.Thread(target=self._keyboard_listener, daemon=True).start()
-        if get_gamepad:
-            threading.Thread(target=self._gamepad_listener, daemon=True).start()
-
-    def _keyboard_listener(self):
-        # Guardamos la instancia del listener para poder detenerla después
-        self.keyboard_listener = keyboard.Listener(on_press=self._on_key_press)
-        self.keyboard_listener.start()
-        self.keyboard_listener.join()
-
-    def _on_key_press(self, key):
-        if self.stop_event.is_set(): return False
-        key_str = key.char if hasattr(key, 'char') and key.char is not None else key.name
-        self.queue.put(("keyboard", key_str))
-        return True
-
-    def _gamepad_listener(self):
-        try:
-            while not self.stop_event.is_set():
-                for event in get_gamepad():
-                    if event.ev_type == 'Key' and event.state == 1:
-                        self.queue.put(("gamepad", event.code))
-        except (OSError, IOError, UnpluggedError): # Capturamos también el error de desconexión
-            self.queue.put(("gamepad_error", "No se detecta ningún gamepad."))
+        bus = get_input_bus()
+        self.subscription = bus.subscribe(maxsize=1024, kinds=(KEY_DOWN, DEVICE_STATUS))
+        if GAMEPAD_AVAILABLE and bus.gamepad_status:
+            self.last_gamepad_label.configure(text=bus.gamepad_status, text_color="orange")
 
     def process_queue(self):
-        try:
-            source, data = self.queue.get_nowait()
-            if source == "keyboard":
-                self.last_key_label.configure(text=data)
-                action = self.key_to_action_map.get(data)
-                if action:
-                    self.key_action_label.configure(text=f"✅ {action}", text_color="green")
-                else:
-                    self.key_action_label.configure(text="❌ No Mapeada", text_color="red")
-            
-            elif source == "gamepad":
-                self.last_gamepad_label.configure(text=data)
-                action = self.gamepad_to_action_map.get(data)
-                if action:
-                    self.gamepad_action_label.configure(text=f"✅ {action}", text_color="green")
-                else:
-                    self.gamepad_action_label.configure(text="❌ No Mapeada", text_color="red")
-            
-            elif source == "gamepad_error":
-                self.last_gamepad_label.configure(text=data, text_color="orange")
-
-        except Exception:
-            pass
-        
-        self.after(50, self.process_queue)
+        """
+        Vacía la cola del bus en cada pasada (hasta DRAIN_BUDGET_MS) y actualiza las
+        etiquetas una sola vez con el último evento de cada dispositivo.
+        """
+        if self._closed:
+            return
+        started = time.perf_counter()
+        deadline = started + DRAIN_BUDGET_MS / 1000
+        drained = []
+        latest = {}  # Último evento de cada tipo de etiqueta: los intermedios no se llegan a ver
+        while time.perf_counter() < deadline:
+            events = self.subscription.poll(limit=128)
+            if not events:
+                break
+            for event in events:
+                latest["status" if event.kind == DEVICE_STATUS else event.device] = event
+            drained.extend(events)
+
+        for event in sorted(latest.values(), key=lambda e: e.seq):
+            self._show(event)
+
+        if drained:
+            shown_at = time.perf_counter()
+            self._processed += len(drained)
+            self._latencies.extend(shown_at - event.timestamp for event in drained)
+            self._event_times.extend(event.timestamp for event in drained)
+
+        self._ticks += 1
+        if self._ticks % METRICS_EVERY_TICKS == 0:
+            self._update_metrics()
+        self.after(TICK_MS, self.process_queue)
+
+    def _show(self, event):
+        if event.kind == DEVICE_STATUS:
+            self.last_gamepad_label.configure(text=event.control, text_color="orange")
+
+        elif event.device == "keyboard":
+            self.last_key_label.configure(text=event.control)
+            if event.action:
+                self.key_action_label.configure(text=f"✅ {event.action}", text_color="green")
+            else:
+                self.key_action_label.configure(text="❌ No Mapeada", text_color="red")
+
+        elif event.device == "gamepad":
+            self.last_gamepad_label.configure(text=event.control)
+            if event.action:
+                self.gamepad_action_label.configure(text=f"✅ {event.action}", text_color="green")
+            else:
+                self.gamepad_action_label.configure(text="❌ No Mapeada", text_color="red")
+
+    def _update_metrics(self):
+        """Eventos por segundo, profundidad de la cola, descartes y latencia hook -> pantalla."""
+        now = time.perf_counter()
+        while self._event_times and self._event_times[0] < now - 1.0:
+            self._event_times.popleft()
+        if not self._processed:
+            return
+        latencies = sorted(self._latencies)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        self.metrics_label.configure(text=(
+            f"Eventos/s: {len(self._event_times):>4} | Total: {self._processed} | "
+            f"Cola: {self.subscription.pending()} | Descartados: {self.subscription.dropped}\n"
+            f"Latencia (hook -> pantalla): media {1000 * sum(latencies) / len(latencies):.1f} ms | "
+            f"p95 {1000 * p95:.1f} ms | máx {1000 * latencies[-1]:.1f} ms"
+        ))
 
     def on_close(self):
-        self.stop_event.set()
-        if self.keyboard_listener:
-            self.keyboard_listener.stop()
+        self._closed = True
+        if self.subscription:
+            self.subscription.close()
         self.destroy()
@@ -1,10 +1,15 @@
 # La ventana de prueba para el gamepad/teclado.
 # gui/input_test_window.py
 
-import time
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
 import customtkinter as ctk
 from .base_window import BaseToplevelWindow  # Cambiado a BaseToplevelWindow
-from core.input_controller import execute_action
+from .log_view import LogView
+from core.input_controller import (DEFAULT_PRESS_DURATION, execute_action, execute_actions, format_timing_report,
+                                   timing_report)
 from config import controls
 from config.controls import (
     MOVE_UP, MOVE_DOWN, MOVE_LEFT, MOVE_RIGHT, CONFIRM, BACK, PAUSE_MENU,
@@ -12,6 +17,9 @@ from config.controls import (
     CHANGE_PLAYER, CALL_SECOND_DEFENDER
 )
 
+# Segundos de cuenta atrás antes de pulsar, para cambiar a la ventana del juego
+COUNTDOWN_SECONDS = 3
+
 
 class InputTestWindow(BaseToplevelWindow):  # Cambiado a BaseToplevelWindow
     def __init__(self):
@@ -24,6 +32,12 @@ class InputTestWindow(BaseToplevelWindow):  # Cambiado a BaseToplevelWindow
 
         # Almacenaremos los botones para poder actualizar sus etiquetas
         self.action_buttons = []
+
+        # Las pulsaciones se lanzan en un hilo aparte; sus resultados vuelven a la GUI por una cola
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="InputTest")
+        self._results = queue.Queue()
+        self._busy = False
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         # --- Frame Principal ---
         self.grid_columnconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=2)
@@ -45,6 +59,10 @@ class InputTestWindow(BaseToplevelWindow):  # Cambiado a BaseToplevelWindow
         ctk.CTkRadioButton(scheme_frame, text="Gamepad", variable=self.current_scheme, value="Gamepad").pack(side="left", padx=10)
 
         # --- Contenedor para todos los botones de acción ---
+        # --- Autotest: todas las acciones de los dos esquemas ---
+        self.run_all_button = ctk.CTkButton(control_panel, text="Probar todas las acciones", command=self.on_run_all_click)
+        self.run_all_button.pack(fill="x", padx=20, pady=(0, 5))
+
         actions_container = ctk.CTkScrollableFrame(control_panel, label_text="Acciones del Juego")
         actions_container.pack(fill="both", expand=True, padx=10, pady=10)
 
@@ -84,11 +102,11 @@ class InputTestWindow(BaseToplevelWindow):  # Cambiado a BaseToplevelWindow
         log_panel.grid_rowconfigure(0, weight=1)
         log_panel.grid_columnconfigure(0, weight=1)
 
-        self.log_textbox = ctk.CTkTextbox(log_panel, wrap="word", state="disabled")
-        self.log_textbox.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        self.log_view = LogView(log_panel, name="input_test")
+        self.log_view.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
 
         self._log("Simulador iniciado. Selecciona un modo y una acción.", "white")
-        self._log("ADVERTENCIA: Las acciones se ejecutarán en la ventana activa tras 3 segundos.", "orange")
+        self._log(f"ADVERTENCIA: Las acciones se ejecutarán en la ventana activa tras {COUNTDOWN_SECONDS} segundos.", "orange")
 
         # Actualizar etiquetas de botones al iniciar
         self.update_button_labels()
@@ -106,24 +124,71 @@ class InputTestWindow(BaseToplevelWindow):  # Cambiado a BaseToplevelWindow
         return button
 
     def on_button_click(self, action: str):
-        """Llama a la lógica del controlador y muestra el resultado."""
-        self._log(f"Ejecutando '{action}' en 3 segundos...", "cyan")
-        self.update() # Forzar actualización de la GUI
-        time.sleep(3)
-
+        """Pulsa una acción tras la cuenta atrás, sin bloquear la GUI."""
         active_scheme = controls.KEYBOARD_MAPPING if self.current_scheme.get() == "Teclado" else controls.GAMEPAD_MAPPING
-        message = execute_action(action, active_scheme)
-        
-        color = "red" if "Error" in message else "lightgreen"
-        self._log(message, color)
+        self._start_job(f"Ejecutando '{action}'", lambda: execute_action(action, active_scheme), self._show_result)
+
+    def on_run_all_click(self):
+        """Pulsa todas las acciones de los dos esquemas, una tras otra, y muestra el informe de tiempos."""
+        def run_all():
+            reports = []
+            for name, scheme in (("Teclado", controls.KEYBOARD_MAPPING), ("Gamepad", controls.GAMEPAD_MAPPING)):
+                results = execute_actions(list(scheme), scheme, duration=DEFAULT_PRESS_DURATION)
+                reports.append((name, timing_report(results, DEFAULT_PRESS_DURATION)))
+            return reports
+        self._start_job("Probando todas las acciones", run_all, self._show_reports)
+
+    def _start_job(self, description: str, job, on_result):
+        """Cuenta atrás con `after` y después lanza `job` en el hilo de trabajo."""
+        if self._busy:
+            self._log("Espera a que termine la prueba en curso.", "orange")
+            return
+        self._busy = True
+        self.run_all_button.configure(state="disabled")
+        self._countdown(description, COUNTDOWN_SECONDS, job, on_result)
+
+    def _countdown(self, description: str, remaining: int, job, on_result):
+        if remaining > 0:
+            self._log(f"{description} en {remaining}...", "cyan")
+            self.after(1000, self._countdown, description, remaining - 1, job, on_result)
+            return
+        future = self._worker.submit(job)
+        future.add_done_callback(lambda f: self._results.put((f, on_result)))
+        self.after(20, self._poll_results)
+
+    def _poll_results(self):
+        """Recoge en el hilo de la GUI el resultado del hilo de trabajo."""
+        try:
+            future, on_result = self._results.get_nowait()
+        except queue.Empty:
+            self.after(20, self._poll_results)
+            return
+        self._busy = False
+        self.run_all_button.configure(state="normal")
+        try:
+            on_result(future.result())
+        except Exception as e:
+            self._log(f"Error inesperado durante la prueba: {e}", "red")
+
+    def _show_result(self, result):
+        if result.ok:
+            self._log(f"{result} ({result.duration * 1000:.0f} ms)", "lightgreen")
+        else:
+            self._log(str(result), "red")
+
+    def _show_reports(self, reports):
+        for name, report in reports:
+            color = "lightgreen" if report["ok"] == report["count"] else "orange"
+            self._log(f"--- {name} ---\n{format_timing_report(report)}", color)
+
+    def on_close(self):
+        self._worker.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
 
     def _log(self, message: str, color: str):
-        """Añade un mensaje al log con un color específico."""
-        self.log_textbox.configure(state="normal")
-        timestamp = time.strftime('%H:%M:%S')
-        self.log_textbox.insert("end", f"[{timestamp}] {message}\n")
-        self.log_textbox.configure(state="disabled")
-        self.log_textbox.see("end")
+        """Añade un mensaje al log con un color específico (rojo = error, naranja = aviso)."""
+        level = {"red": logging.ERROR, "orange": logging.WARNING}.get(color, logging.INFO)
+        self.log_view.log(message, level=level, color=None if color == "white" else color)
 
     def update_button_labels(self, *args):
         """Actualiza el texto de los botones para mostrar la tecla/botón correspondiente."""
@@ -0,0 +1,134 @@
+# gui/log_view.py
+
+import logging
+import time
+from collections import deque
+
+import customtkinter as ctk
+
+from config.settings import LOG_VIEW_FLUSH_MS, LOG_VIEW_MAX_LINES
+from utils.logger import log as app_log
+
+# Prefijos de los mensajes de la GUI ("WARNING: ...") y su nivel de logging
+PREFIX_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "SUCCESS": logging.INFO,
+    "LISTENING": logging.INFO,
+    "ANALYSIS": logging.INFO,
+    "ACTION": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ADVERTENCIA": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+# Opciones del filtro -> nivel mínimo que se muestra
+FILTERS = {
+    "Todo": logging.DEBUG,
+    "Avisos": logging.WARNING,
+    "Errores": logging.ERROR,
+}
+LEVEL_COLORS = {
+    logging.WARNING: "orange",
+    logging.ERROR: "red",
+}
+
+
+class LogView(ctk.CTkFrame):
+    """
+    Panel de log para sesiones largas.
+
+    Las líneas se guardan en un buffer circular de `max_lines` (las más antiguas se
+    descartan) y se vuelcan al textbox en bloque cada `LOG_VIEW_FLUSH_MS`, con un solo
+    cambio de estado por volcado. El textbox nunca supera `max_lines` líneas. El
+    historial completo se escribe en el logger de la aplicación (logs/app.log).
+
+    Se usa desde el hilo de Tk.
+    """
+
+    def __init__(self, master, name: str, max_lines: int = LOG_VIEW_MAX_LINES, **kwargs):
+        """
+        Args:
+            master: Widget padre.
+            name (str): Nombre del panel en el logger de la aplicación (ej. 'training').
+            max_lines (int): Líneas que se conservan en el panel.
+        """
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.max_lines = max_lines
+        self.logger = app_log.getChild(name)
+        self._entries = deque(maxlen=max_lines)  # (nivel, texto, color)
+        self._pending = []
+        self._flush_id = None
+        self._min_level = logging.DEBUG
+        self._tags = set()
+
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.filter_var = ctk.StringVar(value="Todo")
+        ctk.CTkSegmentedButton(self, values=list(FILTERS), variable=self.filter_var,
+                               command=self._on_filter_changed).grid(row=0, column=0, sticky="e", pady=(0, 5))
+
+        self.textbox = ctk.CTkTextbox(self, wrap="word", state="disabled")
+        self.textbox.grid(row=1, column=0, sticky="nsew")
+
+    def log(self, message: str, level: int | None = None, color: str | None = None):
+        """
+        Añade un mensaje. No toca el textbox: se pinta en el siguiente volcado.
+
+        Args:
+            message (str): Texto (puede ocupar varias líneas).
+            level (int | None): Nivel de logging. Por defecto se deduce del prefijo ("ERROR: ...").
+            color (str | None): Color del texto. Por defecto, el del nivel.
+        """
+        if level is None:
+            level = PREFIX_LEVELS.get(message.split(":", 1)[0].strip(), logging.INFO)
+        self.logger.log(level, message)
+        entry = (level, f"[{time.strftime('%H:%M:%S')}] {message}", color or LEVEL_COLORS.get(level))
+        self._entries.append(entry)
+        self._pending.append(entry)
+        if self._flush_id is None:
+            self._flush_id = self.after(LOG_VIEW_FLUSH_MS, self._flush)
+
+    def _flush(self):
+        self._flush_id = None
+        entries = [e for e in self._pending[-self.max_lines:] if e[0] >= self._min_level]
+        self._pending.clear()
+        if entries:
+            self._render(entries)
+
+    def _render(self, entries, replace: bool = False):
+        # Solo se sigue el final si el usuario no se ha desplazado hacia arriba para leer
+        at_bottom = replace or self.textbox.yview()[1] >= 0.999
+        self.textbox.configure(state="normal")
+        if replace:
+            self.textbox.delete("1.0", "end")
+        for _, text, color in entries:
+            if color and color not in self._tags:
+                self.textbox.tag_config(color, foreground=color)
+                self._tags.add(color)
+            self.textbox.insert("end", text + "\n", color or ())
+        excess = int(self.textbox.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.textbox.delete("1.0", f"{excess + 1}.0")
+        self.textbox.configure(state="disabled")
+        if at_bottom:
+            self.textbox.see("end")
+
+    def _on_filter_changed(self, value: str):
+        self._min_level = FILTERS[value]
+        self._pending.clear()  # Ya están en el buffer: se pintan al redibujar
+        self._render([e for e in self._entries if e[0] >= self._min_level], replace=True)
+
+    def clear(self):
+        """Vacía el panel (el historial en disco se conserva)."""
+        self._entries.clear()
+        self._pending.clear()
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        self.textbox.configure(state="disabled")
+
+    def destroy(self):
+        if self._flush_id is not None:
+            self.after_cancel(self._flush_id)
+            self._flush_id = None
+        super().destroy()
@@ -1,9 +1,6 @@
 # gui/main_window.py
 import customtkinter as ctk
 from .base_window import BaseWindow
-from gui.input_test_window import InputTestWindow
-from gui.vision_training_window import VisionTrainingWindow
-from gui.input_monitor_window import InputMonitorWindow
 from utils.logger import log
 
 class MainWindow(BaseWindow):
@@ -56,16 +53,20 @@ class MainWindow(BaseWindow):
     def open_input_simulator(self):
         """Abre la ventana de simulación de acciones."""
         log.info("Botón 'Probar Controles (Simulador)' presionado.")
+        # Las ventanas se importan al abrirlas: cada una arrastra sus dependencias (entrada, captura, visión)
+        from gui.input_test_window import InputTestWindow
         self._open_window(InputTestWindow, "win_input_test")
 
     def open_input_monitor(self):
         """Abre la ventana de monitoreo de entradas en tiempo real."""
         log.info("Botón 'Monitorear Entradas (Real-Time)' presionado.")
+        from gui.input_monitor_window import InputMonitorWindow
         self._open_window(InputMonitorWindow, "win_input_monitor")
 
     def open_vision_trainer(self):
         """Crea y muestra la ventana de entrenamiento del módulo de visión."""
         log.info("Botón 'Entrenar Módulo de Visión' presionado.")
+        from gui.vision_training_window import VisionTrainingWindow
         self._open_window(VisionTrainingWindow, "win_vision_trainer", self)
 
     def on_close(self):
@@ -0,0 +1,54 @@
+# gui/region_selector.py
+
+import customtkinter as ctk
+
+
+class RegionSelector(ctk.CTkToplevel):
+    """
+    Una ventana de superposición para que el usuario seleccione una región de la pantalla.
+    """
+    def __init__(self):
+        super().__init__()
+        self.withdraw() # Ocultar la ventana al inicio
+
+        # Configuración para que ocupe toda la pantalla y sea semitransparente
+        self.attributes("-fullscreen", True)
+        self.attributes("-alpha", 0.3)
+        self.configure(fg_color="black")
+        self.protocol("WM_DELETE_WINDOW", self.cancel_selection)
+
+        self.canvas = ctk.CTkCanvas(self, bg="black", highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+
+        self.start_x = None
+        self.start_y = None
+        self.rect = None
+        self.bbox = None
+
+        self.canvas.bind("<ButtonPress-1>", self.on_button_press)
+        self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.on_button_release)
+        self.bind("<Escape>", self.cancel_selection)
+
+        self.deiconify() # Mostrar la ventana
+        self.lift()
+        self.focus_force()
+
+    def on_button_press(self, event):
+        self.start_x = self.canvas.canvasx(event.x)
+        self.start_y = self.canvas.canvasy(event.y)
+        if not self.rect:
+            self.rect = self.canvas.create_rectangle(self.start_x, self.start_y, self.start_x, self.start_y, outline='red', width=2)
+
+    def on_mouse_drag(self, event):
+        cur_x, cur_y = (self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        self.canvas.coords(self.rect, self.start_x, self.start_y, cur_x, cur_y)
+
+    def on_button_release(self, event):
+        end_x, end_y = (self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        self.bbox = (min(self.start_x, end_x), min(self.start_y, end_y), max(self.start_x, end_x), max(self.start_y, end_y))
+        self.destroy()
+
+    def cancel_selection(self, event=None):
+        self.bbox = None
+        self.destroy()
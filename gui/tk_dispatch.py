@@ -0,0 +1,61 @@
+# gui/tk_dispatch.py
+
+import queue
+
+
+class TkDispatcher:
+    """
+    Traslada llamadas de cualquier hilo al hilo de Tk.
+
+    Los callbacks de los hilos de trabajo (monitor de acciones, capturas...) no
+    pueden tocar widgets, y tampoco llamar a Tk (ni a `event_generate`): con un
+    Tcl sin soporte de hilos eso corrompe el intérprete. `call()` solo encola la
+    función en una cola segura entre hilos; el propio hilo de Tk la vacía con un
+    sondeo `after` cada `poll_ms`, así que ninguna llamada a Tk sale de su hilo.
+    """
+
+    def __init__(self, widget, poll_ms: int = 20):
+        """
+        Args:
+            widget: Widget de Tk en cuyo hilo se ejecutan las llamadas.
+            poll_ms (int): Cada cuánto se revisa la cola (retraso máximo de una llamada).
+        """
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._poll_id = widget.after(poll_ms, self._poll)
+
+    def call(self, function, *args):
+        """Ejecuta `function(*args)` en el hilo de Tk. Se puede llamar desde cualquier hilo."""
+        if not self._closed:
+            self._queue.put((function, args))
+
+    def wrap(self, function):
+        """Devuelve una versión de `function` que, llamada desde cualquier hilo, se ejecuta en el de Tk."""
+        return lambda *args: self.call(function, *args)
+
+    def _drain(self):
+        while True:
+            try:
+                function, args = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"ADVERTENCIA: Fallo en una llamada trasladada a la GUI: {e}")
+
+    def _poll(self):
+        self._poll_id = None
+        if self._closed:
+            return
+        self._drain()
+        self._poll_id = self.widget.after(self.poll_ms, self._poll)
+
+    def close(self):
+        """Deja de aceptar llamadas y de sondear la cola (al cerrar la ventana). Desde el hilo de Tk."""
+        self._closed = True
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
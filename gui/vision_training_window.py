@@ -1,12 +1,22 @@
 # gui/vision_training_window.py
 
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import customtkinter as ctk
 from tkinter import messagebox
 
 # Importamos las clases y configuraciones necesarias
 from vision.action_monitor import ActionMonitor
 from config.controls import KEYBOARD_MAPPING, GAMEPAD_MAPPING
-from core.screen_capture import capture_window, capture_region_interactive
+from config.settings import GEMINI_MAX_CONCURRENCY, SCREEN_CHANGE_TIMEOUT, SCREEN_SETTLE_MS, TRAINING_SESSIONS_DIR
+from core.session_recorder import SessionRecorder
+from core.screen_capture import capture_region_interactive, wait_for_screen_change
+from .log_view import LogView
+from .tk_dispatch import TkDispatcher
 
 
 class VisionTrainingWindow(ctk.CTkToplevel):
@@ -22,9 +32,26 @@ class VisionTrainingWindow(ctk.CTkToplevel):
 
         # --- Estado y Lógica ---
         self.action_monitor = None
+        self.recorder = None
         self.is_session_active = False
         self.node_counter = 0
 
+        # --- Pipeline de captura y análisis ---
+        # La captura va en un hilo (en orden) y el análisis en un pool; los resultados vuelven
+        # a la GUI por una cola y se registran en el log en el orden en que se capturaron.
+        self._capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TrainingCapture")
+        self._analysis_pool = ThreadPoolExecutor(max_workers=GEMINI_MAX_CONCURRENCY, thread_name_prefix="TrainingAnalysis")
+        self._results = queue.Queue()
+        self._pending = {}       # número de nodo -> resultado listo para el log, esperando a los anteriores
+        self._next_to_log = 1    # Siguiente nodo que toca registrar
+        self._analyzer = None
+        self._analyzer_lock = threading.Lock()
+        self._analyzer_failed = False
+        self._draining = False
+
+        # Los avisos del monitor de acciones llegan desde el hilo del bus de entrada
+        self.dispatcher = TkDispatcher(self)
+
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # --- Frame Principal ---
@@ -55,24 +82,26 @@ class VisionTrainingWindow(ctk.CTkToplevel):
         self.save_map_button = ctk.CTkButton(controls_frame, text="Guardar Mapa de Navegación", command=self.save_map, state="disabled")
         self.save_map_button.pack(side="left", padx=10, pady=10)
 
+        # Con la captura automática, cada acción registrada dispara la captura de la pantalla siguiente
+        self.auto_capture_var = ctk.BooleanVar(value=False)
+        self.auto_capture_checkbox = ctk.CTkCheckBox(controls_frame, text="Captura automática", variable=self.auto_capture_var)
+        self.auto_capture_checkbox.pack(side="left", padx=10, pady=10)
+
         # --- Log de la Sesión ---
         log_frame = ctk.CTkFrame(self)
         log_frame.grid(row=2, column=0, padx=20, pady=(10, 20), sticky="nsew")
         log_frame.grid_rowconfigure(0, weight=1)
         log_frame.grid_columnconfigure(0, weight=1)
 
-        self.log_text = ctk.CTkTextbox(log_frame, wrap="word", state="disabled")
-        self.log_text.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        self.log_view = LogView(log_frame, name="training")
+        self.log_view.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
 
         # Estado inicial
         self._update_instructions("info", "Haz clic en 'Iniciar Sesión' para comenzar el proceso de mapeo de pantallas.")
 
     def _log(self, message):
-        """Añade un mensaje al área de log."""
-        self.log_text.configure(state="normal")
-        self.log_text.insert("end", message + "\n")
-        self.log_text.configure(state="disabled")
-        self.log_text.see("end")
+        """Añade un mensaje al área de log (el nivel se deduce del prefijo, ej. 'WARNING:')."""
+        self.log_view.log(message)
 
     def _update_instructions(self, state, text):
         """Actualiza el panel de instrucciones con un color y texto específicos."""
@@ -94,9 +123,23 @@ class VisionTrainingWindow(ctk.CTkToplevel):
         self._log("INFO: Iniciando nueva sesión de entrenamiento.")
         self.is_session_active = True
         self.node_counter = 0
+        if self.action_monitor:
+            self.action_monitor.stop()
         self.action_monitor = ActionMonitor(KEYBOARD_MAPPING, GAMEPAD_MAPPING)
+        self.action_monitor.start()  # Los listeners quedan activos toda la sesión
         self._log("INFO: Monitor de acciones iniciado. Esperando primer análisis.")
 
+        # Cada sesión se graba en disco (capturas + acciones) para poder revisarla o reentrenar después
+        if self.recorder:
+            self.recorder.close()
+        session_path = os.path.join(TRAINING_SESSIONS_DIR, time.strftime("%Y%m%d_%H%M%S"))
+        try:
+            self.recorder = SessionRecorder(session_path)
+            self._log(f"INFO: Grabando la sesión en '{session_path}'.")
+        except OSError as e:
+            self.recorder = None
+            self._log(f"WARNING: No se pudo crear la grabación de la sesión: {e}")
+
         # Actualizamos la GUI
         self.start_session_button.configure(state="disabled")
         self.analyze_button.configure(state="normal")
@@ -107,78 +150,203 @@ class VisionTrainingWindow(ctk.CTkToplevel):
             "PASO 1: Ve a la primera pantalla del juego que quieras mapear. Cuando estés listo, vuelve y haz clic en 'Analizar Pantalla Completa' o 'Analizar Región'."
         )
 
-    def analyze_screen(self, is_region: bool = False):
-        """Analiza la pantalla actual, registra la acción previa y se prepara para la siguiente."""
+    def analyze_screen(self, is_region: bool = False, auto: bool = False):
+        """
+        Captura la pantalla actual y registra la acción previa. La captura y el análisis
+        siguen en segundo plano: se puede pasar a la siguiente pantalla sin esperar a Gemini.
+
+        Args:
+            is_region (bool): Seleccionar una región en lugar de la pantalla completa.
+            auto (bool): Captura automática tras una acción: no se oculta la ventana (el juego
+                conserva el foco) y se espera a que la pantalla cambie y se estabilice.
+        """
         if not self.is_session_active:
             return
 
         # 1. Capturar la acción que nos trajo a esta pantalla
         captured_action = self.action_monitor.get_captured_action() # Esto es seguro, devuelve None si no hay nada
-        
-        # Ocultar temporalmente la GUI para no interferir con la captura
-        self.withdraw()
-        self.after(200) # Pequeña pausa para que la ventana se oculte
+        if captured_action and self.recorder:
+            # Se asocia a la pantalla anterior: es la acción que se hizo desde ella
+            self.recorder.add_action(captured_action, timestamp=self.action_monitor.last_action_time)
+
+        self.node_counter += 1
+        node = {"number": self.node_counter, "id": f"Node-{self.node_counter}", "action": captured_action,
+                "is_region": is_region, "auto": auto, "started": time.perf_counter()}
+        self.analyze_button.configure(state="disabled")
+        self.analyze_region_button.configure(state="disabled")
+
+        if not auto:
+            # Ocultar temporalmente la GUI para no interferir con la captura
+            self.withdraw()
+            self.update_idletasks()
 
         # 2. Capturar la imagen (pantalla completa o región)
         if is_region:
+            # La selección de región es interactiva y usa Tk: se hace aquí, el análisis sigue en segundo plano
             self._log("INFO: Iniciando captura de región. Dibuja un rectángulo en la pantalla.")
             image = capture_region_interactive()
+            self._capture_pool.submit(self._process_capture, node, lambda: image)
+        elif auto:
+            # La acción acaba de llegar: se espera a que el juego cambie de pantalla y termine la transición
+            self._capture_pool.submit(self._process_capture, node,
+                                      lambda: wait_for_screen_change(require_change=True, settle_ms=SCREEN_SETTLE_MS,
+                                                                     timeout=SCREEN_CHANGE_TIMEOUT))
         else:
-            image = capture_window()
-        
-        # Volver a mostrar la GUI
-        self.deiconify()
-
+            # En lugar de una pausa fija, se captura en cuanto la ventana se ha ocultado y la pantalla está estable
+            self._capture_pool.submit(self._process_capture, node,
+                                      lambda: wait_for_screen_change(require_change=False, settle_ms=100, timeout=1.0))
+        if not self._draining:
+            self._draining = True
+            self.after(20, self._drain_results)
+
+    # --- Pipeline (hilos de trabajo) ---
+
+    def _process_capture(self, node: dict, capture):
+        """Hilo de captura: toma la imagen, la graba y encarga su análisis."""
+        try:
+            image = capture()
+        except Exception as e:
+            print(f"ADVERTENCIA: Fallo al capturar la pantalla: {e}")
+            image = None
+        self._results.put(("captured", node, image is not None))
         if image is None:
-            self._log("ERROR: La captura de pantalla fue cancelada o falló.")
             return
-
-        # 3. Lógica de análisis de la pantalla (aquí irá la llamada a Gemini con la 'image')
-        # Por ahora, simulamos la creación de un nodo
-        self.node_counter += 1
-        current_node_id = f"Node-{self.node_counter}"
-        analysis_type = "Región" if is_region else "Pantalla completa"
-        self._log(f"ANALYSIS: {analysis_type} analizada. Creado {current_node_id}.")
-
-        if captured_action:
-            # Mensaje más claro para el usuario
-            self._log(f"ACTION: La acción '{captured_action}' te trajo a esta pantalla.")
-            # Aquí es donde crearíamos la arista en nuestro grafo de navegación
+        recorder = self.recorder
+        try:
+            if recorder:
+                recorder.add_frame(image)
+            self._analysis_pool.submit(self._process_analysis, node, image)
+        except (ValueError, RuntimeError):
+            return  # La ventana (o la sesión) se ha cerrado mientras se capturaba
+
+    def _process_analysis(self, node: dict, image):
+        """Hilo de análisis: preprocesa y analiza la captura (caché, clasificador local o Gemini)."""
+        analyzer = self._get_analyzer()
+        analysis = None
+        if analyzer is not None:
+            try:
+                analysis = analyzer.analyze_screen(image)
+            except Exception as e:
+                print(f"ADVERTENCIA: Fallo al analizar la captura de {node['id']}: {e}")
+        node["elapsed"] = time.perf_counter() - node["started"]
+        self._results.put(("analyzed", node, analysis))
+
+    def _get_analyzer(self):
+        """Crea el analizador la primera vez. Si no se puede (ej. sin API Key), los nodos se crean sin análisis."""
+        with self._analyzer_lock:
+            if self._analyzer is None and not self._analyzer_failed:
+                try:
+                    from vision.gemini_analyzer import create_default_analyzer
+                    self._analyzer = create_default_analyzer()
+                except Exception as e:
+                    self._analyzer_failed = True
+                    self._results.put(("warning", None, f"WARNING: Análisis no disponible, se crearán nodos sin analizar: {e}"))
+            return self._analyzer
+
+    # --- Resultados (hilo de la GUI) ---
+
+    def _drain_results(self):
+        """Aplica en la GUI los resultados del pipeline. Se reprograma mientras quede trabajo pendiente."""
+        while True:
+            try:
+                kind, node, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "captured":
+                self._on_captured(node, payload)
+            elif kind == "analyzed":
+                self._pending[node["number"]] = (node, payload)
+            elif kind == "warning":
+                self._log(payload)
+
+        # El log de nodos y aristas se escribe en el orden de captura, aunque los análisis terminen desordenados
+        while self._next_to_log in self._pending:
+            node, analysis = self._pending.pop(self._next_to_log)
+            self._log_node(node, analysis)
+            self._next_to_log += 1
+
+        if self._next_to_log <= self.node_counter:
+            self.after(50, self._drain_results)
         else:
-            self._log("ACTION: (Es la primera pantalla, no hay acción previa)")
+            self._draining = False
+
+    def _on_captured(self, node: dict, ok: bool):
+        if not node["auto"]:
+            # Volver a mostrar la GUI
+            self.deiconify()
+        if not ok:
+            self.node_counter -= 1  # Es siempre el último nodo: hasta que termine su captura no se puede pedir otra
+            if node["auto"]:
+                self._log(f"WARNING: La pantalla no cambió en {SCREEN_CHANGE_TIMEOUT:.0f} s tras la acción '{node['action']}'. "
+                          "Captúrala manualmente con 'Analizar Pantalla'.")
+                self._update_instructions(
+                    "action_needed",
+                    "No se detectó la pantalla siguiente. Comprueba el juego y haz clic en 'Analizar Pantalla' o 'Analizar Región'."
+                )
+            else:
+                self._log("ERROR: La captura de pantalla fue cancelada o falló.")
+            self.analyze_button.configure(state="normal")
+            self.analyze_region_button.configure(state="normal")
+            return
 
-        # 4. Prepararse para la siguiente acción
-        self.analyze_button.configure(state="disabled") # Desactivar botón mientras se escucha
-        self.analyze_region_button.configure(state="disabled")
+        # 3. Prepararse para la siguiente acción sin esperar al análisis
         self._update_instructions(
             "listening",
             "PASO 2: ¡Escuchando! Ahora ve al juego y realiza UNA SOLA ACCIÓN para ir a la siguiente pantalla (ej. pulsar 'Enter', 'Abajo'...). La acción se registrará automáticamente."
         )
-        self.update_idletasks() # Forzar actualización de la GUI
+        self._log(f"LISTENING: Captura de {node['id']} en análisis. Esperando la siguiente acción del usuario en el juego...")
+        self.action_monitor.listen_for_single_action(on_action=self.dispatcher.wrap(self._on_action_captured))
+
+    def _log_node(self, node: dict, analysis):
+        analysis_type = "Región" if node["is_region"] else "Pantalla completa"
+        if analysis is not None:
+            detail = f" Pantalla '{analysis.current_screen}', {len(analysis.options)} opciones"
+        else:
+            detail = " (sin análisis)"
+        self._log(f"ANALYSIS: {analysis_type} analizada. Creado {node['id']}.{detail} [{node['elapsed']:.1f} s]")
 
-        self._log("LISTENING: Esperando la siguiente acción del usuario en el juego...")
-        self.action_monitor.listen_for_single_action()
-        self.after(500, self.check_if_action_captured)
+        if node["action"]:
+            # Mensaje más claro para el usuario
+            self._log(f"ACTION: La acción '{node['action']}' te trajo a esta pantalla.")
+            # Aquí es donde crearíamos la arista en nuestro grafo de navegación
+        else:
+            self._log("ACTION: (Es la primera pantalla, no hay acción previa)")
 
     def save_map(self):
         """Guarda el mapa de navegación generado."""
+        pending = self.node_counter - self._next_to_log + 1
+        if pending > 0:
+            self._log(f"INFO: {pending} capturas siguen en análisis; se añadirán al log al terminar.")
         self._log("SUCCESS: Mapa de navegación guardado (simulación).")
+        if self.recorder:
+            stats = self.recorder.stats()
+            self._log(f"INFO: Sesión grabada en '{self.recorder.path}': {stats['frames']} capturas, "
+                      f"{stats['bytes_written'] / 1e6:.1f} MB (x{stats['ratio']:.1f} de compresión).")
         messagebox.showinfo("Guardado", "El mapa de navegación se ha guardado correctamente (simulación).")
 
     def on_close(self):
         """Maneja el cierre de la ventana de forma segura."""
+        self._capture_pool.shutdown(wait=False, cancel_futures=True)
+        self._analysis_pool.shutdown(wait=False, cancel_futures=True)
+        self.dispatcher.close()
         if self.action_monitor:
             self.action_monitor.stop()
+        if self.recorder:
+            self.recorder.close()
         self.destroy()
 
-    def check_if_action_captured(self):
-        """Comprueba periódicamente si el monitor ha capturado una acción."""
-        if self.action_monitor and self.action_monitor.last_action is not None:
-            self.analyze_button.configure(state="normal")
-            self.analyze_region_button.configure(state="normal")
-            self._update_instructions(
-                "action_needed",
-                f"¡Acción '{self.action_monitor.last_action}' registrada! Ahora, vuelve a hacer clic en 'Analizar Pantalla' para confirmar la nueva pantalla."
-            )
-        elif self.is_session_active:
-            self.after(500, self.check_if_action_captured)
\ No newline at end of file
+    def _on_action_captured(self, action: str):
+        """Llamado (ya en el hilo de Tk) en cuanto el monitor registra la acción del usuario."""
+        if not self.is_session_active:
+            return
+        if self.auto_capture_var.get():
+            self._log(f"INFO: Acción '{action}' registrada. Capturando la siguiente pantalla cuando se estabilice...")
+            self._update_instructions("listening", f"¡Acción '{action}' registrada! Esperando a que la pantalla del juego cambie...")
+            self.analyze_screen(auto=True)
+            return
+        self.analyze_button.configure(state="normal")
+        self.analyze_region_button.configure(state="normal")
+        self._update_instructions(
+            "action_needed",
+            f"¡Acción '{action}' registrada! Ahora, vuelve a hacer clic en 'Analizar Pantalla' para confirmar la nueva pantalla."
+        )
@@ -1,11 +1,18 @@
 # main.py
-from gui.main_window import MainWindow
+import sys
+
 from utils.logger import log
 
 def main():
     """Función principal para iniciar la aplicación."""
+    # `python main.py --headless <orden>` ejecuta el agente sin cargar Tk (ver agent/cli.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "--headless":
+        from agent.cli import main as headless_main
+        return headless_main(sys.argv[2:])
+
     log.info('Iniciando la aplicación')
     try:
+        from gui.main_window import MainWindow  # CustomTkinter solo se carga en modo gráfico
         app = MainWindow()
         app.mainloop()
         log.info('La aplicación se ha cerrado correctamente')
@@ -13,4 +20,4 @@ def main():
         log.error('Ha ocurrido un error inesperado', exc_info=True)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
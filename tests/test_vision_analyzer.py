@@ -0,0 +1,153 @@
+# tests/test_vision_analyzer.py
+
+"""
+Pruebas del camino de visión sin API Key: `GeminiVisionAnalyzer` con el modelo
+falso (`FakeVisionBackend`) y con respuestas grabadas (`ReplayBackend`).
+"""
+
+import json
+
+import pytest
+from PIL import Image, ImageDraw
+
+from vision.backends import FakeVisionBackend, RecordingBackend, ReplayBackend
+from vision.gemini_analyzer import GeminiVisionAnalyzer
+from vision.screen_cache import PerceptualHashCache
+
+MAIN_MENU = {
+    "current_screen": "main_menu",
+    "selected_option": "Jugar",
+    "selectable_options": [
+        {"option_name": "Jugar", "coordinates": {"x": 100, "y": 50}},
+        {"option_name": "Contrato", "coordinates": {"x": "100", "y": "90.4"}},
+    ],
+}
+
+
+def make_screen(seed: int) -> Image.Image:
+    """Una 'pantalla' sintética: fondo y bloques que dependen de `seed`."""
+    image = Image.new("RGB", (320, 180), (20 + seed * 40 % 200, 30, 60))
+    draw = ImageDraw.Draw(image)
+    for i in range(4):
+        top = 20 + i * 35
+        draw.rectangle((40 + seed * 25 % 120, top, 200, top + 20), fill=(230, 230 - seed * 50 % 200, 40))
+    return image
+
+
+def make_analyzer(response=MAIN_MENU, **kwargs) -> GeminiVisionAnalyzer:
+    return GeminiVisionAnalyzer(backend=FakeVisionBackend(response=response, latency=0), **kwargs)
+
+
+def test_fake_backend_result_is_parsed():
+    result = make_analyzer().analyze_image(make_screen(0))
+
+    assert result["current_screen"] == "main_menu"
+    assert result["selected_option"] == "Jugar"
+    assert [o["coordinates"] for o in result["selectable_options"]] == [{"x": 100, "y": 50}, {"x": 100, "y": 90}]
+
+
+def test_cache_hit_skips_the_backend():
+    analyzer = make_analyzer(cache=PerceptualHashCache(autosave=False))
+    screen = make_screen(0)
+
+    first = analyzer.analyze_image(screen)
+    second = analyzer.analyze_image(screen.copy())
+
+    assert second == first
+    assert analyzer.backend.calls == 1
+    assert analyzer.tier_stats()["cache"] == 1
+
+
+def test_classifier_tier_recognizes_a_known_screen():
+    from vision.screen_classifier import LocalScreenClassifier
+
+    analyzer = make_analyzer(classifier=LocalScreenClassifier(autosave=False))
+    screen = make_screen(0)
+
+    analyzer.analyze_image(screen)
+    result = analyzer.analyze_image(screen.copy())
+
+    assert analyzer.backend.calls == 1
+    assert analyzer.tier_stats()["local"] == 1
+    # El clasificador solo sabe qué pantalla es: no inventa selección ni coordenadas
+    assert result["current_screen"] == "main_menu"
+    assert result["selected_option"] is None
+    assert [o["coordinates"] for o in result["selectable_options"]] == [{"x": None, "y": None}] * 2
+
+
+def test_classifier_does_not_answer_for_a_different_screen():
+    from vision.screen_classifier import LocalScreenClassifier
+
+    analyzer = make_analyzer(classifier=LocalScreenClassifier(autosave=False))
+    analyzer.analyze_image(make_screen(0))
+    analyzer.analyze_image(make_screen(3))
+
+    assert analyzer.backend.calls == 2
+    assert analyzer.tier_stats()["local"] == 0
+
+
+@pytest.mark.parametrize("value", ["1e999", "inf", "-inf", "nan", "centro_x", None, True])
+def test_invalid_coordinates_become_none(value):
+    response = {"current_screen": "main_menu", "selected_option": None,
+                "selectable_options": [{"option_name": "Jugar", "coordinates": {"x": value, "y": 10}}]}
+
+    result = make_analyzer(response).analyze_image(make_screen(0))
+
+    assert result is not None
+    assert result["selectable_options"][0]["coordinates"] == {"x": None, "y": 10}
+
+
+def test_invalid_coordinates_in_a_stream_become_none():
+    response = {"current_screen": "main_menu", "selected_option": None,
+                "selectable_options": [{"option_name": "Jugar", "coordinates": {"x": "1e999", "y": 10}}]}
+    options = []
+
+    analysis = make_analyzer(response).analyze_image_stream(make_screen(0), on_option=options.append)
+
+    assert analysis is not None
+    assert [o.has_coordinates for o in options] == [False]
+
+
+@pytest.mark.parametrize("response", [
+    lambda image: "no es JSON",
+    lambda image: ["una", "lista"],
+    lambda image: {"current_screen": 42, "selectable_options": []},
+])
+def test_malformed_response_returns_none(response):
+    analyzer = make_analyzer(response)
+
+    assert analyzer.analyze_image(make_screen(0)) is None
+    assert analyzer.tier_stats()["failed"] == 1
+
+
+def test_backend_error_returns_none():
+    analyzer = GeminiVisionAnalyzer(backend=FakeVisionBackend(latency=0, error_rate=1.0))
+
+    assert analyzer.analyze_image(make_screen(0)) is None
+    assert analyzer.tier_stats()["failed"] == 1
+
+
+def test_replay_serves_recorded_responses(tmp_path):
+    archive = str(tmp_path / "vision_archive.jsonl")
+    screens = [make_screen(0), make_screen(3)]
+    responses = {0: MAIN_MENU, 1: dict(MAIN_MENU, current_screen="game_plan")}
+    fake = FakeVisionBackend(response=lambda image: responses[screens.index(image)], latency=0)
+    recorded = [GeminiVisionAnalyzer(backend=RecordingBackend(fake, archive, frames_dir=None)).analyze_image(s)
+                for s in screens]
+
+    replay = ReplayBackend(archive, latency_scale=0)
+    replayed = [GeminiVisionAnalyzer(backend=replay).analyze_image(s) for s in screens]
+
+    assert replayed == recorded
+    assert [r["current_screen"] for r in replayed] == ["main_menu", "game_plan"]
+    assert replay.hits == 2
+
+
+def test_replay_miss_returns_none(tmp_path):
+    archive = tmp_path / "vision_archive.jsonl"
+    archive.write_text(json.dumps({"frame_hash": "x", "phash": "0", "prompt_hash": "y",
+                                   "response": json.dumps(MAIN_MENU), "latency": 0}) + "\n", encoding="utf-8")
+    analyzer = GeminiVisionAnalyzer(backend=ReplayBackend(str(archive), latency_scale=0))
+
+    assert analyzer.analyze_image(make_screen(0)) is None
+    assert analyzer.tier_stats()["failed"] == 1
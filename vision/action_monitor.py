@@ -1,130 +1,144 @@
 # vision/action_monitor.py
 
 import threading
-from pynput import keyboard
-try:
-    from inputs import get_gamepad, UnpluggedError
-except ImportError:
-    get_gamepad = None
+
+from core.input_events import GAMEPAD_AVAILABLE, KEY_DOWN, EventSubscription, InputEvent, get_input_bus
 
 
 class ActionMonitor:
     """
     Escucha las entradas del teclado y/o gamepad en hilos separados para no bloquear la GUI.
     Traduce las entradas a acciones abstractas del juego (ej. 'MOVE_UP', 'CONFIRM').
+
+    No abre hooks propios: lee del bus de entrada compartido (`core/input_events.py`),
+    que guarda cada pulsación y liberación con su instante en un historial
+    circular. Se lee con `subscribe()` o, para el flujo de entrenamiento, con
+    `listen_for_single_action()` + `get_captured_action()`.
     """
 
-    def __init__(self, keyboard_mapping, gamepad_mapping):
+    def __init__(self, keyboard_mapping, gamepad_mapping, bus=None):
         """
         Inicializa el monitor de acciones.
 
         Args:
             keyboard_mapping (dict): Mapeo de acciones a teclas de teclado.
             gamepad_mapping (dict): Mapeo de acciones a botones de gamepad.
+            bus (InputEventBus | None): Bus de entrada. Por defecto, el del proceso.
         """
         # Invertimos los mapeos para una búsqueda rápida: {'up': 'MOVE_UP', ...}
         self.key_to_action_map = {v: k for k, v in keyboard_mapping.items()}
         self.gamepad_to_action_map = {v: k for k, v in gamepad_mapping.items()}
 
-        self.keyboard_listener_thread = None
-        self.keyboard_listener = None # Referencia para el listener
-        self.gamepad_listener_thread = None
+        self.bus = bus or get_input_bus()
+        self.events = self.bus.history
+        self._running = False
 
-        self.last_action = None
+        self._armed_cursor = None     # Desde dónde busca `get_captured_action` (None = no se está escuchando)
+        self._on_action = None        # Callback de `listen_for_single_action`, pendiente de la acción
+        self.last_action_time = None  # time.time() de la última acción capturada
         self.lock = threading.Lock()
-        self.stop_event = threading.Event()
 
-        if not get_gamepad:
+        if not GAMEPAD_AVAILABLE:
             print("ADVERTENCIA: La librería 'inputs' no está instalada. El gamepad no funcionará. Instálala con: pip install inputs")
 
-    def _on_key_press(self, key):
-        """
-        Callback para el listener del teclado. Se ejecuta al presionar una tecla.
+    def start(self):
+        """Se registra en el bus de entrada (que abre los hooks si nadie lo había hecho). No es bloqueante."""
+        with self.lock:
+            if self._running:
+                return
+            self._running = True
+        self.bus.add_listener(self._on_bus_event)
+        self.bus.acquire()
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    # --- Lectura del flujo de eventos ---
+
+    def subscribe(self, from_now: bool = True) -> EventSubscription:
         """
-        try:
-            key_str = key.char
-        except AttributeError:
-            key_str = key.name
-
-        if key_str in self.key_to_action_map:
-            action = self.key_to_action_map[key_str]
-            with self.lock:
-                self.last_action = action
-            self.stop_event.set() # Señaliza que se ha capturado una acción
-            return False # Detiene el listener de teclado
-
-    def _run_keyboard_listener(self):
-        """Función que se ejecuta en un hilo para escuchar el teclado."""
-        self.keyboard_listener = keyboard.Listener(on_press=self._on_key_press)
-        self.keyboard_listener.start()
-        self.keyboard_listener.join() # El hilo terminará cuando el listener se detenga
-
-    def _run_gamepad_listener(self):
-        """Función que se ejecuta en un hilo para escuchar el gamepad."""
-        if not get_gamepad:
-            return # No hacer nada si la librería no está disponible
-
-        try:
-            while not self.stop_event.is_set():
-                events = get_gamepad()
-                for event in events:
-                    # Nos interesan solo las pulsaciones de botones (estado 1)
-                    if event.ev_type == 'Key' and event.state == 1:
-                        if event.code in self.gamepad_to_action_map:
-                            action = self.gamepad_to_action_map[event.code]
-                            with self.lock:
-                                self.last_action = action
-                            self.stop_event.set() # Señaliza y sale del bucle
-                            return
-        except (OSError, UnpluggedError) as e:
-            # Puede fallar si no hay un gamepad conectado
-            # Simplemente terminamos el hilo silenciosamente.
-            # El print es opcional si quieres depurar.
-            print(f"INFO: Hilo de gamepad terminado. Razón: {e}")
-
-    def listen_for_single_action(self):
+        Crea un lector del flujo de eventos.
+
+        Args:
+            from_now (bool): Empezar por los eventos futuros (True) o por los que aún guarda el buffer.
         """
-        Inicia listeners para teclado y gamepad. Se detienen tras capturar la primera acción.
-        Esta función no es bloqueante.
+        self.start()
+        return EventSubscription(self.events, self.events.head if from_now else max(0, self.events.head - self.events.capacity))
+
+    def action_for(self, event: InputEvent) -> str | None:
+        """Acción de un evento según los mapeos de este monitor."""
+        mapping = self.key_to_action_map if event.device == "keyboard" else self.gamepad_to_action_map
+        return mapping.get(event.control)
+
+    def _first_action_since(self, cursor: int) -> InputEvent | None:
+        events, _, _ = self.events.read(cursor)
+        return next((e for e in events if e.kind == KEY_DOWN and self.action_for(e) is not None), None)
+
+    def listen_for_single_action(self, on_action=None):
         """
-        self.stop() # Asegurarse de que no hay listeners antiguos corriendo
+        Empieza a esperar la siguiente acción: `get_captured_action` devolverá la
+        primera que se pulse a partir de ahora. Esta función no es bloqueante.
 
+        Args:
+            on_action (callable | None): `on_action(action)` se llama una vez, en cuanto
+                llega la acción, desde el hilo del bus de entrada. Desde una GUI hay que
+                trasladarlo a su hilo (ver `gui/tk_dispatch.py`).
+        """
+        self.start()
         with self.lock:
-            self.last_action = None
-        self.stop_event.clear()
-
-        # Iniciar listener de teclado
-        self.keyboard_listener_thread = threading.Thread(target=self._run_keyboard_listener, daemon=True)
-        self.keyboard_listener_thread.start()
+            self._armed_cursor = self.events.head
+            self._on_action = on_action
 
-        # Iniciar listener de gamepad si es posible
-        if get_gamepad:
-            self.gamepad_listener_thread = threading.Thread(target=self._run_gamepad_listener, daemon=True)
-            self.gamepad_listener_thread.start()
+    def _on_bus_event(self, event: InputEvent):
+        if self._on_action is None or event.kind != KEY_DOWN:
+            return
+        with self.lock:
+            callback = self._on_action
+            if callback is None or self._armed_cursor is None or event.seq < self._armed_cursor:
+                return
+            action = self.action_for(event)
+            if action is None:
+                return
+            self._on_action = None
+        callback(action)
+
+    @property
+    def last_action(self) -> str | None:
+        """Acción capturada desde `listen_for_single_action` (sin consumirla), o None."""
+        with self.lock:
+            cursor = self._armed_cursor
+        if cursor is None:
+            return None
+        event = self._first_action_since(cursor)
+        return self.action_for(event) if event else None
 
     def get_captured_action(self):
         """
-        Devuelve la última acción capturada y la resetea.
+        Devuelve la acción capturada desde `listen_for_single_action` y deja de escuchar.
         Es seguro para usar desde diferentes hilos gracias al Lock.
 
         Returns: str or None
         """
         with self.lock:
-            action = self.last_action
-            self.last_action = None
-            return action
+            if self._armed_cursor is None:
+                return None
+            event = self._first_action_since(self._armed_cursor)
+            if event is None:
+                return None
+            self._armed_cursor = None
+            self.last_action_time = event.wall_time
+            return self.action_for(event)
 
     def stop(self):
         """
-        Detiene todos los listeners activos de forma segura.
+        Deja de usar el bus de entrada (si no queda nadie más, el bus cierra los hooks).
         """
-        self.stop_event.set() # Señaliza a los hilos que deben parar
-
-        # Esperar a que los hilos terminen
-        if self.keyboard_listener_thread and self.keyboard_listener_thread.is_alive():
-            if self.keyboard_listener:
-                self.keyboard_listener.stop()
-            self.keyboard_listener_thread.join(timeout=0.5)
-
-        if self.gamepad_listener_thread and self.gamepad_listener_thread.is_alive():
-            self.gamepad_listener_thread.join(timeout=0.5)
\ No newline at end of file
+        with self.lock:
+            if not self._running:
+                return
+            self._running = False
+            self._armed_cursor = None
+            self._on_action = None
+        self.bus.remove_listener(self._on_bus_event)
+        self.bus.release()
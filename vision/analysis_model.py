@@ -0,0 +1,277 @@
+# vision/analysis_model.py
+
+"""
+Modelo tipado del resultado del análisis de una pantalla y parseo (completo o
+incremental) de las respuestas de Gemini.
+"""
+
+import json
+import math
+import re
+
+
+class AnalysisSchemaError(ValueError):
+    """La respuesta del modelo no cumple el esquema esperado."""
+
+
+def _to_coordinate(value) -> int | None:
+    """Convierte una coordenada (número o texto numérico) a entero. Devuelve None si no es válida."""
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    # "inf", "nan" o "1e999" son float válidos, pero no coordenadas (round() fallaría)
+    return round(number) if math.isfinite(number) else None
+
+
+def _optional_str(data: dict, key: str) -> str | None:
+    value = data.get(key)
+    if value is None or isinstance(value, str):
+        return value
+    raise AnalysisSchemaError(f"'{key}' debe ser texto o null, se recibió {type(value).__name__}.")
+
+
+class SelectableOption:
+    """Una opción seleccionable de la pantalla, con su centro en píxeles de la ventana."""
+
+    __slots__ = ("name", "x", "y")
+
+    def __init__(self, name: str, x: int | None = None, y: int | None = None):
+        self.name = name
+        self.x = x
+        self.y = y
+
+    def __repr__(self):
+        return f"SelectableOption({self.name!r}, x={self.x}, y={self.y})"
+
+    def __eq__(self, other):
+        if not isinstance(other, SelectableOption):
+            return NotImplemented
+        return (self.name, self.x, self.y) == (other.name, other.x, other.y)
+
+    @property
+    def has_coordinates(self) -> bool:
+        return self.x is not None and self.y is not None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SelectableOption":
+        """
+        Crea una opción a partir de un elemento de `selectable_options`.
+
+        Raises:
+            AnalysisSchemaError: Si el elemento no es un objeto o no tiene `option_name`.
+        """
+        if not isinstance(data, dict):
+            raise AnalysisSchemaError("Cada opción seleccionable debe ser un objeto JSON.")
+        name = data.get("option_name")
+        if not isinstance(name, str) or not name:
+            raise AnalysisSchemaError("Cada opción seleccionable necesita un 'option_name' de texto.")
+
+        coords = data.get("coordinates")
+        if not isinstance(coords, dict):
+            coords = {}
+        return cls(name, _to_coordinate(coords.get("x")), _to_coordinate(coords.get("y")))
+
+    def to_dict(self) -> dict:
+        return {"option_name": self.name, "coordinates": {"x": self.x, "y": self.y}}
+
+
+class ScreenAnalysis:
+    """Resultado validado del análisis de una pantalla."""
+
+    __slots__ = ("current_screen", "selected_option", "options")
+
+    def __init__(self, current_screen: str | None, selected_option: str | None = None,
+                 options: list[SelectableOption] | None = None):
+        self.current_screen = current_screen
+        self.selected_option = selected_option
+        self.options = options if options is not None else []
+
+    def __repr__(self):
+        return (f"ScreenAnalysis(current_screen={self.current_screen!r}, "
+                f"selected_option={self.selected_option!r}, options={len(self.options)})")
+
+    def __eq__(self, other):
+        if not isinstance(other, ScreenAnalysis):
+            return NotImplemented
+        return (self.current_screen, self.selected_option, self.options) == \
+            (other.current_screen, other.selected_option, other.options)
+
+    def find_option(self, name: str) -> SelectableOption | None:
+        """Busca una opción por nombre (sin distinguir mayúsculas)."""
+        wanted = name.casefold()
+        for option in self.options:
+            if option.name.casefold() == wanted:
+                return option
+        return None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScreenAnalysis":
+        """
+        Valida el diccionario devuelto por el modelo.
+
+        Raises:
+            AnalysisSchemaError: Si la estructura no es la esperada.
+        """
+        if not isinstance(data, dict):
+            raise AnalysisSchemaError("La respuesta debe ser un objeto JSON.")
+
+        options = data.get("selectable_options")
+        if options is None:
+            options = []
+        if not isinstance(options, list):
+            raise AnalysisSchemaError("'selectable_options' debe ser una lista.")
+
+        return cls(
+            _optional_str(data, "current_screen"),
+            _optional_str(data, "selected_option"),
+            [SelectableOption.from_dict(option) for option in options],
+        )
+
+    def to_dict(self) -> dict:
+        """Devuelve el resultado con la misma estructura que pide el prompt."""
+        return {
+            "current_screen": self.current_screen,
+            "selected_option": self.selected_option,
+            "selectable_options": [option.to_dict() for option in self.options],
+        }
+
+
+def extract_json_text(text: str) -> str:
+    """
+    Extrae el objeto JSON de una respuesta del modelo, ignorando bloques ```json
+    y cualquier explicación antes o después del objeto.
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        return text.strip()
+    return text[start:end + 1]
+
+
+# Detecta un campo de texto (o null) ya completo en el buffer: "clave": "valor" | null
+_FIELD_PATTERN = r'"{key}"\s*:\s*(null|"(?:[^"\\]|\\.)*")'
+
+
+class StreamingAnalysisParser:
+    """
+    Parser incremental de la respuesta de Gemini.
+
+    Se le van pasando los trozos de texto según llegan (`feed`) y notifica
+    `current_screen` en cuanto ese campo está completo, y cada opción en cuanto
+    su objeto se cierra, sin esperar al final de la respuesta.
+    """
+
+    def __init__(self, on_screen=None, on_option=None):
+        """
+        Args:
+            on_screen (callable | None): `f(current_screen)` al conocerse la pantalla.
+            on_option (callable | None): `f(SelectableOption)` por cada opción completa.
+        """
+        self.on_screen = on_screen
+        self.on_option = on_option
+
+        self.buffer = ""
+        self.current_screen = None
+        self.screen_known = False
+        self.options = []
+
+        self._screen_re = re.compile(_FIELD_PATTERN.format(key="current_screen"))
+        self._options_re = re.compile(r'"selectable_options"\s*:\s*\[')
+        # Estado del escáner de la lista de opciones
+        self._scan_pos = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, chunk: str):
+        """Añade un trozo de texto y emite los eventos que ya se puedan resolver."""
+        self.buffer += chunk
+
+        if not self.screen_known:
+            match = self._screen_re.search(self.buffer)
+            if match:
+                self.current_screen = json.loads(match.group(1))
+                self.screen_known = True
+                if self.on_screen:
+                    self.on_screen(self.current_screen)
+
+        if self._scan_pos is None:
+            match = self._options_re.search(self.buffer)
+            if match:
+                self._scan_pos = match.end()
+        if self._scan_pos is not None:
+            self._scan_options()
+
+    def _scan_options(self):
+        """Recorre la lista de opciones carácter a carácter respetando cadenas y anidamiento."""
+        buffer = self.buffer
+        pos = self._scan_pos
+        while pos < len(buffer):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    self._emit_option(buffer[self._object_start:pos + 1])
+                    self._object_start = None
+            elif char == "]" and self._depth == 0:
+                pos = len(buffer)  # Fin de la lista: no queda nada que escanear
+                break
+            pos += 1
+        self._scan_pos = pos
+
+    def _emit_option(self, text: str):
+        try:
+            option = SelectableOption.from_dict(json.loads(text))
+        except (json.JSONDecodeError, AnalysisSchemaError):
+            return  # Opción mal formada: la validación final decidirá
+        self.options.append(option)
+        if self.on_option:
+            self.on_option(option)
+
+    def finish(self) -> ScreenAnalysis:
+        """
+        Parsea la respuesta completa. Si el JSON final está mal formado pero ya se
+        conocía la pantalla, se devuelve lo recuperado durante el streaming en lugar de nada.
+
+        Raises:
+            AnalysisSchemaError: Si no se pudo recuperar ni siquiera la pantalla.
+        """
+        try:
+            return ScreenAnalysis.from_dict(json.loads(extract_json_text(self.buffer)))
+        except (json.JSONDecodeError, AnalysisSchemaError) as e:
+            if self.screen_known:
+                return ScreenAnalysis(self.current_screen, self._partial_selected_option(), list(self.options))
+            raise AnalysisSchemaError(f"Respuesta de Gemini no válida: {e}") from e
+
+    def _partial_selected_option(self) -> str | None:
+        match = re.search(_FIELD_PATTERN.format(key="selected_option"), self.buffer)
+        return json.loads(match.group(1)) if match else None
+
+
+def parse_analysis(text: str) -> ScreenAnalysis:
+    """
+    Parsea una respuesta completa del modelo.
+
+    Raises:
+        AnalysisSchemaError: Si la respuesta no es un JSON válido con el esquema esperado.
+    """
+    parser = StreamingAnalysisParser()
+    parser.feed(text)
+    return parser.finish()
@@ -0,0 +1,154 @@
+# vision/async_analyzer.py
+
+"""
+Analizador asíncrono para no bloquear el hilo de la GUI ni el bucle del agente
+mientras se espera la respuesta del modelo de visión.
+"""
+
+import asyncio
+import random
+
+from PIL import Image
+
+from config.settings import GEMINI_MAX_CONCURRENCY, GEMINI_REQUESTS_PER_MINUTE
+from vision.backends import RateLimitError
+from vision.screen_cache import perceptual_hash
+
+
+class TokenBucket:
+    """
+    Limitador de peticiones de tipo "token bucket".
+
+    Se rellenan `rate` tokens por segundo hasta un máximo de `capacity`. Cada
+    petición consume un token y, si no hay ninguno, espera lo justo hasta que lo haya.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate debe ser mayor que cero.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Espera hasta que haya un token disponible y lo consume."""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated_at is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncVisionAnalyzer:
+    """
+    Ejecuta los análisis de un `GeminiVisionAnalyzer` de forma concurrente.
+
+    - Un semáforo limita el número de peticiones simultáneas.
+    - Un token bucket ajusta el ritmo a la cuota de la API.
+    - Las peticiones repetidas de la misma captura mientras otra está en vuelo
+      se fusionan en una sola llamada.
+    - Los 429 se reintentan con espera exponencial con jitter.
+    """
+
+    def __init__(self, analyzer, max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+                 requests_per_minute: float = GEMINI_REQUESTS_PER_MINUTE, max_retries: int = 4,
+                 base_delay: float = 1.0, max_delay: float = 30.0):
+        """
+        Args:
+            analyzer (GeminiVisionAnalyzer): Analizador con el backend, el prompt y la caché.
+            max_concurrency (int): Número máximo de peticiones en vuelo.
+            requests_per_minute (float): Cuota de la API.
+            max_retries (int): Reintentos tras un 429 antes de rendirse.
+            base_delay (float): Espera base (segundos) del primer reintento.
+            max_delay (float): Espera máxima entre reintentos.
+        """
+        self.analyzer = analyzer
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.rate_limiter = TokenBucket(requests_per_minute / 60.0, capacity=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._in_flight = {}  # {huella: Future}
+        self.stats = {"requests": 0, "coalesced": 0, "backend_calls": 0, "retries": 0, "failures": 0}
+
+    async def analyze_image_async(self, image: Image.Image) -> dict | None:
+        """
+        Analiza una imagen sin bloquear el bucle de eventos.
+
+        Returns:
+            dict | None: El resultado parseado o None si falla.
+        """
+        self.stats["requests"] += 1
+
+        fingerprint, local_result = await asyncio.to_thread(self.analyzer._lookup_local, image)
+        if local_result is not None:
+            return local_result
+        if fingerprint is None:
+            fingerprint = perceptual_hash(image)
+
+        pending = self._in_flight.get(fingerprint)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            # shield: si este llamante se cancela no debe cancelar la petición compartida
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self._analyze(image, fingerprint))
+        self._in_flight[fingerprint] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(fingerprint, None))
+        return await asyncio.shield(task)
+
+    async def analyze_many(self, images: list[Image.Image]) -> list[dict | None]:
+        """Analiza una lista de imágenes en paralelo manteniendo el orden de los resultados."""
+        return list(await asyncio.gather(*(self.analyze_image_async(image) for image in images)))
+
+    async def _analyze(self, image: Image.Image, fingerprint: int) -> dict | None:
+        async with self.semaphore:
+            # Reducir y codificar la imagen es trabajo de CPU: lo sacamos del bucle de eventos
+            prepared = await asyncio.to_thread(self.analyzer._prepare, image)
+            payload = self.analyzer._payload(image, prepared)
+            for attempt in range(self.max_retries + 1):
+                await self.rate_limiter.acquire()
+                try:
+                    self.stats["backend_calls"] += 1
+                    response_text = await self._generate(payload)
+                except RateLimitError as e:
+                    if attempt == self.max_retries:
+                        print(f"Error: Cuota de Gemini agotada tras {attempt + 1} intentos: {e}")
+                        break
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                    continue
+                except Exception as e:
+                    print(f"Ocurrió un error al analizar la imagen con Gemini: {e}")
+                    break
+
+                parsed_data = self.analyzer._finalize(response_text, prepared)
+                self.analyzer._remember(fingerprint, image, parsed_data)
+                return parsed_data
+
+        self.stats["failures"] += 1
+        self.analyzer._count("failed")
+        return None
+
+    async def _generate(self, payload) -> str:
+        """Usa la versión asíncrona del backend si existe; si no, lo ejecuta en un hilo."""
+        backend = self.analyzer.backend
+        prompt = self.analyzer.prompt
+        if hasattr(backend, "generate_async"):
+            return await backend.generate_async(prompt, payload)
+        return await asyncio.to_thread(backend.generate, prompt, payload)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Espera exponencial con "equal jitter": la mitad fija y la otra mitad aleatoria."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
@@ -0,0 +1,394 @@
+# vision/backends.py
+
+"""
+Backends intercambiables para el analizador de visión.
+
+Un backend recibe el prompt y la imagen y devuelve el texto crudo de la respuesta
+del modelo. Así `GeminiVisionAnalyzer` puede trabajar contra la API real o contra
+un modelo falso local (sin red ni API Key) para pruebas y benchmarks.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+
+from config.settings import (
+    GEMINI_API_KEY, VISION_ARCHIVE_FRAMES_DIR, VISION_ARCHIVE_PATH, VISION_BACKEND, VISION_REPLAY_LATENCY_SCALE
+)
+
+
+class RateLimitError(Exception):
+    """El backend ha rechazado la petición por exceso de cuota (HTTP 429)."""
+
+
+class ReplayMissError(LookupError):
+    """El archivo de grabación no contiene una respuesta para esta captura."""
+
+
+class VisionBackend:
+    """Interfaz común de los backends de visión."""
+
+    def generate(self, prompt: str, image) -> str:
+        """
+        Envía el prompt y la imagen al modelo.
+
+        Returns:
+            str: El texto de la respuesta.
+
+        Raises:
+            RateLimitError: Si el servicio rechaza la petición por cuota.
+        """
+        raise NotImplementedError
+
+
+class GeminiBackend(VisionBackend):
+    """Backend que llama a la API de Google Gemini."""
+
+    def __init__(self, api_key: str, model_name: str = 'gemini-2.5-flash-lite'):
+        if not api_key:
+            raise ValueError("La API Key de Gemini no ha sido configurada.")
+
+        # Importamos aquí para que los backends locales funcionen sin la librería instalada
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        # Por defecto usamos el nuevo modelo, más rápido y económico
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, image) -> str:
+        try:
+            response = self.model.generate_content([prompt, image])
+        except Exception as e:
+            # google.api_core.exceptions.ResourceExhausted es el 429 de la API
+            if type(e).__name__ == "ResourceExhausted" or getattr(e, "code", None) == 429:
+                raise RateLimitError(str(e)) from e
+            raise
+        return response.text
+
+    def generate_stream(self, prompt: str, image):
+        """Igual que `generate`, pero va devolviendo los trozos de texto según llegan."""
+        try:
+            response = self.model.generate_content([prompt, image], stream=True)
+            for chunk in response:
+                yield chunk.text
+        except Exception as e:
+            if type(e).__name__ == "ResourceExhausted" or getattr(e, "code", None) == 429:
+                raise RateLimitError(str(e)) from e
+            raise
+
+
+class FakeVisionBackend(VisionBackend):
+    """
+    Modelo falso local que simula la latencia y los errores 429 de la API.
+
+    Es seguro usarlo desde varios hilos y además ofrece `generate_async` para que
+    el analizador asíncrono pueda simular cientos de peticiones sin crear hilos.
+    """
+
+    DEFAULT_RESPONSE = {
+        "current_screen": "main_menu",
+        "selected_option": None,
+        "selectable_options": [],
+    }
+
+    def __init__(self, response=None, latency: float = 0.3, latency_jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int | None = None, chunk_size: int = 32):
+        """
+        Args:
+            response (dict | callable | None): Respuesta fija o función `f(image) -> dict`.
+            latency (float): Latencia media simulada en segundos.
+            latency_jitter (float): Variación máxima (+/-) de la latencia en segundos.
+            error_rate (float): Probabilidad (0-1) de devolver un 429.
+            seed (int | None): Semilla para que la simulación sea reproducible.
+            chunk_size (int): Caracteres por trozo en `generate_stream`.
+        """
+        self.response = response if response is not None else self.DEFAULT_RESPONSE
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.chunk_size = chunk_size
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # Contadores para verificar el comportamiento del cliente
+        self.calls = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _begin(self) -> tuple[float, bool]:
+        """Registra el inicio de una llamada y decide su latencia y si falla."""
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            delay = max(0.0, self.latency + self._random.uniform(-self.latency_jitter, self.latency_jitter))
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.rate_limited += 1
+        return delay, fail
+
+    def _finish(self, fail: bool, image) -> str:
+        with self._lock:
+            self.in_flight -= 1
+        if fail:
+            raise RateLimitError("429 Resource has been exhausted (simulado)")
+        data = self.response(image) if callable(self.response) else self.response
+        return json.dumps(data)
+
+    def generate(self, prompt: str, image) -> str:
+        delay, fail = self._begin()
+        time.sleep(delay)
+        return self._finish(fail, image)
+
+    def generate_stream(self, prompt: str, image):
+        """
+        Simula una respuesta en streaming: la mitad de la latencia hasta el primer
+        trozo y el resto repartido entre los demás.
+        """
+        delay, fail = self._begin()
+        time.sleep(delay / 2)
+        text = self._finish(fail, image)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(delay / 2 / max(1, len(chunks) - 1))
+            yield chunk
+
+    async def generate_async(self, prompt: str, image) -> str:
+        delay, fail = self._begin()
+        await asyncio.sleep(delay)
+        return self._finish(fail, image)
+
+
+# --- GRABACIÓN Y REPRODUCCIÓN ---
+
+def _payload_bytes(image) -> tuple[bytes, str]:
+    """Devuelve los bytes que identifican la imagen enviada y la extensión con la que guardarla."""
+    if isinstance(image, dict):
+        # Blob ya codificado por el preprocesado: {"mime_type": ..., "data": ...}
+        return image["data"], image["mime_type"].split("/")[-1]
+    return image.tobytes() + f"{image.mode}{image.size}".encode(), "png"
+
+
+def frame_digest(image) -> str:
+    """Hash exacto (SHA-1) de la imagen enviada al modelo."""
+    data, _ = _payload_bytes(image)
+    return hashlib.sha1(data).hexdigest()
+
+
+def _payload_phash(image) -> str:
+    """Hash perceptual de la imagen enviada, para encontrar capturas casi idénticas al reproducir."""
+    from PIL import Image
+    from vision.screen_cache import perceptual_hash
+
+    if isinstance(image, dict):
+        with Image.open(io.BytesIO(image["data"])) as decoded:
+            return format(perceptual_hash(decoded), "x")
+    return format(perceptual_hash(image), "x")
+
+
+def _prompt_digest(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class RecordingBackend(VisionBackend):
+    """
+    Envuelve otro backend y guarda cada respuesta en un archivo JSON Lines con
+    (hash de la captura, prompt, respuesta, latencia). Opcionalmente guarda también
+    las capturas, de modo que el ciclo captura -> análisis se puede repetir sin red.
+    """
+
+    def __init__(self, inner: VisionBackend, archive_path: str = VISION_ARCHIVE_PATH,
+                 frames_dir: str | None = VISION_ARCHIVE_FRAMES_DIR):
+        """
+        Args:
+            inner (VisionBackend): El backend real (normalmente `GeminiBackend`).
+            archive_path (str): Archivo donde se añaden las respuestas.
+            frames_dir (str | None): Carpeta donde guardar las capturas (None para no guardarlas).
+        """
+        self.inner = inner
+        self.archive_path = archive_path
+        self.frames_dir = frames_dir
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(archive_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if frames_dir:
+            os.makedirs(frames_dir, exist_ok=True)
+
+    def generate(self, prompt: str, image) -> str:
+        start = time.perf_counter()
+        text = self.inner.generate(prompt, image)
+        self._record(prompt, image, text, time.perf_counter() - start)
+        return text
+
+    def generate_stream(self, prompt: str, image):
+        if not hasattr(self.inner, "generate_stream"):
+            yield self.generate(prompt, image)
+            return
+
+        start = time.perf_counter()
+        first_chunk_latency = None
+        chunks = []
+        for chunk in self.inner.generate_stream(prompt, image):
+            if first_chunk_latency is None:
+                first_chunk_latency = time.perf_counter() - start
+            chunks.append(chunk)
+            yield chunk
+        self._record(prompt, image, "".join(chunks), time.perf_counter() - start, first_chunk_latency)
+
+    def _record(self, prompt: str, image, text: str, latency: float, first_chunk_latency: float | None = None):
+        digest = frame_digest(image)
+        entry = {
+            "frame_hash": digest,
+            "phash": _payload_phash(image),
+            "prompt_hash": _prompt_digest(prompt),
+            "prompt": prompt,
+            "response": text,
+            "latency": round(latency, 4),
+        }
+        if first_chunk_latency is not None:
+            entry["first_chunk_latency"] = round(first_chunk_latency, 4)
+
+        with self._lock:
+            with open(self.archive_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if self.frames_dir:
+                self._save_frame(image, digest)
+
+    def _save_frame(self, image, digest: str):
+        data, extension = _payload_bytes(image)
+        path = os.path.join(self.frames_dir, f"{digest}.{extension}")
+        if os.path.exists(path):
+            return
+        if isinstance(image, dict):
+            with open(path, "wb") as f:
+                f.write(data)
+        else:
+            image.save(path)
+
+
+class ReplayBackend(VisionBackend):
+    """
+    Sirve las respuestas de un archivo grabado con `RecordingBackend`, sin red.
+
+    Busca primero por hash exacto de la captura y, si no hay, la captura grabada
+    más parecida (hash perceptual). Si la misma captura se grabó varias veces, las
+    respuestas se devuelven en el orden en que se grabaron (y luego se repiten),
+    para que la reproducción sea determinista.
+    """
+
+    def __init__(self, archive_path: str = VISION_ARCHIVE_PATH, latency_scale: float = VISION_REPLAY_LATENCY_SCALE,
+                 max_distance: int = 4):
+        """
+        Args:
+            archive_path (str): Archivo grabado.
+            latency_scale (float): Factor aplicado a la latencia grabada (0 = responder al instante).
+            max_distance (int): Distancia de Hamming máxima para aceptar una captura parecida.
+        """
+        self.archive_path = archive_path
+        self.latency_scale = latency_scale
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+
+        self._by_frame = {}    # {(frame_hash, prompt_hash): [entradas]}
+        self._by_phash = []    # [(phash, prompt_hash, clave)]
+        self._cursors = {}     # {clave: siguiente índice}
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._load()
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._by_frame.values())
+
+    def _load(self):
+        if not os.path.exists(self.archive_path):
+            raise FileNotFoundError(f"No existe el archivo de grabación '{self.archive_path}'.")
+
+        with open(self.archive_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    key = (entry["frame_hash"], entry["prompt_hash"])
+                except (json.JSONDecodeError, KeyError):
+                    print(f"ADVERTENCIA: Línea {line_number} del archivo de grabación no válida, se ignora.")
+                    continue
+                if key not in self._by_frame:
+                    self._by_frame[key] = []
+                    self._by_phash.append((int(entry["phash"], 16), entry["prompt_hash"], key))
+                self._by_frame[key].append(entry)
+
+    def _find(self, prompt: str, image) -> dict:
+        prompt_hash = _prompt_digest(prompt)
+        key = (frame_digest(image), prompt_hash)
+
+        with self._lock:
+            if key in self._by_frame:
+                self.hits += 1
+            else:
+                key = self._find_similar(int(_payload_phash(image), 16), prompt_hash)
+                if key is None:
+                    self.misses += 1
+                    raise ReplayMissError("La captura no está en el archivo de grabación.")
+                self.fuzzy_hits += 1
+
+            entries = self._by_frame[key]
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+            return entries[index % len(entries)]
+
+    def _find_similar(self, phash: int, prompt_hash: str):
+        best_key, best_distance = None, self.max_distance + 1
+        for recorded_phash, recorded_prompt, key in self._by_phash:
+            if recorded_prompt != prompt_hash:
+                continue
+            distance = (recorded_phash ^ phash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def generate(self, prompt: str, image) -> str:
+        entry = self._find(prompt, image)
+        time.sleep(entry["latency"] * self.latency_scale)
+        return entry["response"]
+
+    def generate_stream(self, prompt: str, image):
+        entry = self._find(prompt, image)
+        latency = entry["latency"] * self.latency_scale
+        first = entry.get("first_chunk_latency", entry["latency"]) * self.latency_scale
+        time.sleep(first)
+        yield entry["response"]
+        time.sleep(max(0.0, latency - first))
+
+    async def generate_async(self, prompt: str, image) -> str:
+        entry = self._find(prompt, image)
+        await asyncio.sleep(entry["latency"] * self.latency_scale)
+        return entry["response"]
+
+
+def create_backend(mode: str = VISION_BACKEND, api_key: str = GEMINI_API_KEY) -> VisionBackend:
+    """
+    Crea el backend de visión indicado en la configuración.
+
+    Args:
+        mode (str): "gemini", "record", "replay" o "fake".
+        api_key (str): API Key para los modos que llaman a Gemini.
+    """
+    if mode == "gemini":
+        return GeminiBackend(api_key)
+    if mode == "record":
+        return RecordingBackend(GeminiBackend(api_key))
+    if mode == "replay":
+        return ReplayBackend()
+    if mode == "fake":
+        return FakeVisionBackend()
+    raise ValueError(f"Backend de visión desconocido: '{mode}'. Opciones: gemini, record, replay, fake")
@@ -1,19 +1,61 @@
-import google.generativeai as genai
-import json
+import asyncio
+import threading
+import weakref
 from PIL import Image
 
+from config.settings import (
+    CLASSIFIER_CONFIDENCE_THRESHOLD,
+    FRAME_PRESET,
+    GEMINI_API_KEY,
+    SCREEN_CACHE_PATH,
+    SCREEN_CLASSIFIER_PATH,
+)
+from vision.analysis_model import (
+    AnalysisSchemaError,
+    ScreenAnalysis,
+    SelectableOption,
+    StreamingAnalysisParser,
+    parse_analysis,
+)
+from vision.backends import VisionBackend, create_backend
+from vision.preprocessing import FramePreprocessor, PreparedFrame, translate_result
+from vision.screen_cache import PerceptualHashCache, perceptual_hash
+
 class GeminiVisionAnalyzer:
     """
     Analiza capturas de pantalla del juego eFootball utilizando la API de Gemini.
     """
 
-    def __init__(self, api_key: str):
-        if not api_key:
-            raise ValueError("La API Key de Gemini no ha sido configurada.")
-        genai.configure(api_key=api_key)
-        # Usamos el nuevo modelo, más rápido y económico
-        self.model = genai.GenerativeModel('gemini-2.5-flash-lite')
+    def __init__(self, api_key: str | None = None, cache: PerceptualHashCache | None = None,
+                 backend: VisionBackend | None = None, preprocessor: FramePreprocessor | None = None,
+                 classifier: "LocalScreenClassifier | None" = None,
+                 classifier_threshold: float = CLASSIFIER_CONFIDENCE_THRESHOLD):
+        """
+        Args:
+            api_key (str | None): La API Key de Gemini. Por defecto, la de config/settings.py.
+            cache (PerceptualHashCache | None): Caché opcional de pantallas ya analizadas.
+            backend (VisionBackend | None): Backend alternativo (ej. un modelo falso local).
+            preprocessor (FramePreprocessor | None): Reduce y comprime las capturas antes de enviarlas.
+                Las coordenadas de la respuesta se traducen de vuelta a píxeles de la ventana.
+            classifier (LocalScreenClassifier | None): Clasificador local que se consulta antes que Gemini.
+                Se entrena automáticamente con cada respuesta de Gemini.
+            classifier_threshold (float): Confianza mínima del clasificador para no llamar a Gemini.
+        """
+        if backend is None:
+            # El modo (gemini, record, replay...) se elige con VISION_BACKEND en config/settings.py
+            backend = create_backend(api_key=api_key or GEMINI_API_KEY)
+        self.backend = backend
         self.prompt = self._build_prompt()
+        self.cache = cache
+        self.preprocessor = preprocessor
+        self.classifier = classifier
+        self.classifier_threshold = classifier_threshold
+        # Uno por bucle de eventos: su semáforo, su limitador y sus peticiones en vuelo pertenecen al bucle
+        self._async_analyzers = weakref.WeakKeyDictionary()
+
+        # Cuántas llamadas ha resuelto cada nivel: caché, clasificador local o Gemini
+        self.stats = {"cache": 0, "local": 0, "gemini": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
 
     def _build_prompt(self) -> str:
         """
@@ -49,6 +91,9 @@ class GeminiVisionAnalyzer:
     def analyze_image(self, image: Image.Image) -> dict | None:
         """
         Envía una imagen a la API de Gemini y parsea la respuesta JSON.
+        Antes se consultan los niveles locales: la caché (si la pantalla ya se
+        analizó antes) y el clasificador local (si la reconoce con suficiente
+        confianza). Solo se llama a la API cuando ninguno de los dos responde.
 
         Args:
             image (Image.Image): La imagen a analizar.
@@ -56,20 +101,229 @@ class GeminiVisionAnalyzer:
         Returns:
             dict | None: Un diccionario con la información parseada o None si falla.
         """
+        return self._analyze(image)
+
+    def analyze_roi(self, image: Image.Image, region: tuple[int, int, int, int]) -> dict | None:
+        """
+        Analiza un recorte de la ventana (ej. una región de interés de `CaptureSession.grab_roi`).
+        Se envía solo el recorte y las coordenadas de la respuesta se traducen a píxeles de la ventana.
+
+        El clasificador local no se consulta ni se entrena con recortes: aprende
+        pantallas completas. La caché sí se usa (guarda el resultado relativo al recorte).
+
+        Args:
+            image (Image.Image): El recorte.
+            region (tuple): Región (left, top, right, bottom) del recorte dentro de la ventana.
+
+        Returns:
+            dict | None: Un diccionario con la información parseada o None si falla.
+        """
+        return translate_result(self._analyze(image, is_window=False), region[:2])
+
+    def _analyze(self, image: Image.Image, is_window: bool = True) -> dict | None:
+        fingerprint, local_result = self._lookup_local(image, use_classifier=is_window)
+        if local_result is not None:
+            return local_result
+
+        prepared = self._prepare(image, is_window)
         try:
-            response = self.model.generate_content([self.prompt, image])
+            response_text = self.backend.generate(self.prompt, self._payload(image, prepared))
+        except Exception as e:
+            print(f"Ocurrió un error al analizar la imagen con Gemini: {e}")
+            self._count("failed")
+            return None
+
+        parsed_data = self._finalize(response_text, prepared)
+        self._remember(fingerprint, image, parsed_data, use_classifier=is_window)
+        return parsed_data
+
+    def tier_stats(self) -> dict:
+        """
+        Devuelve cuántas llamadas ha respondido cada nivel y qué fracción se ha
+        resuelto sin llamar a Gemini.
+        """
+        with self._stats_lock:
+            stats = dict(self.stats)
+        total = sum(stats.values())
+        stats["total"] = total
+        stats["local_rate"] = (stats["cache"] + stats["local"]) / total if total else 0.0
+        return stats
+
+    def analyze_screen(self, image: Image.Image) -> ScreenAnalysis | None:
+        """Igual que `analyze_image`, pero devuelve el resultado tipado y validado."""
+        return self._to_analysis(self.analyze_image(image))
+
+    def analyze_image_stream(self, image: Image.Image, on_screen=None, on_option=None) -> ScreenAnalysis | None:
+        """
+        Analiza una imagen recibiendo la respuesta de Gemini en streaming.
+
+        `on_screen(current_screen)` se llama en cuanto llega ese campo, antes de que
+        termine la lista de opciones, y `on_option(SelectableOption)` por cada opción
+        completa (ya en píxeles de la ventana). Así el navegador puede decidir sin
+        esperar a la respuesta entera.
+
+        Returns:
+            ScreenAnalysis | None: El resultado completo o None si falla.
+        """
+        fingerprint, local_result = self._lookup_local(image)
+        if local_result is not None:
+            analysis = self._to_analysis(local_result)
+            if analysis is not None and on_screen:
+                on_screen(analysis.current_screen)
+            if analysis is not None and on_option:
+                for option in analysis.options:
+                    on_option(option)
+            return analysis
 
-            # Limpiar la respuesta para asegurar que solo contiene el JSON
-            json_text = response.text.strip().replace("```json", "").replace("```", "")
+        prepared = self._prepare(image)
+        if on_option and prepared is not None:
+            user_on_option = on_option
 
-            # Parsear la respuesta JSON
-            parsed_data = json.loads(json_text)
-            return parsed_data
+            def on_option(option):
+                # Copia traducida: las opciones del parser se traducen después, una sola vez, con map_result
+                if option.has_coordinates:
+                    option = SelectableOption(option.name, *prepared.to_window(option.x, option.y))
+                user_on_option(option)
 
-        except json.JSONDecodeError as e:
+        parser = StreamingAnalysisParser(on_screen=on_screen, on_option=on_option)
+        payload = self._payload(image, prepared)
+        try:
+            if hasattr(self.backend, "generate_stream"):
+                for chunk in self.backend.generate_stream(self.prompt, payload):
+                    parser.feed(chunk)
+            else:
+                parser.feed(self.backend.generate(self.prompt, payload))
+            parsed_data = parser.finish().to_dict()
+        except AnalysisSchemaError as e:
             print(f"Error al decodificar la respuesta JSON de Gemini: {e}")
-            print(f"Respuesta recibida: {response.text}")
-            return None
+            print(f"Respuesta recibida: {parser.buffer}")
+            parsed_data = None
         except Exception as e:
             print(f"Ocurrió un error al analizar la imagen con Gemini: {e}")
-            return None
\ No newline at end of file
+            parsed_data = None
+
+        if prepared is not None:
+            parsed_data = prepared.map_result(parsed_data)
+        self._remember(fingerprint, image, parsed_data)
+        return self._to_analysis(parsed_data)
+
+    @staticmethod
+    def _to_analysis(parsed_data: dict | None) -> ScreenAnalysis | None:
+        if parsed_data is None:
+            return None
+        try:
+            return ScreenAnalysis.from_dict(parsed_data)
+        except AnalysisSchemaError as e:
+            print(f"Error: El resultado del análisis no cumple el esquema: {e}")
+            return None
+
+    async def analyze_image_async(self, image: Image.Image) -> dict | None:
+        """
+        Versión asíncrona de `analyze_image` con concurrencia acotada, limitación de
+        peticiones y fusión de peticiones duplicadas (ver `AsyncVisionAnalyzer`).
+        """
+        return await self._get_async_analyzer().analyze_image_async(image)
+
+    async def analyze_many(self, images: list[Image.Image]) -> list[dict | None]:
+        """Analiza varias imágenes en paralelo. Los resultados mantienen el orden de entrada."""
+        return await self._get_async_analyzer().analyze_many(images)
+
+    def _get_async_analyzer(self):
+        loop = asyncio.get_running_loop()
+        with self._stats_lock:
+            async_analyzer = self._async_analyzers.get(loop)
+            if async_analyzer is None:
+                from vision.async_analyzer import AsyncVisionAnalyzer
+                async_analyzer = AsyncVisionAnalyzer(self)
+                self._async_analyzers[loop] = async_analyzer
+            return async_analyzer
+
+    def _count(self, tier: str):
+        with self._stats_lock:
+            self.stats[tier] += 1
+
+    def _lookup_local(self, image: Image.Image, use_classifier: bool = True) -> tuple[int | None, dict | None]:
+        """
+        Consulta los niveles locales (caché y clasificador).
+
+        Returns:
+            tuple: (huella de la imagen o None si no hay caché, resultado o None).
+        """
+        fingerprint = None
+        if self.cache is not None:
+            fingerprint = perceptual_hash(image)
+            cached = self.cache.get(fingerprint)
+            if cached is not None:
+                self._count("cache")
+                return fingerprint, cached
+
+        if self.classifier is not None and use_classifier:
+            label, confidence = self.classifier.classify(image)
+            if label is not None and confidence >= self.classifier_threshold:
+                # Solo se conoce la pantalla: la opción seleccionada y las coordenadas
+                # del ejemplo no tienen por qué valer para esta captura
+                result = self.classifier.describe(label)
+                if result is not None:
+                    self._count("local")
+                    return fingerprint, result
+
+        return fingerprint, None
+
+    def _remember(self, fingerprint: int | None, image: Image.Image, parsed_data: dict | None,
+                  use_classifier: bool = True):
+        """Registra una respuesta de Gemini en la caché y en el clasificador local."""
+        if parsed_data is None:
+            self._count("failed")
+            return
+        self._count("gemini")
+
+        if self.cache is not None and fingerprint is not None:
+            self.cache.put(fingerprint, parsed_data)
+        if self.classifier is not None and use_classifier and parsed_data.get("current_screen"):
+            self.classifier.add_example(image, parsed_data["current_screen"], parsed_data)
+
+    def _prepare(self, image: Image.Image, is_window: bool = True) -> PreparedFrame | None:
+        """Aplica el preprocesado configurado, si lo hay."""
+        return self.preprocessor.prepare(image, is_window) if self.preprocessor is not None else None
+
+    @staticmethod
+    def _payload(image: Image.Image, prepared: PreparedFrame | None):
+        """Lo que se envía al backend: la imagen ya codificada o la captura original."""
+        return prepared.as_part() if prepared is not None else image
+
+    def _finalize(self, response_text: str, prepared: PreparedFrame | None) -> dict | None:
+        """Parsea la respuesta y traduce sus coordenadas a píxeles de la ventana."""
+        parsed_data = self._parse_response(response_text)
+        return prepared.map_result(parsed_data) if prepared is not None else parsed_data
+
+    def _parse_response(self, response_text: str) -> dict | None:
+        """Valida la respuesta del modelo y la convierte en un diccionario con coordenadas numéricas."""
+        try:
+            return parse_analysis(response_text).to_dict()
+        except AnalysisSchemaError as e:
+            print(f"Error al decodificar la respuesta JSON de Gemini: {e}")
+            print(f"Respuesta recibida: {response_text}")
+            return None
+
+
+def create_default_analyzer(api_key: str | None = None, backend: VisionBackend | None = None) -> GeminiVisionAnalyzer:
+    """
+    Crea el analizador que usa la aplicación, con todos los niveles configurados en
+    `config/settings.py`: caché de pantallas (SCREEN_CACHE_*), preprocesado (FRAME_PRESET)
+    y clasificador local (SCREEN_CLASSIFIER_PATH). La caché y el clasificador se cargan
+    de disco al crearse y se guardan con cada respuesta nueva de Gemini.
+
+    Args:
+        api_key (str | None): La API Key de Gemini. Por defecto, la de config/settings.py.
+        backend (VisionBackend | None): Backend alternativo (ej. un modelo falso local).
+    """
+    # El clasificador usa NumPy: se importa aquí para que importar el analizador no lo cargue
+    from vision.screen_classifier import LocalScreenClassifier
+
+    return GeminiVisionAnalyzer(
+        api_key=api_key,
+        backend=backend,
+        cache=PerceptualHashCache(path=SCREEN_CACHE_PATH),
+        preprocessor=FramePreprocessor(FRAME_PRESET),
+        classifier=LocalScreenClassifier(path=SCREEN_CLASSIFIER_PATH),
+    )
@@ -0,0 +1,223 @@
+# vision/preprocessing.py
+
+"""
+Preprocesado de capturas antes de enviarlas al modelo de visión.
+
+Reducir la resolución, recortar el marco de la ventana y las bandas negras y
+elegir un formato comprimido reduce los bytes subidos y los tokens de imagen
+de cada petición. Las coordenadas que devuelve el modelo se refieren a la imagen
+procesada, así que `PreparedFrame` sabe traducirlas de vuelta a píxeles de la ventana.
+"""
+
+import copy
+import io
+import math
+
+from PIL import Image
+
+from config.settings import WINDOW_CHROME_MARGINS
+
+
+# --- PRESETS ---
+# max_side: lado mayor máximo tras reducir (None = sin reducir).
+# crop_chrome: recortar la barra de título y los bordes de la ventana (WINDOW_CHROME_MARGINS).
+# crop_letterbox: recortar bandas negras alrededor de la imagen del juego.
+# color: "RGB", "L" (escala de grises) o "P" (paleta de `colors` colores).
+# format / quality: codificación final (PNG, JPEG o WEBP).
+PRESETS = {
+    "original": {"max_side": None, "crop_chrome": False, "crop_letterbox": False, "color": "RGB", "format": "PNG", "quality": None},
+    "balanced": {"max_side": 1280, "crop_chrome": True, "crop_letterbox": True, "color": "RGB", "format": "JPEG", "quality": 80},
+    "compact": {"max_side": 768, "crop_chrome": True, "crop_letterbox": True, "color": "RGB", "format": "WEBP", "quality": 70},
+    "grayscale": {"max_side": 768, "crop_chrome": True, "crop_letterbox": True, "color": "L", "format": "JPEG", "quality": 75},
+    "palette": {"max_side": 768, "crop_chrome": True, "crop_letterbox": True, "color": "P", "colors": 32, "format": "PNG", "quality": None},
+}
+
+MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# Por debajo de este valor de gris (0-255) consideramos un píxel parte de una banda negra.
+LETTERBOX_THRESHOLD = 16
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    Estima los tokens que Gemini cobra por una imagen.
+
+    Imágenes de hasta 384x384 cuestan 258 tokens; las mayores se dividen en
+    teselas de 768x768 que cuestan 258 tokens cada una.
+    """
+    if width <= 384 and height <= 384:
+        return 258
+    return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+class PreparedFrame:
+    """
+    Una captura ya procesada y codificada, junto con la transformación que la
+    relaciona con la imagen original de la ventana.
+    """
+
+    def __init__(self, data: bytes, mime_type: str, size: tuple[int, int], original_size: tuple[int, int],
+                 offset: tuple[int, int], scale: float):
+        """
+        Args:
+            data (bytes): La imagen codificada.
+            mime_type (str): Tipo MIME de `data`.
+            size (tuple[int, int]): Tamaño de la imagen enviada.
+            original_size (tuple[int, int]): Tamaño de la captura original.
+            offset (tuple[int, int]): Esquina superior izquierda del recorte en la captura original.
+            scale (float): Factor de reducción aplicado tras el recorte (enviada = original * scale).
+        """
+        self.data = data
+        self.mime_type = mime_type
+        self.size = size
+        self.original_size = original_size
+        self.offset = offset
+        self.scale = scale
+
+    def as_part(self) -> dict:
+        """Devuelve la imagen en el formato de "blob" que acepta `generate_content`."""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+    def to_window(self, x: float, y: float) -> tuple[int, int]:
+        """Traduce un punto de la imagen enviada a píxeles de la ventana original."""
+        return (round(self.offset[0] + x / self.scale), round(self.offset[1] + y / self.scale))
+
+    def map_result(self, result: dict | None) -> dict | None:
+        """
+        Devuelve una copia del resultado del modelo con las `coordinates` de cada
+        opción traducidas a píxeles de la ventana. Las coordenadas no numéricas se dejan tal cual.
+        """
+        if not result:
+            return result
+
+        mapped = copy.deepcopy(result)
+        for option in mapped.get("selectable_options") or []:
+            coords = option.get("coordinates") if isinstance(option, dict) else None
+            if not isinstance(coords, dict):
+                continue
+            try:
+                x, y = float(coords["x"]), float(coords["y"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            coords["x"], coords["y"] = self.to_window(x, y)
+        return mapped
+
+
+def translate_result(result: dict | None, offset: tuple[int, int]) -> dict | None:
+    """
+    Devuelve una copia del resultado con las `coordinates` de cada opción desplazadas
+    `offset` píxeles (ej. de un recorte a la ventana). Las coordenadas no numéricas se dejan tal cual.
+    """
+    return PreparedFrame(b"", "", (0, 0), (0, 0), offset, 1.0).map_result(result)
+
+
+class FramePreprocessor:
+    """Aplica un preset de preprocesado a las capturas."""
+
+    def __init__(self, preset: str | dict = "balanced"):
+        """
+        Args:
+            preset (str | dict): Nombre de un preset de `PRESETS` o un diccionario con las mismas claves.
+        """
+        if isinstance(preset, str):
+            if preset not in PRESETS:
+                raise ValueError(f"Preset de preprocesado desconocido: '{preset}'. Opciones: {', '.join(PRESETS)}")
+            preset = PRESETS[preset]
+        self.options = {**PRESETS["original"], **preset}
+
+    def prepare(self, image: Image.Image, is_window: bool = True) -> PreparedFrame:
+        """
+        Recorta, reduce, convierte y codifica una captura.
+
+        Args:
+            image (Image.Image): La captura.
+            is_window (bool): False si la imagen es un recorte (ej. una región de interés),
+                que no tiene marco de ventana que quitar ni bandas negras.
+        """
+        options = self.options
+        original_size = image.size
+        left, top, right, bottom = 0, 0, image.width, image.height
+
+        if options["crop_chrome"] and is_window:
+            margins = WINDOW_CHROME_MARGINS
+            left, top = margins["left"], margins["top"]
+            right, bottom = image.width - margins["right"], image.height - margins["bottom"]
+            if right <= left or bottom <= top:
+                # La captura es más pequeña que el marco (ej. una región): no recortamos
+                left, top, right, bottom = 0, 0, image.width, image.height
+
+        if (left, top, right, bottom) != (0, 0, image.width, image.height):
+            image = image.crop((left, top, right, bottom))
+
+        if options["crop_letterbox"] and is_window:
+            content_box = find_content_box(image)
+            if content_box and content_box != (0, 0, image.width, image.height):
+                image = image.crop(content_box)
+                left += content_box[0]
+                top += content_box[1]
+
+        scale = 1.0
+        max_side = options["max_side"]
+        if max_side and max(image.size) > max_side:
+            source_width = image.width
+            factor = max_side / max(image.size)
+            new_size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+            image = image.resize(new_size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+            # Usamos la escala real (tras redondear) para que la traducción de coordenadas sea exacta
+            scale = image.width / source_width
+
+        image = self._convert_color(image, options)
+        data = self._encode(image, options)
+        fmt = options["format"].upper()
+        return PreparedFrame(data, MIME_TYPES[fmt], image.size, original_size, (left, top), scale)
+
+    @staticmethod
+    def _convert_color(image: Image.Image, options: dict) -> Image.Image:
+        color = options["color"]
+        if color == "L":
+            return image.convert("L")
+        if color == "P":
+            return image.convert("RGB").quantize(colors=options.get("colors", 64), method=Image.Quantize.FASTOCTREE)
+        return image.convert("RGB")
+
+    @staticmethod
+    def _encode(image: Image.Image, options: dict) -> bytes:
+        fmt = options["format"].upper()
+        if fmt not in MIME_TYPES:
+            raise ValueError(f"Formato de imagen no soportado: '{fmt}'")
+
+        params = {}
+        if fmt in ("JPEG", "WEBP") and options.get("quality"):
+            params["quality"] = options["quality"]
+        if fmt == "JPEG" and image.mode == "P":
+            image = image.convert("RGB")
+        if fmt == "PNG":
+            # compress_level bajo: el PNG ya es pequeño con paleta y así se codifica mucho más rápido
+            params["compress_level"] = 1
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt, **params)
+        return buffer.getvalue()
+
+
+def find_content_box(image: Image.Image) -> tuple[int, int, int, int] | None:
+    """
+    Detecta las bandas negras (letterbox/pillarbox) que rodean la imagen del juego.
+
+    Se trabaja sobre una miniatura para que el coste sea despreciable y se devuelve
+    la caja del contenido en coordenadas de `image`, o None si la imagen es toda negra.
+    """
+    factor = max(1, min(image.size) // 128)
+    thumb = image.convert("L").reduce(factor) if factor > 1 else image.convert("L")
+    mask = thumb.point(lambda v: 255 if v > LETTERBOX_THRESHOLD else 0)
+    box = mask.getbbox()
+    if box is None:
+        return None
+
+    # Volvemos a la escala original siendo conservadores: el borde de la miniatura
+    # puede mezclar banda y contenido, así que no recortamos ese píxel dudoso.
+    left = max(0, (box[0] - 1) * factor) if box[0] > 0 else 0
+    top = max(0, (box[1] - 1) * factor) if box[1] > 0 else 0
+    right = min(image.width, (box[2] + 1) * factor) if box[2] < thumb.width else image.width
+    bottom = min(image.height, (box[3] + 1) * factor) if box[3] < thumb.height else image.height
+    return (left, top, right, bottom)
@@ -0,0 +1,202 @@
+# vision/screen_cache.py
+
+"""
+Caché de análisis de pantallas basada en hash perceptual.
+
+Durante una sesión de farmeo el bot pasa cientos de veces por los mismos menús.
+En lugar de volver a preguntar a Gemini, calculamos una huella (dHash) de cada
+captura y buscamos una entrada "casi idéntica" (distancia de Hamming pequeña).
+"""
+
+import copy
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from config.settings import SCREEN_CACHE_MAX_DISTANCE, SCREEN_CACHE_MAX_ENTRIES
+
+
+def perceptual_hash(image: Image.Image, hash_size: int = 16) -> int:
+    """
+    Calcula un dHash (difference hash) horizontal y vertical de una imagen.
+
+    Se reduce la imagen a escala de grises de (hash_size + 1) x (hash_size + 1) píxeles
+    y cada bit indica si un píxel es más oscuro que su vecino de la derecha (primera
+    mitad) o de abajo (segunda mitad). Usar ambas direcciones y una rejilla de 16x16
+    permite distinguir qué opción del menú está resaltada; con el dHash clásico de
+    64 bits dos menús iguales con distinta selección suelen colisionar.
+
+    Args:
+        image (Image.Image): La captura a procesar.
+        hash_size (int): Lado de la rejilla del hash.
+
+    Returns:
+        int: El hash como entero de 2 * hash_size * hash_size bits.
+    """
+    side = hash_size + 1
+    gray = image.convert("L").resize((side, side), Image.Resampling.BOX)
+    pixels = gray.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * side
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    for row in range(hash_size):
+        offset = row * side
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + side + col])
+    return value
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """Número de bits distintos entre dos hashes."""
+    return (hash_a ^ hash_b).bit_count()
+
+
+class PerceptualHashCache:
+    """
+    Caché LRU de resultados de análisis indexada por hash perceptual.
+
+    Las búsquedas primero prueban una coincidencia exacta y después recorren las
+    entradas buscando la más cercana dentro de `max_distance` bits. El tamaño está
+    acotado por `max_entries`, así que el recorrido lineal sigue siendo barato.
+    """
+
+    FILE_VERSION = 1
+
+    def __init__(self, max_entries: int = SCREEN_CACHE_MAX_ENTRIES, max_distance: int = SCREEN_CACHE_MAX_DISTANCE,
+                 path: str | None = None, autosave: bool = True):
+        """
+        Args:
+            max_entries (int): Número máximo de pantallas almacenadas.
+            max_distance (int): Distancia de Hamming máxima para considerar dos capturas iguales.
+            path (str | None): Fichero JSON donde persistir la caché entre ejecuciones.
+            autosave (bool): Si es True, se guarda en disco tras cada inserción.
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries debe ser mayor que cero.")
+
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.path = path
+        self.autosave = autosave
+
+        self._entries = OrderedDict()  # {hash: resultado}, el más reciente al final
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.path and os.path.exists(self.path):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, fingerprint: int) -> dict | None:
+        """
+        Busca un resultado para la huella dada.
+
+        Returns:
+            dict | None: Una copia del resultado cacheado o None si no hay ninguno suficientemente parecido.
+        """
+        with self._lock:
+            key = fingerprint if fingerprint in self._entries else self._find_nearest(fingerprint)
+            if key is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Devolvemos una copia para que el llamante no pueda corromper la caché
+            return copy.deepcopy(self._entries[key])
+
+    def put(self, fingerprint: int, result: dict):
+        """Guarda un resultado, expulsando la entrada menos usada si se supera el límite."""
+        with self._lock:
+            self._entries[fingerprint] = copy.deepcopy(result)
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        if self.autosave and self.path:
+            self.save()
+
+    def clear(self):
+        """Vacía la caché y reinicia los contadores."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Devuelve los contadores de aciertos y fallos."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def _find_nearest(self, fingerprint: int) -> int | None:
+        """Devuelve la clave más cercana dentro del umbral (se llama con el lock adquirido)."""
+        best_key = None
+        best_distance = self.max_distance + 1
+        for key in self._entries:
+            distance = (key ^ fingerprint).bit_count()
+            if distance < best_distance:
+                best_key = key
+                best_distance = distance
+                if distance == 0:
+                    break
+        return best_key
+
+    # --- PERSISTENCIA ---
+
+    def save(self):
+        """Escribe la caché en disco de forma atómica (fichero temporal + reemplazo)."""
+        if not self.path:
+            return
+
+        with self._lock:
+            data = {
+                "version": self.FILE_VERSION,
+                "entries": [[format(key, "x"), value] for key, value in self._entries.items()],
+            }
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"ADVERTENCIA: No se pudo guardar la caché de pantallas en '{self.path}': {e}")
+
+    def load(self):
+        """Carga la caché desde disco. Un fichero corrupto o de otra versión se ignora."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"ADVERTENCIA: No se pudo leer la caché de pantallas '{self.path}': {e}")
+            return
+
+        if data.get("version") != self.FILE_VERSION:
+            print(f"INFO: Caché de pantallas '{self.path}' con versión desconocida, se ignora.")
+            return
+
+        with self._lock:
+            self._entries.clear()
+            # Las entradas se guardaron en orden LRU, así que las más recientes quedan al final
+            for key_hex, value in data.get("entries", [])[-self.max_entries:]:
+                self._entries[int(key_hex, 16)] = value
@@ -0,0 +1,243 @@
+# vision/screen_classifier.py
+
+"""
+Clasificador local de pantallas.
+
+Una vez que Gemini ha etiquetado una pantalla, no hace falta volver a preguntarle
+para reconocerla. Este módulo extrae unas características baratas con NumPy
+(miniatura en grises, histograma de color y mapa de bordes) y clasifica por
+vecino más cercano contra los ejemplos ya etiquetados en unos pocos milisegundos.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+# Tamaño al que se reduce la captura antes de extraer características.
+FEATURE_SIZE = (64, 36)
+# Tamaño de la miniatura en grises (aspecto 16:9).
+THUMBNAIL_SIZE = (32, 18)
+# Bins por canal del histograma de color (4 x 4 x 4 = 64 bins).
+HISTOGRAM_BINS = 4
+# Rejilla a la que se agrupa el mapa de bordes.
+EDGE_GRID = (16, 9)
+# Peso de cada bloque de características en el vector final.
+FEATURE_WEIGHTS = {"thumbnail": 1.0, "histogram": 0.6, "edges": 0.8}
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def extract_features(image: Image.Image) -> np.ndarray:
+    """
+    Calcula el vector de características (normalizado) de una captura.
+
+    Returns:
+        np.ndarray: Vector float32 de norma 1.
+    """
+    # reducing_gap hace una primera reducción entera muy rápida antes del filtro
+    small = image.resize(FEATURE_SIZE, Image.Resampling.BILINEAR, reducing_gap=2.0).convert("RGB")
+    rgb = np.asarray(small, dtype=np.float32)
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+    # 1. Miniatura en grises centrada: la disposición general de la pantalla
+    height, width = gray.shape
+    thumb_w, thumb_h = THUMBNAIL_SIZE
+    thumbnail = gray.reshape(thumb_h, height // thumb_h, thumb_w, width // thumb_w).mean(axis=(1, 3)).ravel()
+    thumbnail = _normalize(thumbnail - thumbnail.mean())
+
+    # 2. Histograma de color: la paleta del menú, insensible a la posición
+    quantized = (rgb // (256 // HISTOGRAM_BINS)).astype(np.int32)
+    codes = (quantized[..., 0] * HISTOGRAM_BINS + quantized[..., 1]) * HISTOGRAM_BINS + quantized[..., 2]
+    histogram = np.bincount(codes.ravel(), minlength=HISTOGRAM_BINS ** 3).astype(np.float32)
+    histogram = _normalize(np.sqrt(histogram))
+
+    # 3. Mapa de bordes: dónde están los recuadros y el texto
+    grad_x = np.abs(np.diff(gray, axis=1))[:-1, :]
+    grad_y = np.abs(np.diff(gray, axis=0))[:, :-1]
+    magnitude = np.pad(grad_x + grad_y, ((0, 1), (0, 1)))
+    grid_w, grid_h = EDGE_GRID
+    edges = magnitude.reshape(grid_h, height // grid_h, grid_w, width // grid_w).mean(axis=(1, 3)).ravel()
+    edges = _normalize(edges)
+
+    features = np.concatenate([
+        thumbnail * FEATURE_WEIGHTS["thumbnail"],
+        histogram * FEATURE_WEIGHTS["histogram"],
+        edges * FEATURE_WEIGHTS["edges"],
+    ])
+    return _normalize(features).astype(np.float32)
+
+
+class LocalScreenClassifier:
+    """
+    Clasificador por vecino más cercano entrenado con pantallas ya etiquetadas por Gemini.
+
+    Cada ejemplo guarda sus características, su etiqueta (`current_screen`) y el
+    resultado completo de Gemini. Al clasificar solo se devuelve la etiqueta: la
+    opción seleccionada y las coordenadas son de la captura del ejemplo, no de la
+    actual (ver `describe()`).
+
+    La confianza es un softmax entre las etiquetas conocidas más una clase
+    "desconocida" con similitud `min_similarity`. Así, una pantalla nueva del mismo
+    estilo (similitud alta pero no casi idéntica) no obtiene confianza 1.0 solo por
+    ser la única etiqueta entrenada, y hace falta margen sobre la segunda etiqueta.
+    """
+
+    FILE_VERSION = 1
+
+    def __init__(self, max_examples_per_label: int = 20, min_similarity: float = 0.99, temperature: float = 0.003,
+                 path: str | None = None, autosave: bool = True):
+        """
+        Args:
+            max_examples_per_label (int): Ejemplos que se guardan por pantalla (se descartan los más antiguos).
+            min_similarity (float): Similitud coseno mínima con el ejemplo más cercano para dar un resultado.
+                Es también la puntuación de la clase "desconocida". Las pantallas distintas con el mismo
+                estilo del juego rondan 0.98: el umbral tiene que quedar por encima.
+            temperature (float): Temperatura del softmax que convierte similitudes en confianza.
+            path (str | None): Fichero .npz donde persistir los ejemplos.
+            autosave (bool): Si es True, se guarda en disco tras cada ejemplo nuevo.
+        """
+        self.max_examples_per_label = max_examples_per_label
+        self.min_similarity = min_similarity
+        self.temperature = temperature
+        self.path = path
+        self.autosave = autosave
+
+        self._features = np.empty((0, 0), dtype=np.float32)
+        self._labels = []
+        self._results = []
+        self._lock = threading.Lock()
+
+        if self.path and os.path.exists(self.path):
+            self.load()
+
+    def __len__(self):
+        return len(self._labels)
+
+    @property
+    def labels(self) -> set[str]:
+        return set(self._labels)
+
+    def add_example(self, image: Image.Image, label: str, result: dict | None = None):
+        """Añade una captura etiquetada (normalmente con el resultado de Gemini)."""
+        if not label:
+            return
+        features = extract_features(image)
+
+        with self._lock:
+            if self._features.size == 0:
+                self._features = features[np.newaxis, :]
+            else:
+                self._features = np.vstack([self._features, features])
+            self._labels.append(label)
+            self._results.append(result)
+
+            # Limitar los ejemplos de esta etiqueta descartando el más antiguo
+            indices = [i for i, existing in enumerate(self._labels) if existing == label]
+            if len(indices) > self.max_examples_per_label:
+                self._remove(indices[0])
+
+        if self.autosave and self.path:
+            self.save()
+
+    def classify(self, image: Image.Image) -> tuple[str | None, float]:
+        """
+        Clasifica una captura.
+
+        Returns:
+            tuple: (etiqueta, confianza 0-1). Si no hay ejemplos o ninguno se parece
+                   lo suficiente, (None, 0.0).
+        """
+        features = extract_features(image)
+
+        with self._lock:
+            if not self._labels:
+                return None, 0.0
+
+            similarities = self._features @ features
+            best_index = int(np.argmax(similarities))
+            if float(similarities[best_index]) < self.min_similarity:
+                return None, 0.0
+
+            # Mejor similitud por etiqueta, más la clase "desconocida", y softmax entre todas
+            per_label = {}
+            for label, similarity in zip(self._labels, similarities):
+                if similarity > per_label.get(label, -1.0):
+                    per_label[label] = float(similarity)
+            scores = np.array([*per_label.values(), self.min_similarity], dtype=np.float64)
+            weights = np.exp((scores - scores.max()) / self.temperature)
+            confidence = float(weights.max() / weights.sum())
+
+            return self._labels[best_index], confidence
+
+    def describe(self, label: str) -> dict | None:
+        """
+        Resultado guardado más reciente de una etiqueta, sin los datos propios de
+        aquella captura: sin opción seleccionada y con las opciones sin coordenadas.
+
+        Returns:
+            dict | None: Resultado con la estructura del prompt, o None si la etiqueta no tiene resultado.
+        """
+        with self._lock:
+            result = next((r for l, r in zip(reversed(self._labels), reversed(self._results))
+                           if l == label and r is not None), None)
+        if result is None:
+            return None
+        return {
+            "current_screen": label,
+            "selected_option": None,
+            "selectable_options": [
+                {"option_name": option.get("option_name"), "coordinates": {"x": None, "y": None}}
+                for option in result.get("selectable_options") or [] if isinstance(option, dict)
+            ],
+        }
+
+    def _remove(self, index: int):
+        self._features = np.delete(self._features, index, axis=0)
+        del self._labels[index]
+        del self._results[index]
+
+    # --- PERSISTENCIA ---
+
+    def save(self):
+        """Guarda los ejemplos en el fichero .npz configurado."""
+        if not self.path:
+            return
+
+        with self._lock:
+            features = self._features.copy()
+            labels = np.array(self._labels, dtype=str)
+            results = json.dumps(self._results, ensure_ascii=False)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.path, "wb") as f:
+                np.savez_compressed(f, version=self.FILE_VERSION, features=features, labels=labels, results=results)
+        except OSError as e:
+            print(f"ADVERTENCIA: No se pudo guardar el clasificador local en '{self.path}': {e}")
+
+    def load(self):
+        """Carga los ejemplos desde disco. Un fichero incompatible se ignora."""
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if int(data["version"]) != self.FILE_VERSION:
+                    print(f"INFO: Clasificador local '{self.path}' con versión desconocida, se ignora.")
+                    return
+                features = data["features"].astype(np.float32)
+                labels = [str(label) for label in data["labels"]]
+                results = json.loads(str(data["results"]))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"ADVERTENCIA: No se pudo leer el clasificador local '{self.path}': {e}")
+            return
+
+        with self._lock:
+            self._features = features
+            self._labels = labels
+            self._results = results